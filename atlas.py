@@ -0,0 +1,238 @@
+"""
+Texture atlases of the game assets.
+
+Every image of the asset dictionary (single surfaces, lists of frames and Animation frames) is packed into a few large
+atlas pages, and the dictionary is rebuilt with subsurfaces of the pages in the same layout. The pages and a JSON
+manifest of the layout are written to a cache directory, so later startups load a few page images instead of
+hundreds of files. The cache is rebuilt when the source images or the loading code change.
+"""
+
+import os
+import json
+
+import pygame
+
+from support import Animation, BASE_IMG_PATH
+
+
+ATLAS_CACHE_DIR = 'data/cache/atlas'
+ATLAS_MANIFEST = 'atlas.json'
+ATLAS_PAGE_SIZE = 1024
+ATLAS_PADDING = 1
+
+
+def sources_signature(paths):
+    """
+    Describe the state of the asset sources with file counts, total size and the latest modification time.
+    :param paths: Source files and directories (directories are walked recursively).
+    :return: The signature string.
+    """
+    count, size, mtime = 0, 0, 0
+    for path in paths:
+        files = [path] if os.path.isfile(path) else [os.path.join(root, name)
+                                                     for root, _, names in os.walk(path) for name in names]
+        for file in files:
+            stat = os.stat(file)
+            count, size, mtime = count + 1, size + stat.st_size, max(mtime, stat.st_mtime_ns)
+    return f"{count}:{size}:{mtime}"
+
+
+def collect_surfaces(node, surfaces):
+    """
+    Collect all distinct surfaces of an asset tree.
+    :param node: Surface, list, tuple, dict or Animation.
+    :param surfaces: Dictionary id -> surface to fill.
+    """
+    if isinstance(node, pygame.Surface):
+        surfaces.setdefault(id(node), node)
+    elif isinstance(node, Animation):
+        collect_surfaces(node.images, surfaces)
+    elif isinstance(node, (list, tuple)):
+        for item in node:
+            collect_surfaces(item, surfaces)
+    elif isinstance(node, dict):
+        for item in node.values():
+            collect_surfaces(item, surfaces)
+
+
+def pack_rects(sizes, page_size=ATLAS_PAGE_SIZE, padding=ATLAS_PADDING):
+    """
+    Place rectangles onto pages with shelf packing (rows of rectangles sorted by height).
+    Rectangles larger than half a page get a page of their own.
+    :param sizes: List of (width, height).
+    :param page_size: The width and height of a page.
+    :param padding: Space between rectangles.
+    :return: A tuple (placements, page_sizes): (page, x, y) of every rectangle and the used size of every page.
+    """
+    placements = [None] * len(sizes)
+    page_sizes = []
+    page = shelf_y = shelf_x = shelf_height = None
+
+    for index in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        width, height = sizes[index]
+        if width > page_size // 2 or height > page_size // 2:
+            placements[index] = (len(page_sizes), 0, 0)
+            page_sizes.append([width, height])
+            continue
+        if page is None or shelf_x + width > page_size:
+            if page is not None and shelf_y + shelf_height + padding + height <= page_size:
+                shelf_y += shelf_height + padding
+            else:
+                page = len(page_sizes)
+                page_sizes.append([0, 0])
+                shelf_y = 0
+            shelf_x, shelf_height = 0, height
+        placements[index] = (page, shelf_x, shelf_y)
+        page_sizes[page][0] = max(page_sizes[page][0], shelf_x + width)
+        page_sizes[page][1] = max(page_sizes[page][1], shelf_y + height)
+        shelf_x += width + padding
+
+    return placements, [tuple(size) for size in page_sizes]
+
+
+def copy_into(page, surface, pos):
+    """
+    Copy a surface onto a transparent page without blending, turning colorkey pixels transparent.
+    """
+    if surface.get_flags() & pygame.SRCALPHA:
+        page.blit(surface, pos, special_flags=pygame.BLEND_RGBA_MAX)
+        colorkey = surface.get_colorkey()
+        if colorkey is not None:
+            area = page.subsurface(pygame.Rect(pos, surface.get_size()))
+            keyed = (pygame.surfarray.pixels3d(area) == colorkey[:3]).all(axis=2)
+            pygame.surfarray.pixels_alpha(area)[keyed] = 0
+    else:
+        page.blit(surface, pos)
+
+
+def rebuild(node, views):
+    """
+    Rebuild an asset tree with the packed surfaces.
+    :param node: Surface, list, tuple, dict or Animation.
+    :param views: Dictionary id of the original surface -> subsurface of a page.
+    """
+    if isinstance(node, pygame.Surface):
+        return views[id(node)]
+    if isinstance(node, Animation):
+        return Animation(rebuild(node.images, views), node.img_duration, node.loop, node.num_cycles)
+    if isinstance(node, (list, tuple)):
+        return type(node)(rebuild(item, views) for item in node)
+    if isinstance(node, dict):
+        return {key: rebuild(item, views) for key, item in node.items()}
+    return node
+
+
+def describe(node, rects):
+    """
+    Describe an asset tree for the manifest.
+    :param node: Surface, list, tuple, dict or Animation.
+    :param rects: Dictionary id of the original surface -> [page, x, y, width, height].
+    """
+    if isinstance(node, pygame.Surface):
+        return {'rect': rects[id(node)]}
+    if isinstance(node, Animation):
+        return {'animation': describe(node.images, rects), 'img_dur': node.img_duration,
+                'loop': node.loop, 'num_cycles': node.num_cycles}
+    if isinstance(node, tuple):
+        return {'tuple': [describe(item, rects) for item in node]}
+    if isinstance(node, list):
+        return {'list': [describe(item, rects) for item in node]}
+    if isinstance(node, dict):
+        return {'dict': {key: describe(item, rects) for key, item in node.items()}}
+    raise TypeError(f"Asset of type {type(node).__name__} can not be packed into an atlas.")
+
+
+def restore(description, pages):
+    """
+    Restore an asset tree from its manifest description.
+    """
+    if 'rect' in description:
+        page, x, y, width, height = description['rect']
+        return pages[page].subsurface((x, y, width, height))
+    if 'animation' in description:
+        return Animation(restore(description['animation'], pages), description['img_dur'],
+                         description['loop'], description['num_cycles'])
+    if 'list' in description:
+        return [restore(item, pages) for item in description['list']]
+    if 'tuple' in description:
+        return tuple(restore(item, pages) for item in description['tuple'])
+    return {key: restore(item, pages) for key, item in description['dict'].items()}
+
+
+def pack_assets(assets, page_size=ATLAS_PAGE_SIZE):
+    """
+    Pack all images of an asset dictionary into atlas pages.
+    :param assets: The asset dictionary (see data.load_assets).
+    :param page_size: The width and height of a page.
+    :return: A tuple (packed assets, pages, manifest description of the assets).
+    """
+    surfaces = {}
+    collect_surfaces(assets, surfaces)
+    ids = list(surfaces)
+    placements, page_sizes = pack_rects([surfaces[key].get_size() for key in ids], page_size)
+
+    pages = [pygame.Surface(size, pygame.SRCALPHA) for size in page_sizes]
+    for key, (page, x, y) in zip(ids, placements):
+        copy_into(pages[page], surfaces[key], (x, y))
+    if pygame.display.get_surface() is not None:
+        pages = [page.convert_alpha() for page in pages]
+
+    views, rects = {}, {}
+    for key, (page, x, y) in zip(ids, placements):
+        size = surfaces[key].get_size()
+        rects[key] = [page, x, y, size[0], size[1]]
+        views[key] = pages[page].subsurface((x, y) + size)
+
+    return rebuild(assets, views), pages, describe(assets, rects)
+
+
+def save_atlas(cache_dir, pages, description, signature):
+    """
+    Write atlas pages and the manifest into the cache directory.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    names = [f'page{index}.png' for index in range(len(pages))]
+    for page, name in zip(pages, names):
+        pygame.image.save(page, os.path.join(cache_dir, name))
+    with open(os.path.join(cache_dir, ATLAS_MANIFEST), 'w') as f:
+        json.dump({'signature': signature, 'pages': names, 'assets': description}, f)
+
+
+def load_atlas(cache_dir, signature):
+    """
+    Load assets from the atlas cache.
+    :return: The asset dictionary, or None if there is no cache or it is out of date.
+    """
+    try:
+        with open(os.path.join(cache_dir, ATLAS_MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('signature') != signature:
+        return None
+
+    pages = []
+    for name in manifest['pages']:
+        page = pygame.image.load(os.path.join(cache_dir, name))
+        pages.append(page.convert_alpha() if pygame.display.get_surface() is not None else page)
+    return restore(manifest['assets'], pages)
+
+
+def load_packed_assets(load, sources=(BASE_IMG_PATH,), cache_dir=ATLAS_CACHE_DIR):
+    """
+    Load the asset dictionary from the atlas cache, or load it from the image files, pack it and write the cache.
+    :param load: Function loading the asset dictionary from the image files.
+    :param sources: Files and directories the assets are made from, including the modules that load and pack them
+        (their changes invalidate the cache).
+    :param cache_dir: The atlas cache directory.
+    :return: The asset dictionary with images in atlas pages.
+    """
+    signature = sources_signature(sources)
+    assets = load_atlas(cache_dir, signature)
+    if assets is None:
+        assets, pages, description = pack_assets(load())
+        try:
+            save_atlas(cache_dir, pages, description, signature)
+        except OSError as error:
+            print(f"Atlas cache was not saved: {error}")
+    return assets
@@ -0,0 +1,79 @@
+import pygame
+
+
+class BackgroundLayer:
+    """
+    One layer of a level background, prepared at the display size.
+    """
+    def __init__(self, image, depth):
+        """
+        Initializes the BackgroundLayer object.
+        :param image: The prepared layer image.
+        :param depth: Parallax factor: 0 - static layer, 1 - moves together with the map.
+        """
+        self.image = image
+        self.depth = depth
+
+    def render(self, surf, offset=(0, 0)):
+        if not self.depth:
+            surf.blit(self.image, (0, 0))
+            return
+        # a layer narrower than the surface needs ceil(surface width / layer width) + 1 copies to cover it
+        width = self.image.get_width()
+        start = -int(offset[0] * self.depth) % width - width
+        surf.blits([(self.image, (x, 0)) for x in range(start, surf.get_width(), width)], doreturn=False)
+
+
+class Background:
+    """
+    Level backgrounds scaled once to the display size and converted to the display pixel format,
+    so a frame only blits them. Each level has a static base layer and optional parallax layers.
+    """
+    def __init__(self, images, size, parallax=None):
+        """
+        Initializes the Background object.
+        :param images: Base background image of each level (indexed by level).
+        :param size: The size of the display surface the backgrounds are rendered onto.
+        :param parallax: Dictionary level -> [(image, depth)] of parallax layers drawn over the base image of a level.
+        """
+        self.size = tuple(size)
+        self.sources = {level: [(image, 0)] for level, image in enumerate(images)}  # level -> [(image, depth)]
+        for level, layers in (parallax or {}).items():
+            self.sources.setdefault(level, []).extend(layers)
+        self.layers = {}  # level -> prepared BackgroundLayer objects
+
+    def prepare_layer(self, image, depth):
+        """
+        Scale a layer image for the display: static layers fill the display,
+        parallax layers are scaled to the display height and tiled horizontally.
+        """
+        if depth:
+            width = max(1, round(image.get_width() * self.size[1] / image.get_height()))
+            size = (width, self.size[1])
+        else:
+            size = self.size
+        if image.get_size() != size:
+            image = pygame.transform.scale(image, size)
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA or depth else image.convert()
+        return BackgroundLayer(image, depth)
+
+    def prepare(self, level):
+        """
+        Prepare the layers of a level (done once, when a level is loaded).
+        :param level: The level index.
+        :return: A list of BackgroundLayer objects.
+        """
+        if level not in self.layers:
+            self.layers[level] = [self.prepare_layer(image, depth) for image, depth in self.sources.get(level, ())]
+        return self.layers[level]
+
+    def render(self, surf, level, offset=(0, 0)):
+        """
+        Render the background of a level.
+        :param surf: The surface to render onto.
+        :param level: The level index.
+        :param offset: The camera offset (moves parallax layers).
+        """
+        for layer in self.prepare(level):
+            layer.render(surf, offset)
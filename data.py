@@ -1,11 +1,30 @@
 import json
 import pygame
 
-from support import load_image, load_images, load_images_entities
+import atlas
+import support
+from support import load_image, load_images, load_images_entities, mark_static, prepare_rotations
 from support import BASE_IMG_PATH, Animation
+from atlas import load_packed_assets
 
 
 def load_assets():
+    """
+    Load the assets packed into texture atlases (see atlas.py), from the atlas cache when it is up to date.
+    :return: dictionary with Surface objects that represent static image or Animation objects (group of sprites)
+    """
+    # the loading and packing code is a source too: its changes alter the packed assets
+    sources = (BASE_IMG_PATH, __file__, support.__file__, atlas.__file__)
+    assets = mark_static(load_packed_assets(load_asset_files, sources=sources))
+
+    # spinning shurikens use every rotation step, so their rotated copies are generated at load time
+    for config in SHURIKEN_CONFIGS.values():
+        prepare_rotations(assets[config['image']])
+
+    return assets
+
+
+def load_asset_files():
     """
     :return: dictionary with Surface objects that represent static image or Animation objects (group of sprites)
     """
@@ -308,7 +327,7 @@ COLOR_SCHEMA = {
     'ice': (173, 216, 230)
 }
 
-HEALTH_BARS = {
+HEALTH_BARS = mark_static({
     0: pygame.image.load(BASE_IMG_PATH + 'ui/mob_health_bar/0.png'),
     1: pygame.image.load(BASE_IMG_PATH + 'ui/mob_health_bar/1.png'),
     2: pygame.image.load(BASE_IMG_PATH + 'ui/mob_health_bar/2.png'),
@@ -319,7 +338,7 @@ HEALTH_BARS = {
     7: pygame.image.load(BASE_IMG_PATH + 'ui/mob_health_bar/7.png'),
     8: pygame.image.load(BASE_IMG_PATH + 'ui/mob_health_bar/8.png'),
     9: pygame.image.load(BASE_IMG_PATH + 'ui/mob_health_bar/9.png'),
-}
+})
 
 PROJECTILE_DAMAGE = {
     'AnimatedFireball': 33,
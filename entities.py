@@ -7,7 +7,9 @@ import logging
 
 
 from data import EXP_POINTS, SHURIKEN_LEVELS, SHURIKEN_CONFIGS, HEALTH_BARS, UI_PATH, SPELL_COOLDOWN, COOLDOWN_DURATIONS
-from particle import Particle, Spark, create_particles
+from particle import create_particles, PRIORITY_AMBIENT, PRIORITY_PLAYER
+from support import flipped
+from render_queue import draw_shape
 from projectile import (Shuriken,
                         AnimatedFireball, DaemonBreath, DaemonBreathFlip, DaemonFireBreath, DaemonFireBreathFlip,
                         WormFireball, SkullSmoke, ToxicExplosion, EarthStrike, RockWave,
@@ -23,6 +25,8 @@ class PhysicsEntity:
     """
     A class representing an entity with physics-based movement and collision detection.
     """
+    sprite_offset = (0, -10)  # position of the sprite relative to the entity position (before the animation offset)
+
     def __init__(self, game, e_type, pos, size):
         """
         Initializes the PhysicsEntity object.
@@ -59,6 +63,15 @@ class PhysicsEntity:
         """Returns the rectangular area of the entity."""
         return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
 
+    def sprite_pos(self, offset=(0, 0)):
+        """Returns the top left corner of the current sprite on a surface with the given camera offset."""
+        return (self.pos[0] + self.sprite_offset[0] - offset[0] + self.anim_offset[0],
+                self.pos[1] + self.sprite_offset[1] - offset[1] + self.anim_offset[1])
+
+    def cull_rect(self):
+        """Returns the area the entity draws in (world coordinates), used to cull it against the camera."""
+        return self.animation.current_sprite().get_rect(topleft=self.sprite_pos())
+
     def set_action(self, action):
         """Sets the current action (animation) of the entity."""
         if action != self.action:
@@ -138,14 +151,15 @@ class PhysicsEntity:
 
     def render(self, surf, offset=(0, 0)):
         """Renders the entity on the given surface."""
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0], self.pos[1] - 10 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
 
 class Enemy(PhysicsEntity):
     """
     A class that represents enemy objects.
     """
+    health_bar_calibration = (0, 0)  # shift of the health bar from its place 40 pixels above the entity
+
     def __init__(self, game, image,  pos, size, e_type, health):
         """
         Initializes the Enemy object.
@@ -174,6 +188,7 @@ class Enemy(PhysicsEntity):
         self.freeze_timer = 0
         self.attack_cooldown = random.uniform(90, 150)  # random interval from a to b (in frames)
         self.time_since_last_attack = 0
+        self.sees_player = True  # line of sight to the player, refreshed by the game every few frames
 
     def handle_player_dash_collision(self):
         """
@@ -195,10 +210,12 @@ class Enemy(PhysicsEntity):
                 damage = 20 * self.game.player.double_power
                 self.take_damage(damage)
 
-                self.game.damage_rates.append(DamageNumber(self.hitbox.center, damage, (255, 255, 255)))
+                self.game.particle_budget.append(self.game.damage_rates,
+                                                 DamageNumber(self.hitbox.center, damage, (255, 255, 255)),
+                                                 'damage', PRIORITY_PLAYER)
                 self.game.sfx[self.e_type].play()
 
-                create_particles(self.game, self.hitbox.center, shade)
+                create_particles(self.game, self.hitbox.center, shade, priority=PRIORITY_PLAYER)
 
     def initiate_attack(self):
         """Initiates an attack by launching an attack animation, if it exists."""
@@ -250,12 +267,14 @@ class Enemy(PhysicsEntity):
     def victory_handler(self):
         probability = random.random()
         if probability > 0.75:
-            self.game.effects.append(HitEffect(self.game, self.hitbox.midtop, 0))
+            self.game.particle_budget.append(self.game.effects, HitEffect(self.game, self.hitbox.midtop, 0), 'effects',
+                                             PRIORITY_PLAYER)
             self.game.shaking_screen_effect = max(16, self.game.shaking_screen_effect)
         elif probability > 0.5:
-            self.game.effects.append(HitEffect2(self.game, self.hitbox.midtop, 0))
+            self.game.particle_budget.append(self.game.effects, HitEffect2(self.game, self.hitbox.midtop, 0), 'effects',
+                                             PRIORITY_PLAYER)
             self.game.shaking_screen_effect = max(24, self.game.shaking_screen_effect)
-        create_particles(self.game, self.rect().center, self.e_type)
+        create_particles(self.game, self.rect().center, self.e_type, priority=PRIORITY_PLAYER)
         self.game.player.increase_experience(EXP_POINTS[self.e_type])
 
     def update(self, tilemap, movement=(0, 0)):
@@ -275,7 +294,7 @@ class Enemy(PhysicsEntity):
         player_distance_y = abs(self.game.player.pos[1] - self.pos[1])
 
         # 2 Chase starts if the player comes into view
-        if 100 > player_distance_x > 20 and player_distance_y < 50:  # unit of measurement - pixel
+        if 100 > player_distance_x > 20 and player_distance_y < 50 and self.sees_player:  # unit of measurement - pixel
             if self.game.player.pos[0] < self.pos[0]:
                 self.flip = True
                 movement = (-0.5, 0)
@@ -285,7 +304,7 @@ class Enemy(PhysicsEntity):
 
         # 3 Random attack if the player is in the mob's line of sight
         player_distance = math.hypot(self.game.player.pos[0] - self.pos[0], self.game.player.pos[1] - self.pos[1])
-        if player_distance < 100:  # unit of measurement - pixel
+        if player_distance < 100 and self.sees_player:  # unit of measurement - pixel
             self.attack_cooldown -= 1
             if self.attack_cooldown <= 0:
                 self.attack_cooldown = random.uniform(90, 150)  # define new random interval
@@ -354,11 +373,22 @@ class Enemy(PhysicsEntity):
         logging.debug(f"Rendering enemy {self}.")
         super().render(surf, offset=offset)
 
-    def render_health_bar(self, surf, offset=(0, 0), calibration=(0, 0)):
+    def health_bar_rect(self):
+        """Returns the area of the health bar in world coordinates."""
+        calibration = self.health_bar_calibration
+        return self.current_health_bar.get_rect(topleft=(
+            self.rect().centerx - self.current_health_bar.get_width() // 2 - calibration[0],
+            self.rect().top - 40 - calibration[1]))
+
+    def cull_rect(self):
+        rect = super().cull_rect()
+        if self.current_health_bar:
+            rect.union_ip(self.health_bar_rect())
+        return rect
+
+    def render_health_bar(self, surf, offset=(0, 0)):
         if self.current_health_bar:
-            pos = (self.rect().centerx - self.current_health_bar.get_width() // 2 - calibration[0], self.rect().top - 40 - calibration[1])
-            pos_with_offset = (pos[0] - offset[0], pos[1] - offset[1])
-            surf.blit(self.current_health_bar, pos_with_offset)
+            surf.blit(self.current_health_bar, self.health_bar_rect().move(-offset[0], -offset[1]))
 
 
 class OrcArcher(Enemy):
@@ -372,9 +402,9 @@ class OrcArcher(Enemy):
         projectile_pos = [self.rect().centerx, self.rect().centery]
         self.game.projectiles.append([projectile_pos, direction, 0, 'arrow'])
 
-        for i in range(4):
-            self.game.sparks.append(Spark(self.game.projectiles[-1][0], random.random() - 0.5 + math.pi,
-                                          2 + random.random(), 'white'))
+        for i in range(self.game.sparks.thin(4, PRIORITY_AMBIENT)):
+            self.game.sparks.add(self.game.projectiles[-1][0], random.random() - 0.5 + math.pi,
+                                 2 + random.random(), 'white', priority=PRIORITY_AMBIENT)
 
     def render(self, surf, offset=(0, 0)):
         super().render(surf, offset=offset)
@@ -382,7 +412,7 @@ class OrcArcher(Enemy):
         self.render_health_bar(surf, offset=offset)
 
         if self.flip:
-            surf.blit(pygame.transform.flip(self.game.assets['bow'], True, False), (
+            surf.blit(flipped(self.game.assets['bow']), (
                 self.rect().centerx - self.game.assets['bow'].get_width() - offset[0],
                 self.rect().centery - 16 - offset[1]))
 
@@ -391,11 +421,13 @@ class OrcArcher(Enemy):
                       (self.rect().centerx + 4 - offset[0], self.rect().centery - 16 - offset[1]))
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class BigZombie(Enemy):
+    sprite_offset = (-14, -20)
+
     def __init__(self, game, pos, size=(8, 15)):
         super().__init__(game, 'big_zombie', pos, size, e_type='big_zombie', health=200)
 
@@ -409,18 +441,18 @@ class BigZombie(Enemy):
         self.game.sfx['zombie_fart'].play()
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - 14 - offset[0] + self.anim_offset[0],
-                   self.pos[1] - 20 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
         self.render_health_bar(surf, offset=offset)
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class FireWorm(Enemy):
+    sprite_offset = (-34, -42)
+
     def __init__(self, game, pos, size=(8, 15)):
         super().__init__(game, 'fire_worm', pos, size, e_type='fire_worm', health=600)
 
@@ -445,18 +477,18 @@ class FireWorm(Enemy):
                 self.set_action('idle')
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - 34 - offset[0] + self.anim_offset[0],
-                   self.pos[1] - 42 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
         self.render_health_bar(surf, offset=offset)
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class BigDaemon(Enemy):
+    sprite_offset = (-14, -20)
+
     def __init__(self, game, pos, size=(8, 15)):
         super().__init__(game, 'big_daemon', pos, size, e_type='big_daemon', health=300)
 
@@ -466,18 +498,19 @@ class BigDaemon(Enemy):
         self.game.sfx['fireball'].play()
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - 14 - offset[0] + self.anim_offset[0],
-                   self.pos[1] - 20 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
         self.render_health_bar(surf, offset=offset)
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class SupremeDaemon(Enemy):
+    sprite_offset = (0, -140)
+    health_bar_calibration = (-50, 100)
+
     def __init__(self, game, pos, size=(8, 15)):
         super().__init__(game, 'supreme_daemon', pos, size, e_type='supreme_daemon', health=2000)
 
@@ -505,18 +538,18 @@ class SupremeDaemon(Enemy):
         self.hitbox = pygame.Rect(self.pos[0] + 20, self.pos[1] - 120, self.size[0] + 100, self.size[1] + 80)
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0],
-                   self.pos[1] - 140 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
-        self.render_health_bar(surf, offset=offset, calibration=(-50, 100))
+        self.render_health_bar(surf, offset=offset)
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class Golem(Enemy):
+    sprite_offset = (0, -46)
+
     def __init__(self, game, pos, size=(8, 15)):
         super().__init__(game, 'golem', pos, size, e_type='golem', health=800)
 
@@ -550,18 +583,18 @@ class Golem(Enemy):
         self.hitbox = pygame.Rect(self.pos[0] + 16, self.pos[1] - 16, self.size[0] + 36, self.size[1] + 18)
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0],
-                   self.pos[1] - 46 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
         self.render_health_bar(surf, offset=offset)
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class HellsWatchdog(Enemy):
+    sprite_offset = (0, -46)
+
     def __init__(self, game, pos, size=(8, 15)):
         super().__init__(game, 'hells_watchdog', pos, size, e_type='hells_watchdog', health=250)
 
@@ -573,18 +606,20 @@ class HellsWatchdog(Enemy):
         self.hitbox = pygame.Rect(self.pos[0] + 16, self.pos[1] - 16, self.size[0] + 36, self.size[1] + 18)
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
-                  (self.pos[0] - offset[0] + self.anim_offset[0],
-                   self.pos[1] - 46 - offset[1] + self.anim_offset[1]))
+        surf.blit(self.animation.current_sprite(self.flip), self.sprite_pos(offset))
 
         self.render_health_bar(surf, offset=offset)
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
 
 class Player(PhysicsEntity):
+    @property
+    def sprite_offset(self):
+        return (-28 if self.flip else -14), -16
+
     def __init__(self, game, pos=(50, 50), size=(9, 17)):
         super().__init__(game, 'player', pos, size)
 
@@ -779,7 +814,7 @@ class Player(PhysicsEntity):
                 self.stamina -= 10
                 self.attack_timer = len(self.animation.images) * self.animation.img_duration
 
-                for enemy in self.game.enemies.copy():
+                for enemy in self.game.enemies:
                     if self.hitbox.colliderect(enemy.hitbox) and self.attack_pressed and not enemy.dying:
                         self.game.sfx['hit'].play()
 
@@ -817,9 +852,11 @@ class Player(PhysicsEntity):
 
                         self.game.shaking_screen_effect = max(16, self.game.shaking_screen_effect)
 
-                        create_particles(self.game, enemy.hitbox.center, shade)
+                        create_particles(self.game, enemy.hitbox.center, shade, priority=PRIORITY_PLAYER)
 
-                        self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(damage), (255, 255, 255)))
+                        self.game.particle_budget.append(self.game.damage_rates,
+                                                         DamageNumber(enemy.hitbox.center, int(damage), (255, 255, 255)),
+                                                         'damage', PRIORITY_PLAYER)
 
     def ranged_attack(self):
         if not self.game.dead and not self.wall_slide and self.shuriken_count > 0 and self.stamina >= self.min_stamina:
@@ -1093,8 +1130,7 @@ class Player(PhysicsEntity):
                 angle = random.random() * math.pi * 2
                 speed = random.random() * 0.5 + 0.5
                 pvelocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                self.game.particles.append(
-                    Particle(self.game, 'particle', self.rect().center, velocity=pvelocity, frame=random.randint(0, 7)))
+                self.game.particles.add('particle', self.rect().center, velocity=pvelocity, frame=random.randint(0, 7))
         if self.dashing > 0:
             self.dashing = max(0, self.dashing - 1)
         if self.dashing < 0:
@@ -1104,8 +1140,7 @@ class Player(PhysicsEntity):
             if abs(self.dashing) == 51:
                 self.velocity[0] *= 0.1
             pvelocity = [abs(self.dashing) / self.dashing * random.random() * 3, 0]
-            self.game.particles.append(
-                Particle(self.game, 'particle', self.rect().center, velocity=pvelocity, frame=random.randint(0, 7)))
+            self.game.particles.add('particle', self.rect().center, velocity=pvelocity, frame=random.randint(0, 7))
 
         if self.velocity[0] > 0:
             self.velocity[0] = max(self.velocity[0] - 0.1, 0)
@@ -1176,22 +1211,15 @@ class Player(PhysicsEntity):
                 self.dash_animation = None
 
     def render(self, surf, offset=(0, 0)):
-        current_image = self.animation.current_sprite()
+        current_image = self.animation.current_sprite(self.flip)
         alpha = 96 if self.invulnerability else 255  # transparency value depending on self.invulnerability
         current_image.set_alpha(alpha)
 
-        if not self.flip:
-            surf.blit(pygame.transform.flip(current_image, self.flip, False),
-                      (self.pos[0] - 14 - offset[0] + self.anim_offset[0],
-                       self.pos[1] - 16 - offset[1] + self.anim_offset[1]))
-        else:
-            surf.blit(pygame.transform.flip(current_image, self.flip, False),
-                      (self.pos[0] - 28 - offset[0] + self.anim_offset[0],
-                       self.pos[1] - 16 - offset[1] + self.anim_offset[1]))
+        surf.blit(current_image, self.sprite_pos(offset))
 
         if self.show_hitboxes:
-            pygame.draw.rect(surf, (0, 255, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
-                                                 self.hitbox.width, self.hitbox.height), 1)
+            draw_shape(surf, pygame.draw.rect, (0, 255, 0), (self.hitbox.x - offset[0], self.hitbox.y - offset[1],
+                                                             self.hitbox.width, self.hitbox.height), 1)
 
         # pygame.draw.rect(surf, (0, 255, 0), (self.rect().x - offset[0], self.rect().y - offset[1],
         #                                      self.rect().width, self.rect().height), 1)
@@ -0,0 +1,72 @@
+from itertools import islice
+
+
+class EntityList:
+    """
+    Ordered container of game objects (enemies, projectiles, effects, loot...) with deferred removal.
+    Removing an object only marks it: it disappears from iteration, len() and `in` at once, but stays in the storage
+    until compact() drops all marked objects in one pass at the end of the frame. So the containers can be changed
+    while they are iterated, without copying them every frame. Objects are identified by identity (projectiles
+    are plain lists) and keep the order in which they were added; objects added during an iteration are visited
+    from the next iteration on.
+    """
+    def __init__(self, objects=()):
+        self.objects = list(objects)
+        self.ids = {id(obj) for obj in self.objects}  # ids of the live objects
+        self.removed = set()  # ids of the objects removed since the last compaction
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, obj):
+        return id(obj) in self.ids
+
+    def __iter__(self):
+        removed = self.removed
+        for obj in islice(self.objects, len(self.objects)):
+            if id(obj) not in removed:
+                yield obj
+
+    def __getitem__(self, index):
+        """
+        Index access to the storage (e.g. [-1] for the object added last), marked objects are not skipped.
+        """
+        return self.objects[index]
+
+    def append(self, obj):
+        """
+        Add an object. An object removed since the last compaction is still in the storage,
+        so adding it again only clears its mark and it keeps its old position.
+        :param obj: The object.
+        """
+        key = id(obj)
+        if key in self.removed:
+            self.removed.remove(key)
+        else:
+            self.objects.append(obj)
+        self.ids.add(key)
+
+    def remove(self, obj):
+        """
+        Mark an object as removed. Removing an object twice or an object that is not in the container does nothing.
+        :param obj: The object.
+        """
+        key = id(obj)
+        if key in self.ids:
+            self.ids.remove(key)
+            self.removed.add(key)
+
+    def clear(self):
+        self.objects.clear()
+        self.ids.clear()
+        self.removed.clear()
+
+    def compact(self):
+        """
+        Drop the removed objects from the storage, keeping the order of the others.
+        Called at the end of the frame, when no iteration is running.
+        """
+        if self.removed:
+            removed = self.removed
+            self.objects[:] = [obj for obj in self.objects if id(obj) not in removed]
+            removed.clear()
@@ -8,15 +8,25 @@ import pygame
 
 import logging
 
+from collections import defaultdict
+
 from data import load_assets, load_sfx, load_voices, COLOR_SCHEMA, PROJECTILE_DAMAGE
 from entities import Player, OrcArcher, BigZombie, BigDaemon, SupremeDaemon, FireWorm, Golem, HellsWatchdog
 from quests import OldMan, Blacksmith,QuestJournal
 from map import Map
-from weather import Clouds, Raindrop
-from particle import Particle, Spark, create_particles
+from level_format import level_path, count_levels
+from weather import Clouds, Rain
+from background import Background
+from outline import OutlineStage
+from presentation import Presentation, create_window
+from transition import IrisTransition
+from render_queue import (RenderQueue, LAYER_ITEMS, LAYER_CHARACTERS, LAYER_PROJECTILES, LAYER_EFFECTS, LAYER_DAMAGE,
+                          LAYER_PARTICLES)
+from entity_list import EntityList
+from particle import ParticleBudget, ParticleSystem, SparkSystem, create_particles, PRIORITY_AMBIENT, PRIORITY_PLAYER
 from player_controller import PlayerController
 from ui import UI, SkillsTree, CharacterMenu, InventoryMenu, MerchantWindow
-from support import volume_adjusting
+from support import volume_adjusting, flipped
 from settings import *
 
 from projectile import (AnimatedFireball, WormFireball, SkullSmoke, ToxicExplosion, GroundFlame, EarthStrike,
@@ -30,9 +40,61 @@ from items import (Coin, Gem, HealthPoison, MagicPoison, StaminaPoison, PowerPoi
 
 # logging.basicConfig(level=logging.DEBUG)
 
+# objects created in spawn locations of the level map (spawn point variant -> class)
+ENEMY_CLASSES = {
+    # 0 : this is player number
+    1: OrcArcher,
+    2: BigZombie,
+    3: BigDaemon,
+    # 4 : this is merchant number
+    5: FireWorm,
+    6: SupremeDaemon,
+    7: Golem,
+    8: HellsWatchdog
+}
+
+LOOT_CLASSES = {
+    0: Gem,
+    1: Coin,
+    2: HealthPoison,
+    3: MagicPoison,
+    4: StaminaPoison,
+    5: PowerPoison,
+    6: SpeedScroll,
+    7: BloodlustScroll,
+    8: HollyScroll,
+    9: InvulnerabilityScroll,
+    10: SteelKey,
+    11: RedKey,
+    12: BronzeKey,
+    13: PurpleKey,
+    14: GoldKey,
+    15: MagicCrystal
+}
+
+CHEST_CLASSES = {
+    0: CommonChest,
+    1: RareChest,
+    2: UniqueChest,
+    3: EpicChest,
+    4: LegendaryChest,
+    5: MythicalChest
+}
+
+PORTAL_CLASSES = {
+    0: Portal,
+}
+
+NPC_CLASSES = {
+    0: OldMan,
+    1: Blacksmith,
+}
+
 pygame.init()
 pygame.display.set_caption('Some Simple Game')
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGTH))
+window = create_window((SCREEN_WIDTH, SCREEN_HEIGTH), WINDOW_SCALE, SDL_SCALING)
+presentation = Presentation(window)
+screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGTH))  # the menus are drawn at the logical size and presented
 
 # Set the full screen mode with the screen resolution
 # screen_width, screen_height = pygame.display.Info().current_w, pygame.display.Info().current_h
@@ -46,9 +108,12 @@ class Game:
     """
 
     def __init__(self):
-        self.screen = screen
-        self.display = pygame.Surface((DISPLAY_WIDTH, DISPLAY_HEIGTH), pygame.SRCALPHA)
+        self.presentation = presentation
+        self.outline = OutlineStage(OUTLINE_QUALITY)
+        self.display = self.outline.make_layer((DISPLAY_WIDTH, DISPLAY_HEIGTH))
         self.display_2 = pygame.Surface((DISPLAY_WIDTH, DISPLAY_HEIGTH))
+        self.render_queue = RenderQueue(self.display.get_size())
+        self.transition_effect = IrisTransition((DISPLAY_WIDTH, DISPLAY_HEIGTH), key_color=COLOR_SCHEMA['white'])
         self.clock = pygame.time.Clock()
         self.sfx = load_sfx()
         self.voices = load_voices()
@@ -57,7 +122,8 @@ class Game:
 
         self.assets = load_assets()
         self.clouds = Clouds(self.assets['clouds'])
-        self.raindrops = pygame.sprite.Group()
+        self.background = Background(self.assets['background'], self.display_2.get_size())
+        self.rain = Rain(self.display.get_size())
 
         self.map = Map(self, tile_size=16)
         self.ui = UI(self)
@@ -74,21 +140,27 @@ class Game:
             self.merchant_window
         )
 
-        self.projectiles = []
-        self.animated_projectiles = []
-        self.particles = []
-        self.sparks = []
-        self.munition = []
-        self.spells = []
-        self.effects = []
-        self.magic_effects = []
-        self.damage_rates = []
-        self.loot = []
-        self.chests = []
-        self.merchants = []
-        self.portals = []
-        self.enemies = []
-        self.npc_list = []
+        self.projectiles = EntityList()
+        self.animated_projectiles = EntityList()
+        self.particle_budget = ParticleBudget(PARTICLE_CAPS)
+        self.particles = ParticleSystem(self, budget=self.particle_budget)
+        self.sparks = SparkSystem(budget=self.particle_budget)
+        self.munition = EntityList()
+        self.spells = EntityList()
+        self.effects = EntityList()
+        self.magic_effects = EntityList()
+        self.damage_rates = EntityList()
+        self.loot = EntityList()
+        self.chests = EntityList()
+        self.merchants = EntityList()
+        self.portals = EntityList()
+        self.enemies = EntityList()
+        self.npc_list = EntityList()
+        self.entity_lists = (
+            self.enemies, self.loot, self.chests, self.npc_list, self.projectiles, self.animated_projectiles,
+            self.munition, self.spells, self.effects, self.magic_effects, self.damage_rates, self.merchants, self.portals
+        )
+        self.region_entities = defaultdict(list)  # region of a streamed level -> [(spawn point, object list, object)]
         self.quest_journal = QuestJournal(self)
 
         self.shaking_screen_effect = 0
@@ -116,8 +188,10 @@ class Game:
         ]
         for lst in lists_to_clear:
             lst.clear()
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("Particle budget: %s", self.particle_budget.report())
 
-        self.raindrops.empty()
+        self.rain.clear()
 
     def should_spawn_quest_item(self, i_type):
         print(f"[Check] Spawning quest item {i_type}? Completed quests: {[q.name for q in self.quest_journal.completed_quests]}")
@@ -145,7 +219,10 @@ class Game:
         :param map_id: Identifier of the level.
         """
         self.clear_lists()
-        self.map.load('data/maps/' + str(map_id) + '.json')
+        self.map.load(level_path('data/maps', map_id))
+        # the next level's background is prepared too, so nothing is scaled during the level transition
+        self.background.prepare(self.level)
+        self.background.prepare(min(self.level + 1, len(self.assets['background']) - 1))
         pygame.mixer.music.load(f'data/music/level{str(self.level)}.wav')
         pygame.mixer.music.set_volume(0.1)
         pygame.mixer.music.play(-1)
@@ -154,51 +231,51 @@ class Game:
         # calibrate the volume of sound effects
         volume_adjusting(self.sfx, self.volume_settings)
 
-        # placement of enemies on the level map in spawn locations
-        enemy_constructors = {
-            # 0 : this is player number
-            1: lambda pos: OrcArcher(self, pos),
-            2: lambda pos: BigZombie(self, pos),
-            3: lambda pos: BigDaemon(self, pos),
-            # 4 : this is merchant number
-            5: lambda pos: FireWorm(self, pos),
-            6: lambda pos: SupremeDaemon(self, pos),
-            7: lambda pos: Golem(self, pos),
-            8: lambda pos: HellsWatchdog(self, pos)
-        }
-
-        for spawner in self.map.extract([('spawners', i) for i in range(9)]):
-            variant = spawner['variant']
+        # placement of enemies, loot, chests, portals and npc on the level map in spawn locations
+        # (every spawn point of the level is extracted in one pass, grouped by layer)
+        spawns = self.map.extract_spawns()
+        for t_type in ('spawners', 'loot_spawn', 'chest_spawn', 'portal_spawn', 'npc_spawn'):
+            for tile in spawns[t_type]:
+                self.spawn_entity(tile)
+
+        self.artifacts_remaining = len([item for item in self.loot if isinstance(item, Gem)])
+
+        # regions of a streamed level around the player are loaded before the level starts
+        self.region_entities.clear()
+        if self.map.streamer is not None:
+            self.artifacts_remaining += self.map.streamer.count_spawns(
+                'loot_spawn', [variant for variant, loot_class in LOOT_CLASSES.items() if loot_class is Gem])
+            self.stream_level(wait=True)
+
+        # rain effect
+        if self.level in rain_on_levels:
+            self.rain.start(density=random.choice((100, 300, 500, 600)), wind=random.randint(1, 4))
+
+        self.scroll = [0, 0]
+        self.dead = False
+        self.transition = -30
+        self.death_timer = 60
+
+    def spawn_entity(self, tile):
+        """
+        Create the object of a spawn point and add it to the game.
+        :param tile: The spawn point tile extracted from the map.
+        :return: A tuple (list of objects, object), or None if nothing was spawned.
+        """
+        t_type, variant, pos = tile['type'], tile['variant'], tile['pos']
+        if t_type == 'spawners':
             if variant == 0:  # player
-                self.player.pos = spawner['pos']
+                self.player.pos = pos
                 self.player.air_time = 0
-            elif variant in enemy_constructors:
-                self.enemies.append(enemy_constructors[variant](spawner['pos']))
+            elif variant in ENEMY_CLASSES:
+                self.enemies.append(ENEMY_CLASSES[variant](self, pos))
+                return self.enemies, self.enemies[-1]
             elif variant == 4:  # merchant
-                self.merchants.append(Merchant(self, spawner['pos']))
-
-        # game loot
-        loot_id = {
-            0: Gem,
-            1: Coin,
-            2: HealthPoison,
-            3: MagicPoison,
-            4: StaminaPoison,
-            5: PowerPoison,
-            6: SpeedScroll,
-            7: BloodlustScroll,
-            8: HollyScroll,
-            9: InvulnerabilityScroll,
-            10: SteelKey,
-            11: RedKey,
-            12: BronzeKey,
-            13: PurpleKey,
-            14: GoldKey,
-            15: MagicCrystal
-        }
-
-        for item in self.map.extract([('loot_spawn', i) for i in loot_id.keys()]):
-            loot_class = loot_id.get(item['variant'])
+                self.merchants.append(Merchant(self, pos))
+                return self.merchants, self.merchants[-1]
+
+        elif t_type == 'loot_spawn':
+            loot_class = LOOT_CLASSES.get(variant)
             if loot_class:
                 # checking if it is a quest item
                 i_type = None
@@ -212,62 +289,58 @@ class Game:
                     print(f"Trying to spawn: {loot_class.__name__}, i_type={i_type}")
 
                     # це quest item → check if it needs to be spawned
-                    if self.should_spawn_quest_item(i_type):
-                        print(f"--> SPAWN ALLOWED for {i_type}")
-                        self.loot.append(loot_class(self, item['pos'], (16, 32)))
-                    else:
+                    if not self.should_spawn_quest_item(i_type):
                         print(f"--> BLOCKED spawn of {i_type}")
-                else:
-                    # an ordinary item is always a spawn
-                    self.loot.append(loot_class(self, item['pos'], (16, 32)))
-
-        chest_id = {
-            0: CommonChest,
-            1: RareChest,
-            2: UniqueChest,
-            3: EpicChest,
-            4: LegendaryChest,
-            5: MythicalChest
-        }
-
-        for chest in self.map.extract([('chest_spawn', i) for i in range(7)]):
-            chest_class = chest_id.get(chest['variant'])
-            if chest_class:
-                self.chests.append(chest_class(self, chest['pos'], (24, 24)))
+                        return None
+                    print(f"--> SPAWN ALLOWED for {i_type}")
 
-        self.artifacts_remaining = len([item for item in self.loot if isinstance(item, Gem)])
+                # an ordinary item is always a spawn
+                self.loot.append(loot_class(self, pos, (16, 32)))
+                return self.loot, self.loot[-1]
 
-        portal_id = {
-            0: Portal,
-        }
+        elif t_type == 'chest_spawn':
+            chest_class = CHEST_CLASSES.get(variant)
+            if chest_class:
+                self.chests.append(chest_class(self, pos, (24, 24)))
+                return self.chests, self.chests[-1]
 
-        for portal in self.map.extract([('portal_spawn', i) for i in range(1)]):
-            portal_type = portal_id.get(portal['variant'])
+        elif t_type == 'portal_spawn':
+            portal_type = PORTAL_CLASSES.get(variant)
             if portal_type:
-                self.portals.append(portal_type(self, portal['pos'], (128, 160)))
-
-        npc_id = {
-            0: OldMan,
-            1: Blacksmith,
-        }
+                self.portals.append(portal_type(self, pos, (128, 160)))
+                return self.portals, self.portals[-1]
 
-        for npc in self.map.extract([('npc_spawn', i) for i in range(2)]):
-            npc_type = npc_id.get(npc['variant'])
+        elif t_type == 'npc_spawn':
+            npc_type = NPC_CLASSES.get(variant)
             if npc_type:
-                self.npc_list.append(npc_type(self, npc['pos']))
+                self.npc_list.append(npc_type(self, pos))
+                return self.npc_list, self.npc_list[-1]
 
-        # rain effect
-        if self.level in rain_on_levels:
-            wind_strength = random.randint(1, 4)
-            rain_strength = random.choice((100, 300, 500, 600))
-            for _ in range(rain_strength):
-                x, y = random.randint(0, SCREEN_WIDTH), random.randint(0, SCREEN_HEIGTH)
-                self.raindrops.add(Raindrop(x, y, wind_strength))  # type: ignore
+        return None
 
-        self.scroll = [0, 0]
-        self.dead = False
-        self.transition = -30
-        self.death_timer = 60
+    def stream_level(self, wait=False):
+        """
+        Load the regions of a streamed level around the player and spawn their objects,
+        release distant regions and despawn the objects that are still there.
+        Spawn points of killed enemies and picked up items are consumed, opened chests stay on the map.
+        :param wait: Block until every region around the player is loaded.
+        """
+        view = pygame.Rect(0, 0, DISPLAY_WIDTH, DISPLAY_HEIGTH)
+        view.center = self.player.rect().center
+        loaded, released = self.map.stream(view, wait)
+
+        for region in released:
+            for tile, objects, entity in self.region_entities.pop(region, ()):
+                if entity in objects and not getattr(entity, 'is_opened', False):
+                    objects.remove(entity)
+                else:
+                    self.map.streamer.consume(region, tile)
+
+        for region, tiles in loaded:
+            for tile in tiles:
+                spawned = self.spawn_entity(tile)
+                if spawned:
+                    self.region_entities[region].append((tile, *spawned))
 
     def projectile_impact(self, projectile):
         """
@@ -275,10 +348,9 @@ class Game:
         :param projectile:
         """
         self.sfx['arrow_crash'].play()
-        for i in range(4):
-            self.sparks.append(
-                Spark(projectile[0], random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0),
-                      2 + random.random(), 'white'))
+        for i in range(self.sparks.thin(4, PRIORITY_AMBIENT)):
+            self.sparks.add(projectile[0], random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0),
+                            2 + random.random(), 'white', priority=PRIORITY_AMBIENT)
 
     def harming_the_player(self):
         """
@@ -296,7 +368,7 @@ class Game:
             if self.player.current_health > 0:
                 self.sfx['pain'].play()
                 self.shaking_screen_effect = max(16, self.shaking_screen_effect)
-                create_particles(self, self.player.rect(), num_particles=(10, 15))
+                create_particles(self, self.player.rect(), num_particles=(10, 15), priority=PRIORITY_PLAYER)
 
     def handling_player_damage(self, damage=1, damage_type='physical'):
         voice = str(random.randint(1, 3))
@@ -313,6 +385,18 @@ class Game:
                 self.player.current_health += 30
                 return True
 
+    def update_enemy_sight(self):
+        """
+        Refresh the line of sight from every enemy to the player with one batched raycast.
+        """
+        if not self.enemies:
+            return
+        target = self.player.rect().center
+        hits, _ = self.map.raycast_many([enemy.rect().center for enemy in self.enemies],
+                                        [target] * len(self.enemies))
+        for enemy, hit in zip(self.enemies, hits.tolist()):
+            enemy.sees_player = not hit
+
     def remove_enemy(self, enemy):
 
         if enemy in self.enemies:
@@ -336,7 +420,7 @@ class Game:
             """
             This function prepare all parameters before next level and call load_level method.
             """
-            self.level = min(self.level + 1, len(os.listdir('data/maps')) - 1)
+            self.level = min(self.level + 1, count_levels('data/maps') - 1)
             self.player.current_health = self.player.max_health
             self.player.stamina = self.player.max_stamina
             self.player.mana = self.player.max_mana
@@ -359,8 +443,7 @@ class Game:
         # It processes all events that occur at a level in the game.
         while not self.game_over:
             self.display.fill((0, 0, 0, 0))
-            self.display_2.blit(pygame.transform.scale(self.assets['background'][self.level],
-                                                       self.display_2.get_size()), (0, 0))
+            self.background.render(self.display_2, self.level, offset=self.scroll)
             self.shaking_screen_effect = max(0, self.shaking_screen_effect - 1)
 
             # checking the level completion
@@ -385,44 +468,71 @@ class Game:
             self.scroll[1] += ((self.player.rect().centery + offset_y) - DISPLAY_HEIGTH / 2 - self.scroll[1]) / 30
             render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
 
+            # world objects submit their sprites to the render queue, which is drawn after the world update
+            items_layer = self.render_queue.layer(LAYER_ITEMS)
+            characters_layer = self.render_queue.layer(LAYER_CHARACTERS)
+            projectiles_layer = self.render_queue.layer(LAYER_PROJECTILES)
+            effects_layer = self.render_queue.layer(LAYER_EFFECTS)
+            damage_layer = self.render_queue.layer(LAYER_DAMAGE)
+            particles_layer = self.render_queue.layer(LAYER_PARTICLES)
+            self.render_queue.set_camera(render_scroll)
+            visible = self.render_queue.visible
+
             # updating and rendering clouds
             self.clouds.update()
             self.clouds.render(self.display_2, offset=render_scroll)
 
             # render map
+            self.stream_level()
             self.map.render(self.display, offset=render_scroll)
             self.map.update_animated_tiles()
 
             # updating and rendering items on map
             for item in self.loot:
-                item.update()
-                item.render(self.display, offset=render_scroll)
+                on_screen = visible(item)
+                if on_screen or not SKIP_OFFSCREEN_UPDATES:
+                    item.update()
+                if on_screen:
+                    item.render(items_layer, offset=render_scroll)
 
             # updating and rendering chests on map
             for chest in self.chests:
-                chest.update()
-                chest.render(self.display, offset=render_scroll)
+                on_screen = visible(chest)
+                if on_screen or not SKIP_OFFSCREEN_UPDATES:
+                    chest.update()
+                if on_screen:
+                    chest.render(items_layer, offset=render_scroll)
 
             # updating and rendering portals on map
             for portal in self.portals:
                 portal.update()
-                portal.render(self.display, offset=render_scroll)
+                if visible(portal):
+                    portal.render(items_layer, offset=render_scroll)
 
             # updating and rendering traders on map
             for merchant in self.merchants:
-                merchant.update()
-                merchant.render(self.display, offset=render_scroll)
+                on_screen = visible(merchant)
+                if on_screen or not SKIP_OFFSCREEN_UPDATES:
+                    merchant.update()
+                if on_screen:
+                    merchant.render(characters_layer, offset=render_scroll)
 
             # updating and rendering non-player characters on map
             for npc in self.npc_list:
-                npc.update()
-                npc.render(self.display, offset=render_scroll)
+                on_screen = visible(npc)
+                if on_screen or not SKIP_OFFSCREEN_UPDATES:
+                    npc.update()
+                if on_screen:
+                    npc.render(characters_layer, offset=render_scroll)
 
             # updating state and rendering enemies
-            for enemy in self.enemies[:]:
+            if self.map.tick % ENEMY_SIGHT_INTERVAL == 0:
+                self.update_enemy_sight()
+            for enemy in self.enemies:
                 if not enemy.update(self.map, (0, 0)):
                     # logging.debug(f"Rendering enemy {enemy}.")
-                    enemy.render(self.display, offset=render_scroll)
+                    if visible(enemy):
+                        enemy.render(characters_layer, offset=render_scroll)
                 else:
                     # logging.debug(f"Removing enemy {enemy}.")
                     if enemy in self.enemies:
@@ -452,19 +562,19 @@ class Game:
 
             if not self.dead:
                 self.player.update(self.map, (self.movement[1] - self.movement[0], 0))
-                self.player.render(self.display, offset=render_scroll)
+                self.player.render(characters_layer, offset=render_scroll)
                 if self.player.dying:
                     self.death_timer -= 1
                     if self.death_timer <= 0:
                         self.dead = True
 
             # processing of conventional projectiles
-            for projectile in self.projectiles.copy():
+            for projectile in self.projectiles:
                 projectile_pos = (projectile[0][0] - render_scroll[0], projectile[0][1] - render_scroll[1])
                 img = self.assets[projectile[-1]]
-                flipped_projectile = pygame.transform.flip(img, math.copysign(1, projectile[1]) < 0, False)
-                self.display.blit(flipped_projectile, (projectile_pos[0] - flipped_projectile.get_width() / 2,
-                                                       projectile_pos[1] - flipped_projectile.get_height() / 2))
+                flipped_projectile = flipped(img) if math.copysign(1, projectile[1]) < 0 else img
+                projectiles_layer.blit(flipped_projectile, (projectile_pos[0] - flipped_projectile.get_width() / 2,
+                                                            projectile_pos[1] - flipped_projectile.get_height() / 2))
                 projectile[0][0] += 2 * projectile[1]
                 projectile[2] += 1
 
@@ -479,7 +589,7 @@ class Game:
                     self.harming_the_player()
 
             # processing animated projectiles
-            for projectile in self.animated_projectiles.copy():
+            for projectile in self.animated_projectiles:
                 if self.player.rect().colliderect(projectile.rect()):
                     projectile_name = projectile.__class__.__name__  # name of the class in str form from class instance
                     damage = PROJECTILE_DAMAGE.get(projectile_name, 1)  # obtain the damage value for the projectile
@@ -494,8 +604,8 @@ class Game:
 
                         for i in range(30):
                             angle = random.random() * math.pi * 2
-                            self.sparks.append(
-                                Spark(self.player.rect().center, angle, 2 + random.random(), 'fireball'))
+                            self.sparks.add(self.player.rect().center, angle, 2 + random.random(), 'fireball',
+                                            priority=PRIORITY_PLAYER)
 
                     elif isinstance(projectile, SkullSmoke):
                         if not self.player.invulnerability:
@@ -506,8 +616,8 @@ class Game:
                                 self.animated_projectiles.remove(projectile)
                                 for i in range(50):
                                     angle = random.random() * math.pi * 4
-                                    self.sparks.append(
-                                        Spark(self.player.rect().center, angle, 2 + random.random(), 'toxic'))
+                                    self.sparks.add(self.player.rect().center, angle, 2 + random.random(), 'toxic',
+                                                    priority=PRIORITY_PLAYER)
 
                     elif isinstance(projectile, ToxicExplosion):
                         self.handling_player_damage(damage=damage)
@@ -530,28 +640,22 @@ class Game:
                                 projectile.damage = 0
 
                 kill = projectile.update()
-                projectile.render(self.display, offset=render_scroll)
+                if visible(projectile):
+                    projectile.render(projectiles_layer, offset=render_scroll)
                 if kill or projectile.animation.done:
-                    try:
-                        self.animated_projectiles.remove(projectile)
-                    except ValueError:
-                        pass
+                    self.animated_projectiles.remove(projectile)
 
-            # spark handling
-            for spark in self.sparks.copy():
-                spark.update()
-                spark.render(self.display, offset=render_scroll)
-                if spark.update():
-                    self.sparks.remove(spark)
+            # spark handling (sparks move two steps per frame)
+            self.sparks.update(steps=2)
+            self.sparks.render(effects_layer, offset=render_scroll)
 
             # long-range player's weapon handling
-            for slug in self.munition.copy():
+            for slug in self.munition:
                 if self.map.checking_physical_tiles(slug.pos):
                     self.sfx['suriken_rebound'].play()
-                    for i in range(4):
-                        self.sparks.append(
-                            Spark(slug.pos, random.random() - 0.5 + (math.pi if slug.direction > 0 else 0),
-                                  2 + random.random(), 'white'))
+                    for i in range(self.sparks.thin(4, PRIORITY_AMBIENT)):
+                        self.sparks.add(slug.pos, random.random() - 0.5 + (math.pi if slug.direction > 0 else 0),
+                                        2 + random.random(), 'white', priority=PRIORITY_AMBIENT)
                     slug.direction *= -1
                     slug.recoil = True
 
@@ -561,15 +665,16 @@ class Game:
                     self.sfx['pain'].play()
                     for i in range(10):
                         angle = random.random() * math.pi * 2
-                        self.sparks.append(Spark(self.player.rect().center, angle, 2 + random.random()))
+                        self.sparks.add(self.player.rect().center, angle, 2 + random.random(), priority=PRIORITY_PLAYER)
 
                 kill = slug.update()
-                slug.render(self.display, offset=render_scroll)
+                if visible(slug):
+                    slug.render(effects_layer, offset=render_scroll)
                 if kill:
                     self.munition.remove(slug)
 
             # magic spells handling
-            for spell in self.spells.copy():
+            for spell in self.spells:
                 if isinstance(spell, HollySpell):
                     self.player.current_health = 100
                     self.player.stamina = 100
@@ -587,42 +692,48 @@ class Game:
                     self.sfx['invulnerability_spell'].play()
 
                 kill = spell.update()
-                spell.render(self.display, offset=render_scroll)
+                if visible(spell):
+                    spell.render(effects_layer, offset=render_scroll)
                 if kill or spell.animation.done:
                     self.spells.remove(spell)
 
             # updating and rendering VFX
             for effect in self.effects:
                 effect.update()
-                effect.render(self.display, offset=render_scroll)
+                if visible(effect):
+                    effect.render(effects_layer, offset=render_scroll)
                 if effect.animation.done:
                     self.effects.remove(effect)
 
             # updating and rendering VFX
             for magic_effect in self.magic_effects:
                 magic_effect.update()
-                magic_effect.render(self.display, offset=render_scroll)
+                if visible(magic_effect):
+                    magic_effect.render(effects_layer, offset=render_scroll)
                 if magic_effect.animation.done or magic_effect.hit_on_target:
                     self.magic_effects.remove(magic_effect)
 
             # updating and rendering damage info
-            for damage in self.damage_rates.copy():
+            for damage in self.damage_rates:
                 damage.update()
-                damage.render(self.display, offset=render_scroll)
+                if visible(damage):
+                    damage.render(damage_layer, offset=render_scroll)
                 if damage.timer <= 0:
                     self.damage_rates.remove(damage)
 
             # updating and rendering particles
-            for particle in self.particles.copy():
-                kill = particle.update()
-                particle.render(self.display, offset=render_scroll)
-                if kill:
-                    self.particles.remove(particle)
+            self.particles.update()
+            self.particles.render(particles_layer, offset=render_scroll)
+
+            # dropping the objects removed in this frame
+            for entities in self.entity_lists:
+                entities.compact()
 
-            # updating raindrops
-            for raindrop in self.raindrops:
-                raindrop.update()
-            self.raindrops.draw(self.display)
+            self.render_queue.flush(self.display)
+
+            # updating and rendering raindrops
+            self.rain.update()
+            self.rain.render(self.display)
 
             # rendering user interface
             self.ui.render()
@@ -653,22 +764,14 @@ class Game:
                 self.player_controller.handle_events(event, keys)
 
             if self.transition:
-                color = COLOR_SCHEMA['white']
-                trans_mapping = pygame.Surface(self.display.get_size())
-                pygame.draw.circle(trans_mapping, color, (DISPLAY_WIDTH // 2, DISPLAY_HEIGTH // 2),
-                                   (30 - abs(self.transition)) * 8)
-                trans_mapping.set_colorkey(color)
-                self.display.blit(trans_mapping, (0, 0))
-
-            display_mask = pygame.mask.from_surface(self.display)
-            display_outline = display_mask.to_surface(setcolor=(0, 0, 0, 180), unsetcolor=(0, 0, 0, 0))
+                self.transition_effect.render(self.display, self.transition)
+
+            self.outline.apply(self.display, self.display_2)
             sse_offset = (random.random() * self.shaking_screen_effect - self.shaking_screen_effect / 2,
                           random.random() * self.shaking_screen_effect - self.shaking_screen_effect / 2)
-            for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                self.display_2.blit(display_outline, offset)
 
             self.display_2.blit(self.display, (0, 0))
-            self.screen.blit(pygame.transform.scale(self.display_2, self.screen.get_size()), sse_offset)
+            self.presentation.present(self.display_2, sse_offset)
             pygame.display.update()
             self.clock.tick(60)
 
@@ -766,6 +869,7 @@ class Menu:
             pygame.draw.rect(self.screen, (255, 255, 255), (progress_bar_rect.left, progress_bar_rect.top,
                                                             progress * progress_bar_width // 100, progress_bar_height))
 
+            presentation.present(self.screen)
             pygame.display.flip()
             progress += 1
             pygame.time.delay(30)
@@ -824,6 +928,7 @@ class Menu:
             self.update_overlay_alpha()
             self.update_overlay_rotation()
 
+            presentation.present(self.screen)
             pygame.display.flip()
             self.clock.tick(30)
 
@@ -847,6 +952,7 @@ def main():
     restart_text = game.ui.font4.render("Press E to restart the game, or Q to quit", True, (255, 255, 255))
     restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGTH // 2 + 50))
     screen.blit(restart_text, restart_rect)
+    presentation.present(screen)
     pygame.display.update()
 
     pygame.mixer.music.set_volume(0.1)
@@ -8,6 +8,7 @@ from typing import Any
 from support import BASE_IMG_PATH, load_image
 from data import EQUIPMENT, EQUIPMENTS_CATEGORIES, BOOKS
 from projectile import Necromancy
+from particle import PRIORITY_PLAYER
 
 
 class GameLoot:
@@ -66,7 +67,7 @@ class GameLoot:
 
         quest_items = ['magic_crystal', 'blood_vial', 'lost_artifact']
 
-        for loot_item in self.game.loot.copy():
+        for loot_item in self.game.loot:
             if loot_item.rect.colliderect(self.game.player.rect()):
                 print(f"Collided with loot: {loot_item}, i_type={loot_item.i_type}, name={loot_item.name}")
                 sound = self.game.sfx.get(loot_item.i_type, self.game.sfx['default_item_equip'])
@@ -104,8 +105,12 @@ class GameLoot:
 
                 self.game.loot.remove(loot_item)
 
+    def cull_rect(self):
+        """Returns the area the object draws in, used to cull it against the camera."""
+        return self.rect.union(self.animation.current_sprite().get_rect(topleft=self.pos))
+
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
+        surf.blit(self.animation.current_sprite(self.flip),
                   (self.pos[0] - offset[0], self.pos[1] - 2 - offset[1]))
         # pygame.draw.rect(surf, (0, 0, 255), (self.rect.x - offset[0], self.rect.y - offset[1],
         #                                      self.rect.width, self.rect.height), 1)
@@ -296,7 +301,8 @@ class DungeonShadows(Book, GameLoot):
 
     def read(self):
         self.game.player.necromancy = True
-        self.game.effects.append(Necromancy(self.game, self.game.player.hitbox.midtop, 0))
+        self.game.particle_budget.append(self.game.effects, Necromancy(self.game, self.game.player.hitbox.midtop, 0),
+                                         'effects', PRIORITY_PLAYER)
 
 
 class ForgottenSouls(Book, GameLoot):
@@ -582,12 +588,16 @@ class Merchant:
     def update(self):
         self.animation.update()
 
-        for trader in self.game.merchants.copy():
+        for trader in self.game.merchants:
             if trader.rect.colliderect(self.game.player.rect()):
                 pass
 
+    def cull_rect(self):
+        """Returns the area the object draws in, used to cull it against the camera."""
+        return self.rect.union(self.animation.current_sprite().get_rect(topleft=self.pos))
+
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
+        surf.blit(self.animation.current_sprite(self.flip),
                   (self.pos[0] - offset[0], self.pos[1] - offset[1]))
 
 
@@ -0,0 +1,158 @@
+"""
+Compact binary level format (*.lvl).
+
+Layout (little-endian, every section starts on an 8-byte boundary):
+    header          magic, version, meta length and record counts
+    meta            UTF-8 JSON: tile size, chunk size, tile type names, extra tile properties
+    chunk table     int32 (n_chunks, 2) - chunk coordinates
+    tile types      int16 (n_chunks, chunk_size, chunk_size) - type ids (0 - empty cell)
+    tile variants   int16 (n_chunks, chunk_size, chunk_size)
+    offgrid         OFFGRID_RECORD (n_offgrid) - decor placed outside the grid
+    spawners        SPAWNER_RECORD (n_spawners) - spawn points of the player, enemies, loot, chests, portals, npc
+"""
+
+import os
+import json
+import mmap
+import struct
+
+import numpy as np
+
+
+LEVEL_EXTENSION = '.lvl'
+LEVEL_MAGIC = b'SPGLEVEL'
+LEVEL_VERSION = 1
+HEADER = struct.Struct('<8sHxxIIIII')  # magic, version, meta_len, chunk_size, n_chunks, n_offgrid, n_spawners
+ALIGNMENT = 8
+
+SPAWN_TYPES = {'spawners', 'loot_spawn', 'chest_spawn', 'portal_spawn', 'npc_spawn'}
+
+OFFGRID_RECORD = np.dtype([('type', '<u2'), ('variant', '<u2'), ('pad', '<u4'), ('x', '<f8'), ('y', '<f8')])
+SPAWNER_RECORD = np.dtype([('type', '<u2'), ('variant', '<u2'), ('ongrid', '<u4'), ('x', '<f8'), ('y', '<f8')])
+
+
+def aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_level(path, level):
+    """
+    Write a level into the binary format.
+    :param path: The path to save the file.
+    :param level: Dictionary with the level data in the form returned by read_level.
+    """
+    meta = json.dumps({
+        'tile_size': level['tile_size'],
+        'types': level['type_names'],
+        'extras': {f"{x};{y}": extras for (x, y), extras in level['extras'].items()},
+        'offgrid_extras': level.get('offgrid_extras', {}),
+        'spawner_extras': level.get('spawner_extras', {}),
+    }, separators=(',', ':')).encode('utf-8')
+
+    chunk_coords = np.asarray(level['chunk_coords'], dtype='<i4').reshape(-1, 2)
+    types = np.asarray(level['types'], dtype='<i2')
+    variants = np.asarray(level['variants'], dtype='<i2')
+    sections = [meta, chunk_coords.tobytes(), types.tobytes(), variants.tobytes(),
+                np.asarray(level['offgrid'], dtype=OFFGRID_RECORD).tobytes(),
+                np.asarray(level['spawners'], dtype=SPAWNER_RECORD).tobytes()]
+
+    with open(path, 'wb') as f:
+        header = HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, len(meta), level['chunk_size'], len(chunk_coords),
+                             len(level['offgrid']), len(level['spawners']))
+        f.write(header + bytes(aligned(len(header)) - len(header)))
+        for section in sections:
+            f.write(section + bytes(aligned(len(section)) - len(section)))
+
+
+def read_level(path):
+    """
+    Read a level from the binary format through a memory map.
+    Tile arrays are copy-on-write views of the mapped file, so only the pages that are touched get read from disk.
+    :param path: The path to the level file.
+    :return: Dictionary with the level data.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    magic, version, meta_len, chunk_size, n_chunks, n_offgrid, n_spawners = HEADER.unpack_from(buffer, 0)
+    if magic != LEVEL_MAGIC:
+        raise ValueError(f"{path} is not a level file.")
+    if version != LEVEL_VERSION:
+        raise ValueError(f"Unsupported level file version {version} in {path}.")
+
+    offset = aligned(HEADER.size)
+    meta = json.loads(bytes(buffer[offset:offset + meta_len]).decode('utf-8'))
+    offset += aligned(meta_len)
+
+    def section(dtype, count, shape=None):
+        nonlocal offset
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        offset += aligned(array.nbytes)
+        return array.reshape(shape) if shape else array
+
+    chunk_area = chunk_size * chunk_size
+    chunk_coords = section('<i4', n_chunks * 2, (n_chunks, 2))
+    types = section('<i2', n_chunks * chunk_area, (n_chunks, chunk_size, chunk_size))
+    variants = section('<i2', n_chunks * chunk_area, (n_chunks, chunk_size, chunk_size))
+    offgrid = section(OFFGRID_RECORD, n_offgrid)
+    spawners = section(SPAWNER_RECORD, n_spawners)
+
+    return {
+        'tile_size': meta['tile_size'],
+        'chunk_size': chunk_size,
+        'type_names': meta['types'],
+        'extras': {tuple(int(coord) for coord in loc.split(';')): extras for loc, extras in meta['extras'].items()},
+        'offgrid_extras': meta['offgrid_extras'],
+        'spawner_extras': meta['spawner_extras'],
+        'chunk_coords': chunk_coords,
+        'types': types,
+        'variants': variants,
+        'offgrid': offgrid,
+        'spawners': spawners,
+    }
+
+
+def level_path(directory, map_id):
+    """
+    Get the path of a level map, preferring the binary format when it exists.
+    A binary file older than the JSON map next to it is stale (the map was edited after the conversion),
+    so the JSON map is used then until the maps are converted again.
+    :param directory: The directory with level maps.
+    :param map_id: Identifier of the level.
+    :return: The path to the map file.
+    """
+    binary_path = os.path.join(directory, str(map_id) + LEVEL_EXTENSION)
+    json_path = os.path.join(directory, str(map_id) + '.json')
+    if not os.path.exists(binary_path):
+        return json_path
+    if os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(binary_path):
+        return json_path
+    return binary_path
+
+
+def count_levels(directory):
+    """
+    Count levels in a directory that can hold both JSON and binary versions of the same map.
+    """
+    return len({os.path.splitext(name)[0] for name in os.listdir(directory)
+                if name.endswith(('.json', LEVEL_EXTENSION))})
+
+
+def convert_maps(directory='data/maps'):
+    """
+    Convert every JSON level map in a directory into the binary format next to it.
+    :param directory: The directory with level maps.
+    """
+    from map import Map
+
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            game_map = Map(None)
+            game_map.load(os.path.join(directory, name))
+            target = os.path.join(directory, os.path.splitext(name)[0] + LEVEL_EXTENSION)
+            game_map.save(target)
+            print(f"Converted: {name} -> {os.path.basename(target)}")
+
+
+if __name__ == '__main__':
+    convert_maps()
@@ -1,8 +1,15 @@
 import json
+import math
 import itertools
 
+from collections import defaultdict
+
+import numpy as np
 import pygame
 
+from level_format import LEVEL_EXTENSION, SPAWN_TYPES, OFFGRID_RECORD, SPAWNER_RECORD, read_level, write_level
+from streaming import ChunkStreamer, STREAMING_MIN_CHUNKS
+
 
 AUTOMAP = {
     frozenset([(1, 0), (0, 1)]): 0,
@@ -17,10 +24,375 @@ AUTOMAP = {
 }
 
 
+# neighbor bit of each direction in the auto-tiling bitmask
+AUTOMAP_BITS = {(1, 0): 1, (-1, 0): 2, (0, -1): 4, (0, 1): 8}
+
+# bitmask of same-type neighbors -> tile variant (-1 - keep the current variant)
+AUTOMAP_LOOKUP = np.array([AUTOMAP.get(frozenset(shift for shift, bit in AUTOMAP_BITS.items() if mask & bit), -1)
+                           for mask in range(16)], dtype=np.int16)
+
+
 NEIGHBOR_OFFSETS = [(x, y) for x in range(-1, 2) for y in range(-1, 2)]
 PHYSICS_TILES = {'grass', 'stone', 'terrain'}
 AUTO_TYPES = {'grass', 'stone', 'terrain'}
 
+CHUNK_SIZE = 16  # width and height of one chunk of the tile grid (in tiles)
+EMPTY_TILE = 0   # type id of an empty grid cell
+
+
+class TileChunk:
+    """
+    A square block of the tile grid that keeps tile types and variants in integer arrays.
+    Arrays are indexed as [local_y, local_x].
+    """
+    def __init__(self, size=CHUNK_SIZE):
+        self.types = np.zeros((size, size), dtype=np.int16)
+        self.variants = np.zeros((size, size), dtype=np.int16)
+        self.solid = np.zeros((size, size), dtype=bool)
+        self.count = 0
+
+
+class ChunkedTilemap:
+    """
+    Chunked array-backed storage of the on-grid tiles of a level.
+    Tile types are registered as integer ids, so lookups are done with integer arithmetic
+    and array indexing instead of formatting and hashing "x;y" string keys.
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        """
+        Initializes the ChunkedTilemap object.
+        :param chunk_size: The width and height of one chunk in tiles.
+        """
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.type_names = [None]  # type id -> type name (id 0 is reserved for empty cells)
+        self.type_ids = {}        # type name -> type id
+        self.extras = {}          # (x, y) -> additional tile properties, e.g. animation_speed
+        self.dirty = set()        # chunks changed since the last render (their cached surfaces are stale)
+        self.locations = defaultdict(set)  # (type, variant) -> {(x, y)} of non-physical tiles
+        self.solid_lookup = None  # type id -> physical flag of the types registered from a binary level file
+        self.count = 0
+
+    def type_id(self, t_type):
+        """
+        Get the integer id of a tile type, registering the type if it is new.
+        :param t_type: The tile type name.
+        :return: The integer type id.
+        """
+        if t_type not in self.type_ids:
+            self.type_ids[t_type] = len(self.type_names)
+            self.type_names.append(t_type)
+        return self.type_ids[t_type]
+
+    def chunk_at(self, x, y):
+        """
+        Get the chunk containing a tile and the tile's local coordinates inside it.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        :return: A tuple (chunk or None, local_x, local_y).
+        """
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        return self.chunks.get((cx, cy)), lx, ly
+
+    def set(self, x, y, t_type, variant, extras=None):
+        """
+        Place a tile on the grid, replacing any tile at the same location.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        :param t_type: The tile type name.
+        :param variant: The tile variant.
+        :param extras: Optional dictionary with additional tile properties.
+        """
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = self.chunks[(cx, cy)] = TileChunk(self.chunk_size)
+        self.dirty.add((cx, cy))
+        if chunk.types[ly, lx] == EMPTY_TILE:
+            chunk.count += 1
+            self.count += 1
+        elif not chunk.solid[ly, lx]:
+            self.unindex(x, y, chunk.types[ly, lx], chunk.variants[ly, lx])
+        chunk.types[ly, lx] = self.type_id(t_type)
+        chunk.variants[ly, lx] = variant
+        chunk.solid[ly, lx] = t_type in PHYSICS_TILES
+        if not chunk.solid[ly, lx]:
+            self.locations[(t_type, int(variant))].add((x, y))
+        if extras:
+            self.extras[(x, y)] = dict(extras)
+        else:
+            self.extras.pop((x, y), None)
+
+    def set_variant(self, x, y, variant):
+        """
+        Change the variant of an existing tile.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        :param variant: The new tile variant.
+        """
+        chunk, lx, ly = self.chunk_at(x, y)
+        if chunk is not None and chunk.types[ly, lx] != EMPTY_TILE:
+            if not chunk.solid[ly, lx]:
+                self.unindex(x, y, chunk.types[ly, lx], chunk.variants[ly, lx])
+                self.locations[(self.type_names[chunk.types[ly, lx]], int(variant))].add((x, y))
+            chunk.variants[ly, lx] = variant
+            self.dirty.add((x // self.chunk_size, y // self.chunk_size))
+
+    def remove(self, x, y):
+        """
+        Remove a tile from the grid. Empty chunks are released.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        """
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None or chunk.types[ly, lx] == EMPTY_TILE:
+            return
+        if not chunk.solid[ly, lx]:
+            self.unindex(x, y, chunk.types[ly, lx], chunk.variants[ly, lx])
+        chunk.types[ly, lx] = EMPTY_TILE
+        chunk.variants[ly, lx] = 0
+        chunk.solid[ly, lx] = False
+        chunk.count -= 1
+        self.count -= 1
+        self.extras.pop((x, y), None)
+        self.dirty.add((cx, cy))
+        if not chunk.count:
+            del self.chunks[(cx, cy)]
+
+    def unindex(self, x, y, type_id, variant):
+        """
+        Remove a tile location from the (type, variant) index.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        :param type_id: The integer type id of the tile.
+        :param variant: The tile variant.
+        """
+        key = (self.type_names[type_id], int(variant))
+        locations = self.locations.get(key)
+        if locations is not None:
+            locations.discard((x, y))
+            if not locations:
+                del self.locations[key]
+
+    def find(self, t_type, variant):
+        """
+        Get locations of all tiles of a type and variant.
+        Non-physical tiles (spawn points, decor) are looked up in the index, physical ones are searched chunk by chunk.
+        :param t_type: The tile type name.
+        :param variant: The tile variant.
+        :return: A sorted list of (x, y) tile coordinates.
+        """
+        if t_type not in PHYSICS_TILES:
+            return sorted(self.locations.get((t_type, variant), ()))
+        type_id = self.type_ids.get(t_type)
+        locations = []
+        for (cx, cy), chunk in self.chunks.items():
+            ys, xs = np.nonzero((chunk.types == type_id) & (chunk.variants == variant))
+            locations.extend((cx * self.chunk_size + lx, cy * self.chunk_size + ly)
+                             for ly, lx in zip(ys.tolist(), xs.tolist()))
+        return sorted(locations)
+
+    def get(self, x, y):
+        """
+        Get a tile in the legacy dictionary form.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        :return: A new tile dictionary or None if the cell is empty.
+        """
+        chunk, lx, ly = self.chunk_at(x, y)
+        if chunk is None:
+            return None
+        type_id = chunk.types[ly, lx]
+        if type_id == EMPTY_TILE:
+            return None
+        return self.make_tile(x, y, type_id, chunk.variants[ly, lx])
+
+    def make_tile(self, x, y, type_id, variant):
+        """
+        Build a tile dictionary in the JSON map format.
+        """
+        tile = {'type': self.type_names[type_id], 'variant': int(variant), 'pos': [x, y]}
+        if (x, y) in self.extras:
+            tile.update(self.extras[(x, y)])
+        return tile
+
+    def is_solid(self, x, y):
+        """
+        Check whether a grid cell contains a physics tile.
+        :param x: The tile x-coordinate.
+        :param y: The tile y-coordinate.
+        :return: True if the cell is solid.
+        """
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        chunk = self.chunks.get((cx, cy))
+        return chunk is not None and bool(chunk.solid[ly, lx])
+
+    def items(self):
+        """
+        Iterate over all tiles of the grid.
+        :return: A generator of ((x, y), tile dictionary) pairs.
+        """
+        for (cx, cy), chunk in list(self.chunks.items()):
+            ys, xs = np.nonzero(chunk.types)
+            for ly, lx in zip(ys.tolist(), xs.tolist()):
+                x, y = cx * self.chunk_size + lx, cy * self.chunk_size + ly
+                yield (x, y), self.make_tile(x, y, chunk.types[ly, lx], chunk.variants[ly, lx])
+
+    def clear(self):
+        """
+        Remove all tiles and registered types.
+        """
+        self.dirty.update(self.chunks)
+        self.chunks.clear()
+        self.extras.clear()
+        self.locations.clear()
+        self.type_names = [None]
+        self.type_ids = {}
+        self.count = 0
+
+    def load_dict(self, tilemap):
+        """
+        Fill the grid from a tilemap dictionary in the JSON map format ("x;y" -> tile).
+        :param tilemap: The tilemap dictionary.
+        """
+        self.clear()
+        for tile in tilemap.values():
+            extras = {key: value for key, value in tile.items() if key not in ('type', 'variant', 'pos')}
+            self.set(int(tile['pos'][0]), int(tile['pos'][1]), tile['type'], tile['variant'], extras)
+
+    def region_types(self, x, y, width, height):
+        """
+        Gather tile type ids of a rectangular area of the grid that may span several chunks.
+        :param x: The left tile x-coordinate.
+        :param y: The top tile y-coordinate.
+        :param width: The width of the area in tiles.
+        :param height: The height of the area in tiles.
+        :return: Array (height, width) of type ids.
+        """
+        region = np.zeros((height, width), dtype=np.int16)
+        size = self.chunk_size
+        for cy in range(y // size, (y + height - 1) // size + 1):
+            for cx in range(x // size, (x + width - 1) // size + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    continue
+                left, top = max(x, cx * size), max(y, cy * size)
+                right, bottom = min(x + width, (cx + 1) * size), min(y + height, (cy + 1) * size)
+                region[top - y:bottom - y, left - x:right - x] = \
+                    chunk.types[top - cy * size:bottom - cy * size, left - cx * size:right - cx * size]
+        return region
+
+    def prepare_types(self, chunk_size, type_names, extras):
+        """
+        Clear the grid and register the tile types and extra properties of a binary level file.
+        :param chunk_size: The width and height of one chunk in tiles.
+        :param type_names: Tile type names indexed by type id (index 0 - empty cell).
+        :param extras: Dictionary (x, y) -> additional tile properties.
+        """
+        self.clear()
+        self.chunk_size = chunk_size
+        self.type_names = [None] + list(type_names[1:])
+        self.type_ids = {t_type: type_id for type_id, t_type in enumerate(self.type_names) if type_id}
+        self.solid_lookup = np.array([t_type in PHYSICS_TILES for t_type in self.type_names], dtype=bool)
+        self.extras = {loc: dict(tile_extras) for loc, tile_extras in extras.items()}
+
+    def make_chunk(self, types, variants):
+        """
+        Wrap tile arrays of one chunk from a binary level file (types registered by prepare_types).
+        :param types: Array (chunk_size, chunk_size) with tile type ids.
+        :param variants: Array (chunk_size, chunk_size) with tile variants.
+        :return: The TileChunk object or None if the chunk is empty.
+        """
+        count = int(np.count_nonzero(types))
+        if not count:
+            return None
+        chunk = TileChunk.__new__(TileChunk)
+        chunk.types = types
+        chunk.variants = variants
+        chunk.solid = self.solid_lookup[types]
+        chunk.count = count
+        return chunk
+
+    def adopt_chunk(self, chunk_pos, chunk):
+        """
+        Insert a whole chunk into the grid.
+        :param chunk_pos: The chunk coordinates.
+        :param chunk: The TileChunk object.
+        """
+        self.drop_chunk(chunk_pos)
+        self.chunks[chunk_pos] = chunk
+        self.count += chunk.count
+        self.dirty.add(chunk_pos)
+        cx, cy = chunk_pos
+        ys, xs = np.nonzero(chunk.types * ~chunk.solid)
+        for ly, lx in zip(ys.tolist(), xs.tolist()):
+            key = (self.type_names[chunk.types[ly, lx]], int(chunk.variants[ly, lx]))
+            self.locations[key].add((cx * self.chunk_size + lx, cy * self.chunk_size + ly))
+
+    def drop_chunk(self, chunk_pos):
+        """
+        Remove a whole chunk from the grid.
+        :param chunk_pos: The chunk coordinates.
+        """
+        chunk = self.chunks.pop(chunk_pos, None)
+        if chunk is None:
+            return
+        self.count -= chunk.count
+        self.dirty.add(chunk_pos)
+        cx, cy = chunk_pos
+        ys, xs = np.nonzero(chunk.types * ~chunk.solid)
+        for ly, lx in zip(ys.tolist(), xs.tolist()):
+            self.unindex(cx * self.chunk_size + lx, cy * self.chunk_size + ly, chunk.types[ly, lx], chunk.variants[ly, lx])
+
+    def load_arrays(self, chunk_size, type_names, chunk_coords, types, variants, extras):
+        """
+        Adopt tile arrays read from a binary level file. The arrays are used as chunk storage without copying.
+        :param chunk_size: The width and height of one chunk in tiles.
+        :param type_names: Tile type names indexed by type id (index 0 - empty cell).
+        :param chunk_coords: Array (n_chunks, 2) with chunk coordinates.
+        :param types: Array (n_chunks, chunk_size, chunk_size) with tile type ids.
+        :param variants: Array (n_chunks, chunk_size, chunk_size) with tile variants.
+        :param extras: Dictionary (x, y) -> additional tile properties.
+        """
+        self.prepare_types(chunk_size, type_names, extras)
+        for index, (cx, cy) in enumerate(chunk_coords.tolist()):
+            chunk = self.make_chunk(types[index], variants[index])
+            if chunk is not None:
+                self.adopt_chunk((cx, cy), chunk)
+
+    def to_arrays(self):
+        """
+        Stack all chunks into arrays for the binary level format.
+        :return: A tuple (chunk_coords, types, variants).
+        """
+        shape = (len(self.chunks), self.chunk_size, self.chunk_size)
+        chunk_coords = np.array(list(self.chunks), dtype=np.int32).reshape(-1, 2)
+        types = np.zeros(shape, dtype=np.int16)
+        variants = np.zeros(shape, dtype=np.int16)
+        for index, chunk in enumerate(self.chunks.values()):
+            types[index] = chunk.types
+            variants[index] = chunk.variants
+        return chunk_coords, types, variants
+
+    def to_dict(self):
+        """
+        Convert the grid into a tilemap dictionary in the JSON map format.
+        :return: The tilemap dictionary.
+        """
+        return {f"{x};{y}": tile for (x, y), tile in self.items()}
+
+    def __contains__(self, loc):
+        chunk, lx, ly = self.chunk_at(*loc)
+        return chunk is not None and chunk.types[ly, lx] != EMPTY_TILE
+
+    def __len__(self):
+        return self.count
+
 
 class Map:
     """
@@ -35,8 +407,19 @@ class Map:
         """
         self.game = game
         self.tile_size = tile_size
-        self.tilemap = {}
+        self.tilemap = ChunkedTilemap()
         self.offgrid_tiles = []
+        self.chunk_surfaces = {}  # (cx, cy) -> pre-rendered static layers of the chunk (None if empty)
+        self.animated_index = {}  # (cx, cy) -> [(x, y, variant, animation_speed)] of animated tiles in the chunk
+        self.offgrid_ids = {}     # (type, variant) -> indices of offgrid tiles
+        self.offgrid_cells = None  # spatial hash: (cx, cy) -> indices of offgrid tiles overlapping the chunk area
+        self.offgrid_rects = []   # index -> area of the offgrid tile in world pixels
+        self.collision_rects = {}  # (cx, cy) -> merged rectangles of physical tiles in the chunk (world pixels)
+        self.collision_memo = {}   # (x, y) -> collision rectangles around the tile, valid for the current frame
+        self.collision_memo_tick = None
+        self.solid_grid = None     # dense solid mask of the whole level for raycasts: (origin_x, origin_y, grid[y, x])
+        self.tick = 0             # global animation clock (frames)
+        self.streamer = None      # ChunkStreamer of a streamed level (None if the whole level is loaded)
 
     def get_ground_level(self, y):
         """
@@ -46,101 +429,439 @@ class Map:
         """
         y_index = int(y / self.tile_size)
         if 0 <= y_index < len(self.tilemap):
-            tile_loc = f"0;{y_index}"
-            if tile_loc in self.tilemap:
+            if (0, y_index) in self.tilemap:
                 return y_index * self.tile_size - 32
         return y
 
-    def save(self, path):
+    def save(self, path, binary=None):
         """
-        Save the map to a JSON file.
+        Save the map to a JSON file or to the compact binary level format.
         :param path: The path to save the file.
+        :param binary: Write the binary format (by default it is chosen by the file extension).
         """
+        if binary is None:
+            binary = path.endswith(LEVEL_EXTENSION)
+        if binary:
+            self.save_binary(path)
+            return
+
         with open(path, 'w') as f:
-            json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size,
+            json.dump({'tilemap': self.tilemap.to_dict(), 'tile_size': self.tile_size,
                        'offgrid': self.offgrid_tiles}, f, indent=4)
 
+    def save_binary(self, path):
+        """
+        Save the map to the compact binary level format. Spawn points are written to a separate table.
+        :param path: The path to save the file.
+        """
+        chunk_coords, types, variants = self.tilemap.to_arrays()
+        type_ids = dict(self.tilemap.type_ids)
+
+        def type_id(t_type):
+            if t_type not in type_ids:
+                type_ids[t_type] = len(type_ids) + 1
+            return type_ids[t_type]
+
+        extras = {loc: tile_extras for loc, tile_extras in self.tilemap.extras.items()}
+        spawners, spawner_extras = [], {}
+        spawn_ids = [type_ids[t_type] for t_type in SPAWN_TYPES if t_type in type_ids]
+        for index, (x, y) in enumerate(chunk_coords.tolist()):
+            for ly, lx in zip(*np.nonzero(np.isin(types[index], spawn_ids))):
+                tile_x, tile_y = x * self.tilemap.chunk_size + int(lx), y * self.tilemap.chunk_size + int(ly)
+                if (tile_x, tile_y) in extras:
+                    spawner_extras[str(len(spawners))] = extras.pop((tile_x, tile_y))
+                spawners.append((types[index, ly, lx], variants[index, ly, lx], 1, tile_x, tile_y))
+                types[index, ly, lx] = 0
+                variants[index, ly, lx] = 0
+
+        offgrid, offgrid_extras = [], {}
+        for tile in self.offgrid_tiles:
+            tile_extras = {key: value for key, value in tile.items() if key not in ('type', 'variant', 'pos')}
+            record = (type_id(tile['type']), tile['variant'], 0, tile['pos'][0], tile['pos'][1])
+            if tile['type'] in SPAWN_TYPES:
+                if tile_extras:
+                    spawner_extras[str(len(spawners))] = tile_extras
+                spawners.append(record)
+            else:
+                if tile_extras:
+                    offgrid_extras[str(len(offgrid))] = tile_extras
+                offgrid.append(record)
+
+        type_names = [None] * (len(type_ids) + 1)
+        for t_type, index in type_ids.items():
+            type_names[index] = t_type
+
+        write_level(path, {
+            'tile_size': self.tile_size,
+            'chunk_size': self.tilemap.chunk_size,
+            'type_names': type_names,
+            'extras': extras,
+            'offgrid_extras': offgrid_extras,
+            'spawner_extras': spawner_extras,
+            'chunk_coords': chunk_coords,
+            'types': types,
+            'variants': variants,
+            'offgrid': np.array(offgrid, dtype=OFFGRID_RECORD),
+            'spawners': np.array(spawners, dtype=SPAWNER_RECORD),
+        })
+
     def load(self, path):
         """
-        Loads a map from a JSON file.
-        :param path: The path to the JSON file containing the map data.
+        Loads a map from a JSON file or from the compact binary level format.
+        :param path: The path to the file containing the map data.
         """
+        if self.streamer is not None:
+            self.streamer.close()
+            self.streamer = None
+        if path.endswith(LEVEL_EXTENSION):
+            self.load_binary(path)
+            return
+
         with open(path, 'r') as f:
             map_data = json.load(f)
-        
-        self.tilemap = map_data['tilemap']
+
+        self.tilemap.load_dict(map_data['tilemap'])
         self.tile_size = map_data['tile_size']
         self.offgrid_tiles = map_data['offgrid']
+        self.rebuild_indexes()
+
+    def load_binary(self, path, streaming=None):
+        """
+        Loads a map from the compact binary level format.
+        In the streaming mode the grid is filled region by region around the view (see Map.stream),
+        and spawn points are handed out together with their regions (except the player spawn).
+        :param path: The path to the level file.
+        :param streaming: Stream the level (by default large levels are streamed, see STREAMING_MIN_CHUNKS).
+        """
+        level = read_level(path)
+        type_names = level['type_names']
+        if streaming is None:
+            streaming = len(level['chunk_coords']) >= STREAMING_MIN_CHUNKS
+
+        self.tile_size = level['tile_size']
+        if streaming:
+            self.tilemap.prepare_types(level['chunk_size'], type_names, level['extras'])
+            self.streamer = ChunkStreamer(self.tilemap, level, self.tile_size)
+        else:
+            self.tilemap.load_arrays(level['chunk_size'], type_names, level['chunk_coords'],
+                                     level['types'], level['variants'], level['extras'])
+
+        self.offgrid_tiles = []
+        for index, record in enumerate(level['offgrid'].tolist()):
+            tile = {'type': type_names[record[0]], 'variant': record[1], 'pos': [record[3], record[4]]}
+            tile.update(level['offgrid_extras'].get(str(index), {}))
+            self.offgrid_tiles.append(tile)
+
+        for index, (type_id, variant, ongrid, x, y) in enumerate(level['spawners'].tolist()):
+            tile_extras = level['spawner_extras'].get(str(index), {})
+            if streaming and (type_names[type_id], variant) != ('spawners', 0):
+                pos = [int(x) * self.tile_size, int(y) * self.tile_size] if ongrid else [x, y]
+                tile = {'type': type_names[type_id], 'variant': variant, 'pos': pos}
+                tile.update(tile_extras)
+                self.streamer.add_spawn(tile)
+            elif ongrid:
+                self.tilemap.set(int(x), int(y), type_names[type_id], variant, tile_extras)
+            else:
+                tile = {'type': type_names[type_id], 'variant': variant, 'pos': [x, y]}
+                tile.update(tile_extras)
+                self.offgrid_tiles.append(tile)
+
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        """
+        Rebuild the caches and indexes derived from the map contents after the whole map has changed.
+        """
+        self.invalidate_chunks()
+        self.index_animated_tiles()
+        self.index_offgrid_tiles()
+        self.mesh_collisions()
+        self.tilemap.dirty.clear()
+
+    def stream(self, view_rect, wait=False):
+        """
+        Load the regions of a streamed level around the view and release the distant ones.
+        :param view_rect: The visible area in world pixels.
+        :param wait: Block until every region around the view is loaded.
+        :return: A tuple (loaded, released) as returned by ChunkStreamer.update (empty if the level is not streamed).
+        """
+        if self.streamer is None:
+            return [], []
+        return self.streamer.update(view_rect, wait)
+
+    def sync_chunks(self):
+        """
+        Update the caches of the chunks changed since the last call (chunk surfaces, animated tiles, collisions).
+        """
+        if self.tilemap.dirty:
+            self.invalidate_chunks(self.tilemap.dirty)
+            self.index_animated_tiles(self.tilemap.dirty)
+            self.mesh_collisions(self.tilemap.dirty)
+            self.tilemap.dirty.clear()
 
     def extract(self, id_pairs, keep=False):
         """
         Extracts objects from the map.
+        Matches are looked up in the (type, variant) indexes, removed offgrid tiles are dropped in one compaction.
         :param id_pairs: A list of tuples, where each tuple contains the layer name
                                    and the index of the object within that layer.
         :param keep: Flag to indicate whether to keep extracted objects.
         :return: A list of dictionaries representing the extracted objects.
         """
-        matches = []
-        for tile in self.offgrid_tiles.copy():
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                if not keep:
-                    self.offgrid_tiles.remove(tile)
-
-        for loc, tile in list(self.tilemap.items()):
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                matches[-1]['pos'] = matches[-1]['pos'].copy()
-                matches[-1]['pos'] = [coord * self.tile_size for coord in matches[-1]['pos']]
+        id_pairs = list(dict.fromkeys(tuple(id_pair) for id_pair in id_pairs))
+        indices = sorted(itertools.chain.from_iterable(self.offgrid_ids.get(id_pair, ()) for id_pair in id_pairs))
+        matches = [self.offgrid_tiles[index].copy() for index in indices]
+        if indices and not keep:
+            for index in indices:
+                self.invalidate_offgrid_tile(self.offgrid_tiles[index])
+            tombstones = set(indices)
+            self.offgrid_tiles = [tile for index, tile in enumerate(self.offgrid_tiles) if index not in tombstones]
+            self.index_offgrid_tiles()
+
+        for t_type, variant in id_pairs:
+            for x, y in self.tilemap.find(t_type, variant):
+                tile = self.tilemap.get(x, y)
+                tile['pos'] = [x * self.tile_size, y * self.tile_size]
+                matches.append(tile)
                 if not keep:
-                    del self.tilemap[loc]
+                    self.tilemap.remove(x, y)
 
         return matches
-        
+
+    def extract_spawns(self, t_types=SPAWN_TYPES, keep=False):
+        """
+        Extracts all objects of the given types (every variant) in one pass.
+        :param t_types: The layer names to extract (spawn points by default).
+        :param keep: Flag to indicate whether to keep extracted objects.
+        :return: A dictionary: layer name -> list of dictionaries representing the extracted objects.
+        """
+        id_pairs = [id_pair for id_pair in itertools.chain(self.offgrid_ids, self.tilemap.locations)
+                    if id_pair[0] in t_types]
+        spawns = {t_type: [] for t_type in t_types}
+        for tile in self.extract(id_pairs, keep):
+            spawns[tile['type']].append(tile)
+        return spawns
+
     def checking_physical_tiles(self, pos):
         """
         Check if a position is solid.
         :param pos: The position to check.
         :return: The solid tile.
         """
-        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
-        if tile_loc in self.tilemap:
-            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
-                return self.tilemap[tile_loc]
+        x, y = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        if self.tilemap.is_solid(x, y):
+            return self.tilemap.get(x, y)
 
     def tiles_around_the_player(self, pos):
         """
-        Get tiles around a given position and filter the physics tiles.
+        Get collision rectangles of the physics tiles in the 3x3 tile neighborhood of a given position.
+        Merged rectangles are clipped to the neighborhood, the result is shared by all queries from the same tile
+        during one frame (both collision passes of an entity and entities standing on the same tile).
         :param pos: The position.
-        :return: A list of physics tiles.
-        """
-        tile_rects = []
-        for offset in NEIGHBOR_OFFSETS:
-            check_loc = f"{int(pos[0] // self.tile_size) + offset[0]};{int(pos[1] // self.tile_size) + offset[1]}"
-            if check_loc in self.tilemap:
-                tile = self.tilemap[check_loc]
-                if tile['type'] in PHYSICS_TILES:
-                    tile_rects.append(
-                        pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size,
-                                    self.tile_size))
+        :return: A list of pygame.Rect of physics tiles (do not modify).
+        """
+        if self.collision_memo_tick != self.tick:
+            self.collision_memo.clear()
+            self.collision_memo_tick = self.tick
+        self.sync_chunks()
+
+        tile_x, tile_y = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        tile_rects = self.collision_memo.get((tile_x, tile_y))
+        if tile_rects is None:
+            area = pygame.Rect((tile_x - 1) * self.tile_size, (tile_y - 1) * self.tile_size,
+                               self.tile_size * 3, self.tile_size * 3)
+            tile_rects = [rect.clip(area) for chunk_pos in self.chunks_in_rect(area)
+                          for rect in self.collision_rects.get(chunk_pos, ()) if area.colliderect(rect)]
+            self.collision_memo[(tile_x, tile_y)] = tile_rects
         return tile_rects
 
+    def mesh_collisions(self, chunk_positions=None):
+        """
+        Merge the physics tiles of chunks into larger collision rectangles (greedy meshing):
+        runs of solid tiles along a row are grown downwards while the rows below are solid along the whole run.
+        :param chunk_positions: Chunk coordinates to rebuild (all chunks if None).
+        """
+        if chunk_positions is None:
+            self.collision_rects = {}
+            chunk_positions = list(self.tilemap.chunks)
+        self.collision_memo.clear()
+        self.solid_grid = None
+
+        for chunk_pos in chunk_positions:
+            self.collision_rects.pop(chunk_pos, None)
+            chunk = self.tilemap.chunks.get(chunk_pos)
+            if chunk is None or not chunk.solid.any():
+                continue
+            free = chunk.solid.copy()
+            origin_x = chunk_pos[0] * self.chunk_pixel_size
+            origin_y = chunk_pos[1] * self.chunk_pixel_size
+            rects = []
+            for ly, lx in zip(*(indices.tolist() for indices in np.nonzero(chunk.solid))):
+                if not free[ly, lx]:
+                    continue
+                right = lx + 1
+                while right < self.tilemap.chunk_size and free[ly, right]:
+                    right += 1
+                bottom = ly + 1
+                while bottom < self.tilemap.chunk_size and free[bottom, lx:right].all():
+                    bottom += 1
+                free[ly:bottom, lx:right] = False
+                rects.append(pygame.Rect(origin_x + lx * self.tile_size, origin_y + ly * self.tile_size,
+                                         (right - lx) * self.tile_size, (bottom - ly) * self.tile_size))
+            self.collision_rects[chunk_pos] = rects
+
+    def build_solid_grid(self):
+        """
+        Build a dense mask of the physics tiles covering the bounding box of all chunks.
+        :return: A tuple (origin_x, origin_y, grid), where grid[y, x] is True for solid tiles.
+        """
+        size = self.tilemap.chunk_size
+        if not self.tilemap.chunks:
+            self.solid_grid = (0, 0, np.zeros((0, 0), dtype=bool))
+            return self.solid_grid
+        coords = np.array(list(self.tilemap.chunks))
+        (min_cx, min_cy), (max_cx, max_cy) = coords.min(axis=0), coords.max(axis=0)
+        grid = np.zeros(((max_cy - min_cy + 1) * size, (max_cx - min_cx + 1) * size), dtype=bool)
+        for (cx, cy), chunk in self.tilemap.chunks.items():
+            top, left = (cy - min_cy) * size, (cx - min_cx) * size
+            grid[top:top + size, left:left + size] = chunk.solid
+        self.solid_grid = (int(min_cx) * size, int(min_cy) * size, grid)
+        return self.solid_grid
+
+    def raycast(self, start, end):
+        """
+        Cast a ray between two points and find the first physics tile it enters
+        (DDA traversal of the tile grid, every tile crossed by the segment is visited once).
+        :param start: The start point in world pixels.
+        :param end: The end point in world pixels.
+        :return: The point where the ray enters the first solid tile, or None if the way is clear.
+        """
+        self.sync_chunks()
+        origin_x, origin_y, grid = self.solid_grid or self.build_solid_grid()
+        height, width = grid.shape
+
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        x, y = int(start[0] // self.tile_size), int(start[1] // self.tile_size)
+        end_x, end_y = int(end[0] // self.tile_size), int(end[1] // self.tile_size)
+        step_x, step_y = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+        delta_x = self.tile_size / abs(dx) if dx else math.inf
+        delta_y = self.tile_size / abs(dy) if dy else math.inf
+        t_x = ((x + (step_x > 0)) * self.tile_size - start[0]) / dx if dx else math.inf
+        t_y = ((y + (step_y > 0)) * self.tile_size - start[1]) / dy if dy else math.inf
+
+        t = 0.0
+        for _ in range(abs(end_x - x) + abs(end_y - y) + 1):
+            gx, gy = x - origin_x, y - origin_y
+            if 0 <= gx < width and 0 <= gy < height and grid[gy, gx]:
+                return start[0] + dx * t, start[1] + dy * t
+            if t_x < t_y:
+                t, x, t_x = t_x, x + step_x, t_x + delta_x
+            else:
+                t, y, t_y = t_y, y + step_y, t_y + delta_y
+        return None
+
+    def has_line_of_sight(self, start, end):
+        """
+        Check that no physics tile lies between two points.
+        :param start: The start point in world pixels.
+        :param end: The end point in world pixels.
+        :return: True if the way is clear.
+        """
+        return self.raycast(start, end) is None
+
+    def raycast_many(self, starts, ends):
+        """
+        Cast many rays at once. All rays are traversed in lockstep with NumPy, one tile per iteration.
+        :param starts: Sequence of start points in world pixels.
+        :param ends: Sequence of end points in world pixels.
+        :return: A tuple (hits, points): a boolean array of rays that hit a physics tile
+                 and an array (n, 2) of the points where they entered it (NaN for clear rays).
+        """
+        self.sync_chunks()
+        origin_x, origin_y, grid = self.solid_grid or self.build_solid_grid()
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        count = len(starts)
+
+        delta = ends - starts
+        cells = (starts // self.tile_size).astype(np.int64)
+        steps = np.sign(delta).astype(np.int64)
+        n_steps = np.abs((ends // self.tile_size).astype(np.int64) - cells).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_delta = np.where(delta != 0, self.tile_size / np.abs(delta), np.inf)
+            t_next = np.where(delta != 0, ((cells + (steps > 0)) * self.tile_size - starts) / delta, np.inf)
+
+        t = np.zeros(count)
+        hit_t = np.full(count, np.nan)
+        active = np.ones(count, dtype=bool)
+        rows = np.arange(count)
+        for iteration in range(int(n_steps.max(initial=-1)) + 1):
+            gx, gy = cells[:, 0] - origin_x, cells[:, 1] - origin_y
+            inside = active & (gx >= 0) & (gx < grid.shape[1]) & (gy >= 0) & (gy < grid.shape[0])
+            solid = np.zeros(count, dtype=bool)
+            solid[inside] = grid[gy[inside], gx[inside]]
+            hit_t[solid] = t[solid]
+            active &= ~solid & (n_steps > iteration)
+            if not active.any():
+                break
+            axis = np.where(t_next[:, 0] < t_next[:, 1], 0, 1)
+            moving = rows[active]
+            moving_axis = axis[active]
+            t[moving] = t_next[moving, moving_axis]
+            cells[moving, moving_axis] += steps[moving, moving_axis]
+            t_next[moving, moving_axis] += t_delta[moving, moving_axis]
+
+        hits = ~np.isnan(hit_t)
+        return hits, starts + delta * hit_t[:, None]
+
+    def auto_variants(self, x, y, width, height):
+        """
+        Compute auto-tiled variants of a rectangular area with vectorized neighbor bitmasks.
+        :param x: The left tile x-coordinate.
+        :param y: The top tile y-coordinate.
+        :param width: The width of the area in tiles.
+        :param height: The height of the area in tiles.
+        :return: Array (height, width) of new variants, -1 where the variant must be kept.
+        """
+        types = self.tilemap.region_types(x - 1, y - 1, width + 2, height + 2)
+        center = types[1:-1, 1:-1]
+        neighbors = ((types[1:-1, 2:] == center) * AUTOMAP_BITS[(1, 0)] |
+                     (types[1:-1, :-2] == center) * AUTOMAP_BITS[(-1, 0)] |
+                     (types[:-2, 1:-1] == center) * AUTOMAP_BITS[(0, -1)] |
+                     (types[2:, 1:-1] == center) * AUTOMAP_BITS[(0, 1)])
+        auto_ids = [self.tilemap.type_ids[t_type] for t_type in AUTO_TYPES if t_type in self.tilemap.type_ids]
+        return np.where(np.isin(center, auto_ids), AUTOMAP_LOOKUP[neighbors], -1)
+
     def auto_tile_placement(self):
         """
-        Automatically set tile variants based on neighbors.
+        Automatically set tile variants based on neighbors for the whole map (chunk by chunk).
+        """
+        size = self.tilemap.chunk_size
+        for (cx, cy), chunk in self.tilemap.chunks.items():
+            variants = self.auto_variants(cx * size, cy * size, size, size)
+            changed = (variants >= 0) & (variants != chunk.variants)
+            if changed.any():
+                chunk.variants[changed] = variants[changed]
+                self.tilemap.dirty.add((cx, cy))
+
+    def auto_tile_neighborhood(self, loc):
+        """
+        Re-tile only the 3x3 neighborhood around a changed tile (for live map edits).
+        :param loc: The (x, y) coordinates of the changed tile.
+        """
+        variants = self.auto_variants(loc[0] - 1, loc[1] - 1, 3, 3)
+        for ly, lx in zip(*np.nonzero(variants >= 0)):
+            self.tilemap.set_variant(loc[0] - 1 + int(lx), loc[1] - 1 + int(ly), variants[ly, lx])
+
+    def animated_frame(self, variant, animation_speed=1):
+        """
+        Get the current frame of an animated tile from the global animation clock.
+        :param variant: The animated tileset index.
+        :param animation_speed: The number of ticks each frame is shown.
+        :return: The frame surface.
         """
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            neighbors = set()
-            for shift in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
-                check_loc = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                if check_loc in self.tilemap:
-                    if self.tilemap[check_loc]['type'] == tile['type']:
-                        neighbors.add(shift)
-            neighbors = frozenset(sorted(neighbors))
-            if (tile['type'] in AUTO_TYPES) and (neighbors in AUTOMAP):
-                tile['variant'] = AUTOMAP[neighbors]
+        animated_tileset = self.game.assets['animated_tiles'][variant]
+        return animated_tileset[(self.tick // animation_speed) % len(animated_tileset)]
 
     def draw_tile(self, tile, surf, offset):
         """
@@ -151,42 +872,176 @@ class Map:
         """
         if tile['type'] == 'animated_tiles':
             try:
-                animated_tileset = self.game.assets['animated_tiles'][tile['variant']]
-                animation_frame = tile.get('animation_frame', 0)
-                animation_frame %= len(animated_tileset)
-                surf.blit(animated_tileset[animation_frame], (tile['pos'][0] * self.tile_size - offset[0],
-                                                              tile['pos'][1] * self.tile_size - offset[1]))
+                surf.blit(self.animated_frame(tile['variant'], tile.get('animation_speed', 1)),
+                          (tile['pos'][0] * self.tile_size - offset[0], tile['pos'][1] * self.tile_size - offset[1]))
             except TypeError:
                 pass
         else:
             surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] * self.tile_size - offset[0],
                                                                         tile['pos'][1] * self.tile_size - offset[1]))
 
+    def index_animated_tiles(self, chunk_positions=None):
+        """
+        Build the index of animated tile locations.
+        :param chunk_positions: Chunk coordinates to re-index (the whole map if None).
+        """
+        if chunk_positions is None:
+            self.animated_index.clear()
+            chunk_positions = list(self.tilemap.chunks)
+
+        animated_id = self.tilemap.type_ids.get('animated_tiles')
+        size = self.tilemap.chunk_size
+        for chunk_pos in chunk_positions:
+            self.animated_index.pop(chunk_pos, None)
+            chunk = self.tilemap.chunks.get(chunk_pos)
+            if chunk is None or animated_id is None:
+                continue
+            animated = []
+            for ly, lx in zip(*np.nonzero(chunk.types == animated_id)):
+                x, y = chunk_pos[0] * size + int(lx), chunk_pos[1] * size + int(ly)
+                speed = self.tilemap.extras.get((x, y), {}).get('animation_speed', 1) or 1
+                animated.append((x, y, int(chunk.variants[ly, lx]), speed))
+            if animated:
+                self.animated_index[chunk_pos] = animated
+
     def update_animated_tiles(self):
         """
-        Update animated tiles.
+        Advance the animation clock of animated tiles (frames are derived from it when drawing).
+        """
+        self.tick += 1
+
+    @property
+    def chunk_pixel_size(self):
+        """
+        The width and height of one chunk in pixels.
+        """
+        return self.tilemap.chunk_size * self.tile_size
+
+    def invalidate_chunks(self, chunk_positions=None):
+        """
+        Drop cached chunk surfaces so they are rebuilt on the next render.
+        :param chunk_positions: Chunk coordinates to invalidate (all chunks if None).
+        """
+        if chunk_positions is None:
+            self.chunk_surfaces.clear()
+            return
+        for chunk_pos in chunk_positions:
+            self.chunk_surfaces.pop(chunk_pos, None)
+
+    def chunks_in_rect(self, rect):
+        """
+        Get coordinates of all chunks overlapped by an area.
+        :param rect: The area in world pixels.
+        :return: An iterator of (cx, cy) chunk coordinates.
         """
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            if tile['type'] == 'animated_tiles':
-                animated_tileset = self.game.assets['animated_tiles'][tile['variant']]
-                animation_frame = tile.get('animation_frame', 0)
-                animation_frame = (animation_frame + 1) % (len(animated_tileset) * tile.get('animation_speed', 1))
-                tile['animation_frame'] = animation_frame
+        size = self.chunk_pixel_size
+        return itertools.product(range(rect.left // size, (rect.right - 1) // size + 1),
+                                 range(rect.top // size, (rect.bottom - 1) // size + 1))
+
+    def invalidate_offgrid_tile(self, tile):
+        """
+        Invalidate every cached chunk that an offgrid tile overlaps.
+        :param tile: The offgrid tile.
+        """
+        if self.chunk_surfaces:
+            self.invalidate_chunks(self.chunks_in_rect(self.offgrid_rect(tile)))
+
+    def offgrid_rect(self, tile):
+        """
+        Get the area covered by an offgrid tile in world pixels.
+        :param tile: The offgrid tile.
+        :return: pygame.Rect of the tile.
+        """
+        image = self.game.assets[tile['type']][tile['variant']]
+        return pygame.Rect(int(tile['pos'][0]), int(tile['pos'][1]), image.get_width(), image.get_height())
+
+    def index_offgrid_tiles(self):
+        """
+        Build the (type, variant) index of offgrid tiles. The spatial hash is rebuilt lazily on the next query,
+        since it needs the sizes of the tile images.
+        """
+        self.offgrid_ids = defaultdict(list)
+        for index, tile in enumerate(self.offgrid_tiles):
+            self.offgrid_ids[(tile['type'], tile['variant'])].append(index)
+        self.offgrid_cells = None
+        self.offgrid_rects = []
+
+    def build_offgrid_cells(self):
+        """
+        Build the spatial hash of offgrid tiles with buckets of the chunk size.
+        """
+        self.offgrid_cells = defaultdict(list)
+        self.offgrid_rects = [self.offgrid_rect(tile) for tile in self.offgrid_tiles]
+        for index, rect in enumerate(self.offgrid_rects):
+            for cell in self.chunks_in_rect(rect):
+                self.offgrid_cells[cell].append(index)
+
+    def offgrid_in_rect(self, rect):
+        """
+        Get offgrid tiles overlapping an area in their drawing order.
+        :param rect: The area in world pixels.
+        :return: A list of offgrid tiles.
+        """
+        if self.offgrid_cells is None:
+            self.build_offgrid_cells()
+        indices = set()
+        for cell in self.chunks_in_rect(rect):
+            for index in self.offgrid_cells.get(cell, ()):
+                if rect.colliderect(self.offgrid_rects[index]):
+                    indices.add(index)
+        return [self.offgrid_tiles[index] for index in sorted(indices)]
+
+    def bake_chunk(self, chunk_pos):
+        """
+        Pre-render the static layers of a chunk (offgrid decor and non-animated grid tiles) into one surface.
+        :param chunk_pos: The chunk coordinates.
+        :return: The chunk surface or None if nothing static is in the chunk.
+        """
+        size = self.chunk_pixel_size
+        origin = (chunk_pos[0] * size, chunk_pos[1] * size)
+        chunk_rect = pygame.Rect(origin, (size, size))
+        chunk_surf = None
+
+        for tile in self.offgrid_in_rect(chunk_rect):
+            if chunk_surf is None:
+                chunk_surf = pygame.Surface((size, size), pygame.SRCALPHA)
+            chunk_surf.blit(self.game.assets[tile['type']][tile['variant']],
+                            (tile['pos'][0] - origin[0], tile['pos'][1] - origin[1]))
+
+        chunk = self.tilemap.chunks.get(chunk_pos)
+        if chunk is not None:
+            ys, xs = np.nonzero(chunk.types)
+            for ly, lx in zip(ys.tolist(), xs.tolist()):
+                t_type = self.tilemap.type_names[chunk.types[ly, lx]]
+                if t_type == 'animated_tiles':
+                    continue
+                if chunk_surf is None:
+                    chunk_surf = pygame.Surface((size, size), pygame.SRCALPHA)
+                chunk_surf.blit(self.game.assets[t_type][chunk.variants[ly, lx]],
+                                (lx * self.tile_size, ly * self.tile_size))
+
+        if chunk_surf is not None and pygame.display.get_surface() is not None:
+            chunk_surf = chunk_surf.convert_alpha()
+        self.chunk_surfaces[chunk_pos] = chunk_surf
+        return chunk_surf
 
     def render(self, surf, offset=(0, 0)):
         """
-        Render the map.
+        Render the map. Static layers are blitted as cached chunk surfaces, animated tiles are drawn on top.
         :param surf: The surface to render onto.
         :param offset: The offset to apply.
         """
-        for tile in self.offgrid_tiles:
-            surf.blit(self.game.assets[tile['type']][tile['variant']],
-                      (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
-
-        for x in range(offset[0] // self.tile_size, (offset[0] + surf.get_width()) // self.tile_size + 1):
-            for y in range(offset[1] // self.tile_size, (offset[1] + surf.get_height()) // self.tile_size + 1):
-                loc = str(x) + ';' + str(y)
-                if loc in self.tilemap:
-                    tile = self.tilemap[loc]
-                    self.draw_tile(tile, surf, offset)
+        self.sync_chunks()
+
+        size = self.chunk_pixel_size
+        for cx, cy in self.chunks_in_rect(pygame.Rect(offset, surf.get_size())):
+            if (cx, cy) in self.chunk_surfaces:
+                chunk_surf = self.chunk_surfaces[(cx, cy)]
+            else:
+                chunk_surf = self.bake_chunk((cx, cy))
+            if chunk_surf is not None:
+                surf.blit(chunk_surf, (cx * size - offset[0], cy * size - offset[1]))
+
+            for x, y, variant, speed in self.animated_index.get((cx, cy), ()):
+                surf.blit(self.animated_frame(variant, speed),
+                          (x * self.tile_size - offset[0], y * self.tile_size - offset[1]))
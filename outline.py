@@ -0,0 +1,148 @@
+import weakref
+
+import pygame
+
+from support import STATIC_SURFACES
+
+
+OUTLINE_OFF = 'off'          # no outline
+OUTLINE_SPRITES = 'sprites'  # every static sprite is drawn with its own cached outline
+OUTLINE_FRAME = 'frame'      # the outline of everything drawn on the layer is built once per frame
+
+OUTLINE_COLOR = (0, 0, 0, 180)
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def make_outline(surface, color=OUTLINE_COLOR):
+    """
+    Build the 1 pixel outline of the visible pixels of a surface.
+    :param surface: The source surface.
+    :param color: The outline color.
+    :return: A surface 2 pixels larger than the source, to be drawn 1 pixel up and left of it.
+    """
+    mask = pygame.mask.from_surface(surface)
+    outline = pygame.mask.Mask((surface.get_width() + 2, surface.get_height() + 2))
+    for dx, dy in OUTLINE_OFFSETS:
+        outline.draw(mask, (1 + dx, 1 + dy))
+    return outline.to_surface(setcolor=color, unsetcolor=(0, 0, 0, 0))
+
+
+class OutlinedSurface(pygame.Surface):
+    """
+    A layer surface of the outline stage.
+    In the sprites mode every static sprite (see support.STATIC_SURFACES) blitted onto it is drawn with its cached
+    outline under it; other surfaces (text, overlays redrawn in place) are drawn without an outline.
+    The layer also keeps the area drawn on it since the last outline pass, so the frame mode only processes that area.
+    """
+    def __init__(self, stage, size):
+        super().__init__(size, pygame.SRCALPHA)
+        self.stage = stage
+        self.drawn = None  # area drawn on since the last outline pass
+
+    def mark(self, rect):
+        """
+        Record an area drawn on the layer by other means than its own methods (e.g. pygame.draw functions).
+        :param rect: The drawn area.
+        """
+        self.drawn = pygame.Rect(rect) if self.drawn is None else self.drawn.union(rect)
+
+    def fill(self, color, rect=None, special_flags=0):
+        drawn = super().fill(color, rect, special_flags)
+        if pygame.Color(color).a:  # clearing leaves nothing to outline
+            self.mark(drawn)
+        return drawn
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        if self.stage.quality == OUTLINE_SPRITES and source in STATIC_SURFACES:
+            super().blit(self.stage.sprite_outline(source, area), (dest[0] - 1, dest[1] - 1))
+        drawn = super().blit(source, dest, area, special_flags)
+        self.mark(drawn)
+        return drawn
+
+    def blits(self, blit_sequence, doreturn=1):
+        """
+        Draw a sequence of sprites with one Surface.blits call, in the sprites mode with the outlines of the static
+        sprites inserted before them (the returned rectangles then include the outlines).
+        """
+        if self.stage.quality == OUTLINE_SPRITES:
+            blit_sequence = self.stage.with_outlines(blit_sequence)
+        drawn = super().blits(blit_sequence, doreturn=True)
+        if drawn:
+            self.mark(drawn[0].unionall(drawn[1:]))
+        return drawn if doreturn else None
+
+
+class OutlineStage:
+    """
+    Post-process stage that outlines the world and interface sprites, with selectable quality levels.
+    """
+    def __init__(self, quality=OUTLINE_FRAME, color=OUTLINE_COLOR):
+        """
+        Initializes the OutlineStage object.
+        :param quality: OUTLINE_OFF, OUTLINE_SPRITES or OUTLINE_FRAME.
+        :param color: The outline color.
+        """
+        self.quality = quality
+        self.color = color
+        self.sprite_outlines = weakref.WeakKeyDictionary()  # source surface -> outline surface
+        self.frame_outline = None  # outline of the frame, reused between frames
+
+    def make_layer(self, size):
+        """
+        Create the layer surface that the outlined sprites are drawn onto.
+        :param size: The size of the layer.
+        :return: OutlinedSurface object.
+        """
+        return OutlinedSurface(self, size)
+
+    def sprite_outline(self, surface, area=None):
+        """
+        Get the outline of a static sprite, cached unless only a part of the sprite is drawn.
+        :param surface: The sprite surface.
+        :param area: Part of the sprite that is drawn.
+        :return: The outline surface (see make_outline).
+        """
+        if area is not None:
+            return make_outline(surface.subsurface(pygame.Rect(area).clip(surface.get_rect())), self.color)
+        outline = self.sprite_outlines.get(surface)
+        if outline is None:
+            outline = self.sprite_outlines[surface] = make_outline(surface, self.color)
+        return outline
+
+    def with_outlines(self, blit_sequence):
+        """
+        :param blit_sequence: Entries (source, dest[, area[, special_flags]]) of Surface.blits.
+        :return: The entries with the outline of every static sprite inserted before the sprite.
+        """
+        entries = []
+        for entry in blit_sequence:
+            source, dest = entry[0], entry[1]
+            if source in STATIC_SURFACES:
+                outline = self.sprite_outline(source, entry[2] if len(entry) > 2 else None)
+                entries.append((outline, (dest[0] - 1, dest[1] - 1)))
+            entries.append(entry)
+        return entries
+
+    def apply(self, layer, target):
+        """
+        Draw the outline of a finished layer onto the target surface (only in the frame mode).
+        Only the area drawn on the layer since the last pass is processed when the layer keeps it (OutlinedSurface).
+        :param layer: The layer with sprites.
+        :param target: The surface the layer is going to be blitted onto.
+        """
+        if isinstance(layer, OutlinedSurface):
+            area, layer.drawn = layer.drawn, None
+        else:
+            area = layer.get_rect()
+        if self.quality != OUTLINE_FRAME or area is None:
+            return
+        area = area.inflate(2, 2).clip(layer.get_rect())  # room for the outline around the drawn pixels
+        if self.frame_outline is None or self.frame_outline.get_size() != layer.get_size():
+            self.frame_outline = pygame.Surface(layer.get_size(), pygame.SRCALPHA)
+
+        mask = pygame.mask.from_surface(layer.subsurface(area))
+        frame_mask = pygame.mask.Mask(area.size)
+        for offset in OUTLINE_OFFSETS:
+            frame_mask.draw(mask, offset)
+        frame_mask.to_surface(self.frame_outline.subsurface(area), setcolor=self.color, unsetcolor=(0, 0, 0, 0))
+        target.blit(self.frame_outline, area.topleft, area)
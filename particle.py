@@ -1,85 +1,416 @@
 import random
 import math
 import pygame
+import numpy as np
 
 from support import Animation
+from render_queue import draw_shape, CULL_MARGIN
 from data import EXP_POINTS, COLOR_SCHEMA
 
 
-class Particle:
-    def __init__(self, game, p_type, pos, velocity=None, frame=0):
-        if velocity is None:
-            velocity = [0, 0]
+# emitter priorities: when a category of the particle budget is full, higher priorities replace lower ones
+PRIORITY_AMBIENT = 0  # decoration: ricochets, muzzle sparks, damage ticks of lasting spells
+PRIORITY_COMBAT = 1   # hits of spells and projectiles, dash trails
+PRIORITY_PLAYER = 2   # feedback on the player's own hits and on damage taken by the player
+
+
+class ParticleBudget:
+    """
+    Caps on the number of live sparks, particles, effects and damage numbers, shared by all emitters.
+    Bursts of lower priority are thinned out when a category fills up; a new object at the cap replaces
+    the oldest object of the lowest lower priority, or is dropped when there is none. This keeps the work per frame
+    bounded however many hits overlap, while the feedback of the player's actions still gets through.
+    """
+    def __init__(self, caps, thin_level=0.75):
+        """
+        Initializes the ParticleBudget object.
+        :param caps: Category ('sparks', 'particles', 'effects', 'damage') -> maximum number of live objects.
+        :param thin_level: Fill level (share of the cap) from which bursts below PRIORITY_PLAYER are thinned out.
+        """
+        self.caps = dict(caps)
+        self.thin_level = thin_level
+        # hits: a new object met a full category, it evicted an older one or was dropped;
+        # thinned: objects not spawned because their burst was thinned out
+        self.counters = {category: dict.fromkeys(('hits', 'evicted', 'dropped', 'thinned'), 0) for category in caps}
+
+    def spawn_count(self, category, live, count, priority=PRIORITY_COMBAT):
+        """
+        Thin out a burst: above the thin level the number of spawned objects falls linearly to zero at the cap.
+        :param category: The budget category.
+        :param live: Number of live objects of the category.
+        :param count: Number of objects the emitter wants to spawn.
+        :param priority: Priority of the emitter (PRIORITY_PLAYER bursts are never thinned).
+        :return: Number of objects to spawn.
+        """
+        cap = self.caps[category]
+        start = cap * self.thin_level
+        if priority >= PRIORITY_PLAYER or live <= start:
+            return count
+        allowed = int(count * max(0, cap - live) / (cap - start))
+        self.counters[category]['thinned'] += count - allowed
+        return allowed
+
+    def record_hit(self, category, evicted):
+        """
+        Count a new object that met a full category.
+        :param category: The budget category.
+        :param evicted: Whether it replaced an older object (otherwise it was dropped).
+        """
+        counters = self.counters[category]
+        counters['hits'] += 1
+        counters['evicted' if evicted else 'dropped'] += 1
+
+    def append(self, objects, obj, category, priority=PRIORITY_COMBAT):
+        """
+        Add an effect or a damage number to its list within the cap of the category.
+        :param objects: The list of live objects (oldest first).
+        :param obj: The new object, it remembers its priority in obj.budget_priority.
+        :param category: The budget category.
+        :param priority: Priority of the emitter.
+        :return: True if the object was added.
+        """
+        obj.budget_priority = priority
+        if len(objects) >= self.caps[category]:
+            victim, victim_priority = None, priority
+            for old in objects:
+                old_priority = getattr(old, 'budget_priority', PRIORITY_COMBAT)
+                if old_priority < victim_priority:
+                    victim, victim_priority = old, old_priority
+            self.record_hit(category, victim is not None)
+            if victim is None:
+                return False
+            objects.remove(victim)
+        objects.append(obj)
+        return True
+
+    def report(self):
+        """
+        :return: Counters of the categories whose cap was hit or whose bursts were thinned.
+        """
+        return {category: dict(counters) for category, counters in self.counters.items() if any(counters.values())}
+
+
+class ParticleSystem:
+    """
+    Pool of animated particles (dash trails, hit and healing particles) with a fixed capacity.
+    Positions, velocities and animation frames of all particles live in NumPy arrays, the animations themselves
+    are shared per particle type. Free slots are kept in a free list, so expired particles are recycled
+    without allocating anything.
+    A particle plays its animation once and disappears in the update after the animation ends. While the pool is full,
+    a new particle replaces the oldest particle of a lower priority or is dropped.
+    """
+    def __init__(self, game, capacity=1024, budget=None):
+        """
+        Initializes the ParticleSystem object.
+        :param game: game class instance
+        :param capacity: Maximum number of particles, the 'particles' cap of the budget when there is one.
+        :param budget: ParticleBudget object that thins bursts and counts the hits of the cap.
+        """
+        if budget is not None:
+            capacity = budget.caps['particles']
         self.game = game
-        self.type = p_type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
-        self.animation = self.game.assets['particle/' + p_type].copy()
-        self.animation.frame = frame
-    
+        self.budget = budget
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int32)        # particle type index (see kind_index)
+        self.num_frames = np.zeros(capacity, dtype=np.int32)  # animation length of every particle
+        self.active = np.zeros(capacity, dtype=bool)
+        self.done = np.zeros(capacity, dtype=bool)     # the animation ended in the last update
+        self.expired = np.zeros(capacity, dtype=bool)  # drawn for the last time in this frame
+        self.order = np.zeros(capacity, dtype=np.int64)  # spawn number, particles are drawn in the spawn order
+        self.priority = np.zeros(capacity, dtype=np.int8)  # priority of the emitter of every particle
+        self.spawned = 0
+        self.free = list(range(capacity - 1, -1, -1))  # free slots, the lowest index is taken first
+        self.kinds = {}  # particle type -> index
+        self.images = []  # animation frames of all particle types
+        self.first_image = np.zeros(0, dtype=np.int32)  # index of the first frame of every type in self.images
+        self.img_duration = np.ones(0, dtype=np.int32)  # animation frames per image of every type
+        self.kind_frames = np.zeros(0, dtype=np.int32)  # animation length of every type
+        self.half_size = np.zeros((0, 2))  # half size of every image (rounded down)
+
+    def __len__(self):
+        return len(self.active) - len(self.free)
+
+    def kind_index(self, p_type):
+        """
+        :param p_type: The particle type.
+        :return: Index of the type, the type is registered on its first use.
+        """
+        index = self.kinds.get(p_type)
+        if index is None:
+            index = self.kinds[p_type] = len(self.kinds)
+            animation = self.game.assets['particle/' + p_type]
+            self.first_image = np.append(self.first_image, len(self.images))
+            self.img_duration = np.append(self.img_duration, animation.img_duration)
+            self.kind_frames = np.append(self.kind_frames, animation.num_frames)
+            self.half_size = np.concatenate((self.half_size, [(img.get_width() // 2, img.get_height() // 2)
+                                                              for img in animation.images]))
+            self.images.extend(animation.images)
+        return index
+
+    def thin(self, count, priority=PRIORITY_COMBAT):
+        """
+        :param count: Number of particles of a burst.
+        :param priority: Priority of the emitter.
+        :return: Number of particles to spawn (see ParticleBudget.spawn_count).
+        """
+        if self.budget is None:
+            return count
+        return self.budget.spawn_count('particles', len(self), count, priority)
+
+    def evict(self, priority):
+        """
+        Free a slot of the full pool for a new particle: particles drawn for the last time go first,
+        then the oldest particle of the lowest priority below the given one.
+        :param priority: Priority of the new particle.
+        :return: The freed slot, or None if every particle has the same or a higher priority.
+        """
+        rank = np.where(self.expired, -1, self.priority)
+        lowest = rank.min()
+        slot = None
+        if lowest < priority:
+            candidates = np.flatnonzero(rank == lowest)
+            slot = int(candidates[np.argmin(self.order[candidates])])
+            self.expired[slot] = False
+        if self.budget is not None:
+            self.budget.record_hit('particles', slot is not None)
+        return slot
+
+    def add(self, p_type, pos, velocity=None, frame=0, priority=PRIORITY_COMBAT):
+        """
+        Add a particle.
+        :param p_type: The particle type (animation 'particle/<p_type>' of the assets).
+        :param pos: Position of the particle center (only the first two values are read, so a Rect gives its top left).
+        :param velocity: Movement per frame.
+        :param frame: Start frame of the animation.
+        :param priority: Priority of the emitter.
+        :return: The slot of the particle, or None if the pool is full and it could not evict a particle.
+        """
+        slot = self.free.pop() if self.free else self.evict(priority)
+        if slot is None:
+            return None
+        kind = self.kind_index(p_type)
+        self.pos[slot] = pos[0], pos[1]
+        self.velocity[slot] = velocity if velocity is not None else (0, 0)
+        self.frame[slot] = frame
+        self.kind[slot] = kind
+        self.num_frames[slot] = self.kind_frames[kind]
+        self.active[slot] = True
+        self.done[slot] = False
+        self.expired[slot] = False
+        self.order[slot] = self.spawned
+        self.priority[slot] = priority
+        self.spawned += 1
+        return slot
+
+    def clear(self):
+        self.active[:] = False
+        self.expired[:] = False
+        self.free = list(range(len(self.active) - 1, -1, -1))
+
     def update(self):
-        kill = False
-        if self.animation.done:
-            kill = True
-        
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-        
-        self.animation.update()
-        
-        return kill
-    
+        """
+        Release the particles drawn for the last time in the previous frame, then move and animate the others.
+        """
+        if self.expired.any():
+            released = np.flatnonzero(self.expired)
+            self.active[released] = False
+            self.expired[released] = False
+            self.free.extend(released[::-1].tolist())
+
+        active = self.active
+        self.expired |= active & self.done
+        self.pos[active] += self.velocity[active]
+        frame = self.frame + active
+        self.done |= active & (frame >= self.num_frames)
+        np.minimum(frame, self.num_frames - 1, out=self.frame, where=active)
+
     def render(self, surf, offset=(0, 0)):
-        img = self.animation.current_sprite()
-        surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2, self.pos[1] - offset[1] - img.get_height() // 2))
+        """
+        Draw the particles near the view.
+        :param surf: Surface or RenderLayer object.
+        :param offset: The camera offset.
+        """
+        width, height = surf.get_size()
+        pos = self.pos - offset
+        visible = self.active & ((pos[:, 0] >= -CULL_MARGIN) & (pos[:, 0] <= width + CULL_MARGIN) &
+                                 (pos[:, 1] >= -CULL_MARGIN) & (pos[:, 1] <= height + CULL_MARGIN))
+        slots = np.flatnonzero(visible)
+        if not len(slots):
+            return
+        slots = slots[np.argsort(self.order[slots], kind='stable')]
 
+        kind = self.kind[slots]
+        image_index = self.first_image[kind] + self.frame[slots] // self.img_duration[kind]
+        dest = pos[slots] - self.half_size[image_index]
+        surf.blits(list(zip(map(self.images.__getitem__, image_index.tolist()), dest.tolist())), doreturn=False)
 
-class Spark:
-    def __init__(self, pos, angle, speed, shade='red', spark_color=None):
-        self.pos = list(pos)
-        self.angle = angle
-        self.speed = speed
-        self.shade = shade
-        self.spark_color = spark_color
 
-    def update(self):
-        self.pos[0] += math.cos(self.angle) * self.speed
-        self.pos[1] += math.sin(self.angle) * self.speed
+class SparkSystem:
+    """
+    All sparks of the game in NumPy arrays (position, direction, speed and color of every spark).
+    A spark flies in its direction and slows down until it stops and disappears, it is drawn as a four-point polygon
+    stretched along the direction. All sparks are moved in one vectorized step and drawn from one vertex array.
+    With a budget the number of sparks is capped: a new spark at the cap replaces the oldest spark of a lower priority
+    or is dropped.
+    """
+    def __init__(self, capacity=256, budget=None):
+        """
+        Initializes the SparkSystem object.
+        :param capacity: Initial number of sparks the arrays have room for (they grow when needed).
+        :param budget: ParticleBudget object with the 'sparks' cap, without it the number of sparks is unlimited.
+        """
+        self.budget = budget
+        self.limit = budget.caps['sparks'] if budget is not None else None
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.direction = np.zeros((capacity, 2))  # cosine and sine of the angle of every spark
+        self.speed = np.zeros(capacity)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.priority = np.zeros(capacity, dtype=np.int8)
+        self.arrays = ('pos', 'direction', 'speed', 'color', 'priority')
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        """
+        Double the capacity of the arrays.
+        """
+        capacity = len(self.speed) * 2
+        for name in self.arrays:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            setattr(self, name, grown)
+
+    def thin(self, count, priority=PRIORITY_COMBAT):
+        """
+        :param count: Number of sparks of a burst.
+        :param priority: Priority of the emitter.
+        :return: Number of sparks to spawn (see ParticleBudget.spawn_count).
+        """
+        if self.budget is None:
+            return count
+        return self.budget.spawn_count('sparks', self.count, count, priority)
+
+    def evict(self, priority):
+        """
+        Remove the oldest spark of the lowest priority below the given one (sparks are kept oldest first).
+        :param priority: Priority of the new spark.
+        :return: True if a spark was removed.
+        """
+        n = self.count
+        lowest = self.priority[:n].min()
+        evicted = lowest < priority
+        if evicted:
+            index = int(np.argmax(self.priority[:n] == lowest))
+            for name in self.arrays:
+                array = getattr(self, name)
+                array[index:n - 1] = array[index + 1:n]
+            self.count -= 1
+        self.budget.record_hit('sparks', evicted)
+        return evicted
+
+    def add(self, pos, angle, speed, shade='red', spark_color=None, priority=PRIORITY_COMBAT):
+        """
+        Add a spark.
+        :param pos: Start position (only the first two values are read, so a Rect starts at its top left).
+        :param angle: Direction of flight in radians.
+        :param speed: Start speed in pixels per step.
+        :param shade: Name of the color in COLOR_SCHEMA.
+        :param spark_color: Color of the spark, overrides the shade.
+        :param priority: Priority of the emitter.
+        """
+        if self.limit is not None and self.count >= self.limit:
+            if not self.evict(priority):
+                return
+        if self.count == len(self.speed):
+            self.grow()
+        index = self.count
+        self.pos[index] = pos[0], pos[1]
+        self.direction[index] = (math.cos(angle), math.sin(angle))
+        self.speed[index] = speed
+        self.color[index] = (spark_color or COLOR_SCHEMA.get(shade, (255, 255, 255)))[:3]
+        self.priority[index] = priority
+        self.count += 1
 
-        self.speed = max(0, self.speed - 0.1)
-        return not self.speed
+    def clear(self):
+        self.count = 0
+
+    def update(self, steps=1):
+        """
+        Move all sparks and remove the stopped ones.
+        :param steps: Number of steps (every step moves a spark by its speed and slows it down by 0.1).
+        """
+        n = self.count
+        pos, direction, speed = self.pos[:n], self.direction[:n], self.speed[:n]
+        for _ in range(steps):
+            pos += direction * speed[:, None]
+            np.maximum(speed - 0.1, 0, out=speed)
+
+        alive = speed > 0
+        if not alive.all():
+            self.count = int(alive.sum())
+            for name in self.arrays:
+                array = getattr(self, name)
+                array[:self.count] = array[:n][alive]
+
+    def vertices(self, offset=(0, 0), size=None, margin=0):
+        """
+        Compute the polygons of the sparks.
+        :param offset: The camera offset.
+        :param size: The size of the view; sparks farther than the margin from it are skipped.
+        :param margin: Distance around the view in which sparks are still drawn.
+        :return: A tuple (vertices of shape (sparks, 4, 2), colors of shape (sparks, 3)).
+        """
+        n = self.count
+        pos = self.pos[:n] - offset
+        direction, speed, color = self.direction[:n], self.speed[:n, None], self.color[:n]
+        if size is not None:
+            visible = ((pos[:, 0] >= -margin) & (pos[:, 0] <= size[0] + margin) &
+                       (pos[:, 1] >= -margin) & (pos[:, 1] <= size[1] + margin))
+            pos, direction, speed, color = pos[visible], direction[visible], speed[visible], color[visible]
+
+        forward = direction * speed * 3
+        side = direction[:, ::-1] * speed * 0.5
+        side[:, 0] *= -1  # the direction turned by 90 degrees
+        return np.stack((pos + forward, pos + side, pos - forward, pos - side), axis=1), color
+
+    @staticmethod
+    def draw(surf, vertices, colors):
+        drawn = [pygame.draw.polygon(surf, color, points) for points, color in zip(vertices, colors)]
+        return drawn[0].unionall(drawn[1:]) if drawn else None
 
     def render(self, surf, offset=(0, 0)):
-        render_points = [
-            (self.pos[0] + math.cos(self.angle) * self.speed * 3 - offset[0], self.pos[1] + math.sin(self.angle) * self.speed * 3 - offset[1]),
-            (self.pos[0] + math.cos(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[0], self.pos[1] + math.sin(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[1]),
-            (self.pos[0] + math.cos(self.angle + math.pi) * self.speed * 3 - offset[0], self.pos[1] + math.sin(self.angle + math.pi) * self.speed * 3 - offset[1]),
-            (self.pos[0] + math.cos(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[0], self.pos[1] + math.sin(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[1]),
-        ]
-
-        if self.spark_color:
-            pygame.draw.polygon(surf, self.spark_color, render_points)
-        else:
-            color = COLOR_SCHEMA.get(self.shade, (255, 255, 255))
-            pygame.draw.polygon(surf, color, render_points)
-
-
-def create_particles(game, position, shade='red', num_particles=(10, 50), speed_range=(0, 5), offset=2, image='particle', frame_range=(0, 7)):
-    for i in range(random.randint(*num_particles)):
+        if not self.count:
+            return
+        vertices, colors = self.vertices(offset, surf.get_size(), CULL_MARGIN)
+        draw_shape(surf, self.draw, vertices.tolist(), colors.tolist())
+
+
+def create_particles(game, position, shade='red', num_particles=(10, 50), speed_range=(0, 5), offset=2, image='particle', frame_range=(0, 7),
+                     priority=PRIORITY_COMBAT):
+    count = random.randint(*num_particles)
+    num_sparks = game.sparks.thin(count, priority)
+    count = game.particles.thin(count, priority)
+    for i in range(max(count, num_sparks)):
         angle = random.random() * math.pi * 2
         speed = random.uniform(*speed_range)
-        game.sparks.append(Spark(position, angle, offset + random.random(), shade))
-        game.particles.append(Particle(game, image, position,
-                                       velocity=[math.cos(angle + math.pi) * speed * 0.5,
-                                                 math.sin(angle + math.pi) * speed * 0.5],
-                                       frame=random.randint(*frame_range)))
+        if i < num_sparks:
+            game.sparks.add(position, angle, offset + random.random(), shade, priority=priority)
+        if i < count:
+            game.particles.add(image, position,
+                               velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle + math.pi) * speed * 0.5],
+                               frame=random.randint(*frame_range), priority=priority)
 
 
-def create_sparks(game, position, shade='red', num_sparks=(1, 5), offset=2):
-    for i in range(random.randint(*num_sparks)):
+def create_sparks(game, position, shade='red', num_sparks=(1, 5), offset=2, priority=PRIORITY_COMBAT):
+    for i in range(game.sparks.thin(random.randint(*num_sparks), priority)):
         angle = random.random() * math.pi * 2
         spark_color = vary_color(COLOR_SCHEMA[shade])
-        game.sparks.append(Spark(position, angle, offset + random.random(), shade, spark_color))
+        game.sparks.add(position, angle, offset + random.random(), shade, spark_color, priority)
 
 
 def vary_color(base_color):
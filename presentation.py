@@ -0,0 +1,45 @@
+import pygame
+
+
+def create_window(size, scale=1, sdl_scaling=False):
+    """
+    Open the game window.
+    :param size: The logical size of the window (the size the frame is presented at).
+    :param scale: Integer scale of the window.
+    :param sdl_scaling: Let SDL scale the logical size to the window (pygame.SCALED) instead of scaling in software.
+    :return: The screen surface.
+    """
+    if sdl_scaling:
+        return pygame.display.set_mode(size, pygame.SCALED)
+    return pygame.display.set_mode((size[0] * scale, size[1] * scale))
+
+
+class Presentation:
+    """
+    The final stage of a frame: puts the finished frame on the screen.
+    The game and the menus both draw at the logical size and go through it, so they are scaled the same way.
+    The frame is blitted directly when the sizes match, otherwise it is scaled into a preallocated surface.
+    """
+    def __init__(self, screen):
+        """
+        Initializes the Presentation object.
+        :param screen: The screen surface.
+        """
+        self.screen = screen
+        self.scaled = None  # preallocated destination of the scaled frame
+
+    def present(self, frame, offset=(0, 0)):
+        """
+        Draw the frame onto the screen.
+        :param frame: The finished frame.
+        :param offset: Offset of the frame on the screen (screen shake), in frame pixels; it is scaled with the frame.
+        """
+        size = self.screen.get_size()
+        if frame.get_size() == size:
+            self.screen.blit(frame, offset)
+            return
+        offset = (offset[0] * size[0] / frame.get_width(), offset[1] * size[1] / frame.get_height())
+        if self.scaled is None or self.scaled.get_size() != size:
+            self.scaled = pygame.Surface(size, 0, frame)
+        pygame.transform.scale(frame, size, self.scaled)
+        self.screen.blit(self.scaled, offset)
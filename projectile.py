@@ -2,8 +2,9 @@ import random
 import math
 import pygame
 
-from particle import Particle, Spark, create_particles, create_sparks
-from support import Animation
+from particle import create_particles, create_sparks, PRIORITY_AMBIENT, PRIORITY_PLAYER
+from support import Animation, flipped, rotated
+from render_queue import draw_shape
 from data import EXP_POINTS, PROJECTILE_DAMAGE, SHURIKEN_CONFIGS
 
 
@@ -24,7 +25,7 @@ class Projectile:
 
     def render(self, surf, offset=(0, 0)):
         projectile_pos = (self.pos[0] - offset[0], self.pos[1] - offset[1])
-        flipped_projectile = pygame.transform.flip(self.image, self.direction < 0, False)
+        flipped_projectile = flipped(self.image) if self.direction < 0 else self.image
         surf.blit(flipped_projectile, (projectile_pos[0] - flipped_projectile.get_width() / 2,
                                        projectile_pos[1] - flipped_projectile.get_height() / 2))
 
@@ -54,6 +55,10 @@ class AnimatedProjectile(Projectile):
             self.rect_height
         )
 
+    def cull_rect(self):
+        """Returns the area the current sprite is drawn in, centered at the position."""
+        return self.animation.current_sprite().get_rect(center=self.pos)
+
     def update(self):
         self.animation.update()
         if self.reverse and self.animation.current_cycle >= self.num_cycles // 2:
@@ -62,14 +67,13 @@ class AnimatedProjectile(Projectile):
         self.pos[0] += self.velocity * self.direction
 
     def render(self, surf, offset=(0, 0)):
-        rotated_frame = pygame.transform.rotate(self.animation.current_sprite(), self.rotation)
-        self.image = rotated_frame
+        self.image = rotated(self.animation.current_sprite(), self.rotation)
         super().render(surf, offset)
         if self.show_hit_boxes:
             super().render(surf, offset)
             rect = self.rect()
             rect.topleft = (rect.left - offset[0], rect.top - offset[1])
-            pygame.draw.rect(surf, (255, 0, 0), rect, 2)
+            draw_shape(surf, pygame.draw.rect, (255, 0, 0), rect, 2)
 
 
 class WormFireball(AnimatedProjectile):
@@ -230,12 +234,12 @@ class FireTotem(AnimatedProjectile):
 
     def update(self):
         self.animation.update()
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if self.rect().colliderect(enemy.hitbox) and not enemy.dying:
                 enemy.take_damage(1)
-                create_sparks(self.game, enemy.hitbox.center, shade='orange')
+                create_sparks(self.game, enemy.hitbox.center, shade='orange', priority=PRIORITY_AMBIENT)
 
-        for effect in self.game.magic_effects.copy():
+        for effect in self.game.magic_effects:
             if self.rect().colliderect(effect.rect()) and isinstance(effect, Tornado):
                 self.hit_on_target = True
                 effect.hit_on_target = True
@@ -265,7 +269,7 @@ class MagicShield(AnimatedProjectile):
     def update(self):
         super().update()
         if self.safety_margin > 0:
-            for projectile in self.game.animated_projectiles.copy():
+            for projectile in self.game.animated_projectiles:
                 if self.rect().colliderect(projectile.rect()):
                     self.safety_margin -= projectile.damage
                     if not any(isinstance(effect, MagicShieldEffect) for effect in self.game.magic_effects):
@@ -310,14 +314,16 @@ class IceArrow(AnimatedProjectile):
 
     def update(self):
         super().update()
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if not enemy.dying:
                 if self.rect().colliderect(enemy.hitbox) and not enemy.dying:
                     self.game.sfx['ice_hit'].play()
                     sound = str(random.randint(1, 3))
                     self.game.sfx.get(enemy.e_type + sound, self.game.sfx[enemy.e_type]).play()
                     enemy.take_damage(self.damage)
-                    self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(self.damage), (255, 255, 255)))
+                    self.game.particle_budget.append(self.game.damage_rates,
+                                                     DamageNumber(enemy.hitbox.center, int(self.damage), (255, 255, 255)),
+                                                     'damage')
                     create_sparks(self.game, enemy.hitbox.center, shade='ice')
                     self.hit_on_target = True
 
@@ -336,7 +342,7 @@ class IceArrow(AnimatedProjectile):
                                 self.game.sfx['freezing'].play()
                                 enemy.freeze_enemy(duration=6)  # the duration of one cycle is 1 second
 
-        for effect in self.game.magic_effects.copy():
+        for effect in self.game.magic_effects:
             if self.rect().colliderect(effect.rect()) and isinstance(effect, Tornado):
                 self.hit_on_target = True
                 effect.hit_on_target = True
@@ -355,12 +361,13 @@ class Thunderbolt(AnimatedProjectile):
 
     def update(self):
         super().update()
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if self.rect().colliderect(enemy.hitbox) and not enemy.dying:
                 self.total_damage += self.damage
                 enemy.take_damage(self.damage)
                 if self.animation.done:
-                    self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(self.total_damage)))
+                    self.game.particle_budget.append(self.game.damage_rates,
+                                                     DamageNumber(enemy.hitbox.center, int(self.total_damage)), 'damage')
 
 
 class Freezing(AnimatedProjectile):
@@ -381,12 +388,12 @@ class Tornado(AnimatedProjectile):
 
     def update(self):
         super().update()
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if self.rect().colliderect(enemy.hitbox) and not enemy.dying:
                 damage = random.randint(0, 1)
                 enemy.take_damage(damage)
                 # self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(damage), (255, 255, 255)))
-                create_sparks(self.game, enemy.hitbox.center, shade='white', num_sparks=(1, 5))
+                create_sparks(self.game, enemy.hitbox.center, shade='white', num_sparks=(1, 5), priority=PRIORITY_AMBIENT)
 
 
 class WaterTornado(AnimatedProjectile):
@@ -398,12 +405,12 @@ class WaterTornado(AnimatedProjectile):
 
     def update(self):
         super().update()
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if self.rect().colliderect(enemy.hitbox) and not enemy.dying:
                 damage = random.randint(1, 3)
                 enemy.take_damage(damage)
                 # self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(damage), (255, 255, 255)))
-                create_sparks(self.game, enemy.rect().center, shade='white', num_sparks=(1, 5))
+                create_sparks(self.game, enemy.rect().center, shade='white', num_sparks=(1, 5), priority=PRIORITY_AMBIENT)
 
 
 class HellStorm(AnimatedProjectile):
@@ -417,13 +424,14 @@ class HellStorm(AnimatedProjectile):
 
     def update(self):
         super().update()
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if self.rect().colliderect(enemy.hitbox) and not enemy.dying:
                 self.total_damage += self.damage
                 enemy.take_damage(self.damage)
                 if self.animation.done:
                     self.game.sfx['hell_storm'].play()
-                    self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(self.total_damage)))
+                    self.game.particle_budget.append(self.game.damage_rates,
+                                                     DamageNumber(enemy.hitbox.center, int(self.total_damage)), 'damage')
 
 
 class RunicObelisk(AnimatedProjectile):
@@ -454,14 +462,12 @@ class RunicObelisk(AnimatedProjectile):
                 angle = random.random() * math.pi * 2  # a random angle in radians from 0 to 2π (360 degrees)
                 speed = random.random() * 0.5 + 0.5
                 pvelocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                self.game.particles.append(
-                    Particle(
-                        game=self.game,
-                        p_type='cross_particle',
-                        pos=self.game.player.rect().midtop,
-                        velocity=pvelocity,
-                        frame=random.randint(0, 7)
-                    )
+                self.game.particles.add(
+                    p_type='cross_particle',
+                    pos=self.game.player.rect().midtop,
+                    velocity=pvelocity,
+                    frame=random.randint(0, 7),
+                    priority=PRIORITY_PLAYER
                 )
                 if current_time >= self.next_sound_time:
                     voice = str(random.randint(1, 3))
@@ -504,14 +510,13 @@ class Shuriken(Projectile):
                                 self.pos[1] - self.image.get_height() / 2,
                                 self.image.get_width(), self.image.get_height())
 
-        for enemy in self.game.enemies.copy():
+        for enemy in self.game.enemies:
             if self.rect.colliderect(enemy.hitbox) and not enemy.dying:
                 if enemy.e_type == 'golem':
                     self.game.sfx['suriken_rebound'].play()
-                    for i in range(4):
-                        self.game.sparks.append(
-                            Spark(self.pos, random.random() - 0.5 + (math.pi if self.direction > 0 else 0),
-                                  2 + random.random(), 'white'))
+                    for i in range(self.game.sparks.thin(4, PRIORITY_AMBIENT)):
+                        self.game.sparks.add(self.pos, random.random() - 0.5 + (math.pi if self.direction > 0 else 0),
+                                             2 + random.random(), 'white', priority=PRIORITY_AMBIENT)
                     self.direction *= -1
                     self.recoil = True
                 else:
@@ -519,8 +524,10 @@ class Shuriken(Projectile):
                     sound = str(random.randint(1, 3))
                     self.game.sfx.get(enemy.e_type + sound, self.game.sfx[enemy.e_type]).play()
                     enemy.take_damage(self.damage)
-                    self.game.damage_rates.append(DamageNumber(enemy.hitbox.center, int(self.damage), (255, 255, 255)))
-                    create_particles(self.game, enemy.hitbox.center, enemy.e_type)
+                    self.game.particle_budget.append(self.game.damage_rates,
+                                                     DamageNumber(enemy.hitbox.center, int(self.damage), (255, 255, 255)),
+                                                     'damage', PRIORITY_PLAYER)
+                    create_particles(self.game, enemy.hitbox.center, enemy.e_type, priority=PRIORITY_PLAYER)
 
                     return True
 
@@ -528,7 +535,7 @@ class Shuriken(Projectile):
         return False
 
     def render(self, surf, offset=(0, 0)):
-        rotated_suriken = pygame.transform.rotate(self.image, self.rotation)
+        rotated_suriken = rotated(self.image, self.rotation)
         surf.blit(rotated_suriken, (self.pos[0] - offset[0] - rotated_suriken.get_width() / 2,
                                     self.pos[1] - 8 - offset[1] - rotated_suriken.get_height() / 2))
 
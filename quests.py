@@ -97,8 +97,12 @@ class NPC:
     def update(self):
         self.animation.update()
 
+    def cull_rect(self):
+        """Returns the area the object draws in, used to cull it against the camera."""
+        return self.rect.union(self.animation.current_sprite().get_rect(topleft=self.pos))
+
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.current_sprite(), self.flip, False),
+        surf.blit(self.animation.current_sprite(self.flip),
                   (self.pos[0] - offset[0], self.pos[1] - offset[1] + 6))
 
 
@@ -550,7 +554,7 @@ class QuestNotification:
                 text_rect.height + self.padding
             )
 
-            pygame.draw.rect(self.game.display, self.bg_color, bg_rect)
+            self.game.display.fill(self.bg_color, bg_rect)
 
             self.game.display.blit(text_surface, text_rect)
         else:
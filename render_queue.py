@@ -0,0 +1,178 @@
+import pygame
+
+
+# world layers in drawing order
+LAYER_ITEMS = 0        # loot, chests and portals
+LAYER_CHARACTERS = 1   # merchants, NPCs, enemies and the player
+LAYER_PROJECTILES = 2  # arrows and animated projectiles
+LAYER_EFFECTS = 3      # sparks, shurikens, spells and visual effects
+LAYER_DAMAGE = 4       # damage numbers
+LAYER_PARTICLES = 5    # particles
+WORLD_LAYERS = 6
+
+CULL_MARGIN = 32  # objects closer to the viewport than this are treated as visible
+
+
+def draw_shape(surf, func, *args):
+    """
+    Draw a primitive (pygame.draw function) on a surface, or queue it when the surface is a RenderLayer.
+    :param surf: Surface or RenderLayer object.
+    :param func: The drawing function, called as func(surface, *args); it returns the drawn area like pygame.draw.
+    """
+    if isinstance(surf, RenderLayer):
+        surf.queue.submit_call(surf.layer, func, *args)
+    else:
+        call_drawing(surf, func, args)
+
+
+def call_drawing(target, func, args):
+    """
+    Call a drawing function and report the drawn area to targets that keep it (see outline.OutlinedSurface.mark).
+    """
+    drawn = func(target, *args)
+    mark = getattr(target, 'mark', None)
+    if mark is not None and drawn is not None:
+        mark(drawn)
+
+
+class RenderLayer:
+    """
+    One layer of a render queue with the blit interface of a surface, so render(surf, offset) methods
+    submit their sprites to the queue when they get the layer instead of the surface.
+    """
+    def __init__(self, queue, layer):
+        self.queue = queue
+        self.layer = layer
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self.queue.submit(source, dest, self.layer, area, special_flags)
+
+    def blits(self, blit_sequence, doreturn=0):
+        """
+        Queue (source, dest) pairs as they are; the caller culls them (systems that cull all their sprites at once).
+        """
+        self.queue.submit_many(blit_sequence, self.layer)
+
+    def get_size(self):
+        return self.queue.viewport.size
+
+    def get_width(self):
+        return self.queue.viewport.width
+
+    def get_height(self):
+        return self.queue.viewport.height
+
+
+class RenderQueue:
+    """
+    Collects the sprites of a frame by layer and draws each layer with a few Surface.blits calls.
+    Sprites outside the viewport are dropped when they are submitted. Layers are drawn in ascending order,
+    entries of a layer in the order they were submitted.
+    The queue also culls whole world objects against the camera rectangle (see visible), so off-screen objects
+    can skip rendering before they compute their sprites.
+    """
+    def __init__(self, size, layers=WORLD_LAYERS):
+        """
+        Initializes the RenderQueue object.
+        :param size: The size of the target surface (the viewport).
+        :param layers: Number of layers.
+        """
+        self.viewport = pygame.Rect((0, 0), size)
+        self.camera = self.viewport.inflate(CULL_MARGIN * 2, CULL_MARGIN * 2)  # viewport in world coordinates
+        self.entries = [[] for _ in range(layers)]
+        self.layers = [RenderLayer(self, layer) for layer in range(layers)]
+        self.submitted = 0
+        self.culled = 0
+        self.last_frame = {'submitted': 0, 'culled': 0, 'draw_calls': 0}  # statistics of the last flushed frame
+
+    def layer(self, layer):
+        """
+        :param layer: The layer index.
+        :return: RenderLayer object to pass to render methods.
+        """
+        return self.layers[layer]
+
+    def set_camera(self, offset, margin=CULL_MARGIN):
+        """
+        Move the culling rectangle with the camera.
+        :param offset: The camera offset (world position of the top left corner of the viewport).
+        :param margin: Distance around the viewport in which objects are still visible.
+        """
+        self.camera = self.viewport.move(offset).inflate(margin * 2, margin * 2)
+
+    def visible(self, obj):
+        """
+        Check whether a world object is near the camera, by the area it draws in (cull_rect method), by its rect
+        (attribute or method) or by its position.
+        :param obj: The world object.
+        """
+        cull_rect = getattr(obj, 'cull_rect', None)
+        if cull_rect is not None:
+            return self.camera.colliderect(cull_rect())
+        rect = getattr(obj, 'rect', None)
+        if rect is None:
+            return self.camera.collidepoint(obj.pos)
+        return self.camera.colliderect(rect() if callable(rect) else rect)
+
+    def submit(self, source, dest, layer, area=None, special_flags=0):
+        """
+        Queue a sprite.
+        :param source: The sprite surface.
+        :param dest: Top left position on the target surface.
+        :param layer: The layer index.
+        :param area: Part of the source to draw.
+        :param special_flags: Blending flags.
+        """
+        self.submitted += 1
+        width, height = source.get_size() if area is None else pygame.Rect(area).size
+        if not self.viewport.colliderect(dest[0], dest[1], width, height):
+            self.culled += 1
+            return
+        if area is None and not special_flags:
+            self.entries[layer].append((source, dest))
+        else:
+            self.entries[layer].append((source, dest, area, special_flags))
+
+    def submit_many(self, entries, layer):
+        """
+        Queue (source, dest) pairs without culling them.
+        :param entries: The pairs.
+        :param layer: The layer index.
+        """
+        self.submitted += len(entries)
+        self.entries[layer].extend(entries)
+
+    def submit_call(self, layer, func, *args):
+        """
+        Queue a drawing function (e.g. a pygame.draw primitive), called as func(target, *args) at its place in the layer.
+        """
+        self.submitted += 1
+        self.entries[layer].append((None, func, args))
+
+    def flush(self, target):
+        """
+        Draw all queued entries onto the target surface and clear the queue.
+        :param target: The surface to draw onto.
+        :return: Number of draw calls.
+        """
+        draw_calls = 0
+        for entries in self.entries:
+            batch = []
+            for entry in entries:
+                if entry[0] is not None:
+                    batch.append(entry)
+                    continue
+                if batch:
+                    target.blits(batch, doreturn=False)
+                    draw_calls += 1
+                    batch = []
+                call_drawing(target, entry[1], entry[2])
+                draw_calls += 1
+            if batch:
+                target.blits(batch, doreturn=False)
+                draw_calls += 1
+            entries.clear()
+
+        self.last_frame = {'submitted': self.submitted, 'culled': self.culled, 'draw_calls': draw_calls}
+        self.submitted = self.culled = 0
+        return draw_calls
@@ -3,6 +3,10 @@ SCREEN_HEIGTH = 960 // 2
 DISPLAY_WIDTH = 640
 DISPLAY_HEIGTH = 480
 
+# window scaling: integer scale of the game frame in the window, or let SDL scale the whole window (pygame.SCALED)
+WINDOW_SCALE = 1
+SDL_SCALING = False
+
 VOLUME_SETTINGS = {
     'ambience': 0.3,
     'attack': 0.5,
@@ -23,4 +27,13 @@ VOLUME_SETTINGS = {
 }
 
 
+OUTLINE_QUALITY = 'frame'  # outline of sprites: 'off', 'sprites' (cached per sprite) or 'frame' (whole frame)
+
+ENEMY_SIGHT_INTERVAL = 10  # frames between line of sight checks of enemies
+
+SKIP_OFFSCREEN_UPDATES = True  # off-screen loot, chests, merchants and NPCs do not advance their animations
+
+# maximum numbers of live sparks, particles, hit effects and damage numbers (see particle.ParticleBudget)
+PARTICLE_CAPS = {'sparks': 600, 'particles': 1024, 'effects': 24, 'damage': 48}
+
 rain_on_levels = [1, 3]
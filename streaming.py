@@ -0,0 +1,164 @@
+"""
+Streaming of large binary levels.
+
+The level is split into square regions of chunks. A background thread decodes the regions near the view
+from the memory-mapped level file (copying their tiles out of the mapped pages), the main thread inserts them
+into the tilemap and releases the regions that went far out of view, so memory use does not grow with the level size.
+Spawn points are grouped by region as well, so the game can spawn and despawn entities together with their region.
+"""
+
+import queue
+import threading
+
+from collections import defaultdict
+
+import numpy as np
+
+
+REGION_CHUNKS = 4            # width and height of one region (in chunks)
+LOAD_MARGIN = 1              # regions around the view that are loaded (in regions)
+KEEP_MARGIN = 2              # loaded regions farther from the view than this are released (in regions)
+STREAMING_MIN_CHUNKS = 256   # levels with at least this many chunks are streamed instead of loaded at once
+
+
+class ChunkStreamer:
+    """
+    Loads and releases regions of a binary level around the view.
+    """
+    def __init__(self, tilemap, level, tile_size, region_chunks=REGION_CHUNKS):
+        """
+        Initializes the ChunkStreamer object and starts its worker thread.
+        :param tilemap: The ChunkedTilemap to fill (its types must be registered by prepare_types).
+        :param level: Dictionary with the level data returned by level_format.read_level.
+        :param tile_size: The size of each tile in pixels.
+        :param region_chunks: The width and height of one region in chunks.
+        """
+        self.tilemap = tilemap
+        self.level = level
+        self.region_chunks = region_chunks
+        self.region_size = region_chunks * level['chunk_size'] * tile_size  # in pixels
+
+        self.regions = defaultdict(list)  # region -> [(index in the level file, chunk coordinates)]
+        for index, (cx, cy) in enumerate(level['chunk_coords'].tolist()):
+            self.regions[(cx // region_chunks, cy // region_chunks)].append((index, (cx, cy)))
+        self.spawns = defaultdict(list)   # region -> spawn points that have not been consumed yet
+
+        self.loaded = set()
+        self.pending = set()
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def add_spawn(self, tile):
+        """
+        Register a spawn point. It is handed out every time its region is loaded until it is consumed.
+        :param tile: The spawn point tile with the position in world pixels.
+        """
+        self.spawns[self.region_at(tile['pos'])].append(tile)
+
+    def consume(self, region, tile):
+        """
+        Forget a spawn point, e.g. after its enemy was killed or its item was picked up.
+        :param region: The region of the spawn point.
+        :param tile: The spawn point tile.
+        """
+        spawns = self.spawns.get(region, [])
+        if tile in spawns:
+            spawns.remove(tile)
+
+    def count_spawns(self, t_type, variants):
+        """
+        Count spawn points that have not been consumed yet.
+        :param t_type: The spawn layer name.
+        :param variants: The variants to count.
+        :return: The number of spawn points.
+        """
+        return sum(tile['type'] == t_type and tile['variant'] in variants
+                   for spawns in self.spawns.values() for tile in spawns)
+
+    def region_at(self, pos):
+        """
+        Get the region containing a point.
+        :param pos: The point in world pixels.
+        :return: The region coordinates.
+        """
+        return int(pos[0] // self.region_size), int(pos[1] // self.region_size)
+
+    def regions_around(self, rect, margin):
+        """
+        Get all existing regions overlapped by an area expanded by a margin.
+        :param rect: The area in world pixels.
+        :param margin: The margin in regions.
+        :return: A set of region coordinates.
+        """
+        left, top = self.region_at(rect.topleft)
+        right, bottom = self.region_at((rect.right - 1, rect.bottom - 1))
+        return {(x, y) for x in range(left - margin, right + margin + 1) for y in range(top - margin, bottom + margin + 1)
+                if (x, y) in self.regions or (x, y) in self.spawns}
+
+    def decode_region(self, region):
+        """
+        Read the chunks of a region from the level file (runs in the worker thread).
+        :param region: The region coordinates.
+        :return: A list of (chunk coordinates, TileChunk).
+        """
+        chunks = []
+        for index, chunk_pos in self.regions.get(region, ()):
+            chunk = self.tilemap.make_chunk(np.array(self.level['types'][index]),
+                                            np.array(self.level['variants'][index]))
+            if chunk is not None:
+                chunks.append((chunk_pos, chunk))
+        return chunks
+
+    def work(self):
+        """
+        The loop of the worker thread: decode requested regions until None is requested.
+        """
+        while True:
+            region = self.requests.get()
+            if region is None:
+                return
+            self.results.put((region, self.decode_region(region)))
+
+    def update(self, view_rect, wait=False):
+        """
+        Request the regions around the view, insert the decoded ones and release the distant ones.
+        :param view_rect: The visible area in world pixels.
+        :param wait: Block until every region around the view is loaded (used when a level starts).
+        :return: A tuple (loaded, released): a list of (region, spawn points) of the regions inserted by this call
+                 and a list of the released regions.
+        """
+        wanted = self.regions_around(view_rect, LOAD_MARGIN)
+        keep = self.regions_around(view_rect, KEEP_MARGIN)
+        for region in wanted - self.loaded - self.pending:
+            self.pending.add(region)
+            self.requests.put(region)
+
+        loaded = []
+        while self.pending:
+            try:
+                region, chunks = self.results.get(block=wait and bool(self.pending & wanted))
+            except queue.Empty:
+                break
+            self.pending.discard(region)
+            if region not in keep:
+                continue
+            for chunk_pos, chunk in chunks:
+                self.tilemap.adopt_chunk(chunk_pos, chunk)
+            self.loaded.add(region)
+            loaded.append((region, list(self.spawns.get(region, ()))))
+
+        released = []
+        for region in self.loaded - keep:
+            for _, chunk_pos in self.regions.get(region, ()):
+                self.tilemap.drop_chunk(chunk_pos)
+            self.loaded.discard(region)
+            released.append(region)
+        return loaded, released
+
+    def close(self):
+        """
+        Stop the worker thread.
+        """
+        self.requests.put(None)
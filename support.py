@@ -1,4 +1,6 @@
 import os
+import weakref
+
 import pygame
 
 from pathlib import Path
@@ -7,6 +9,11 @@ from pathlib import Path
 BASE_IMG_PATH = 'data/images/'
 Sound = pygame.mixer.Sound
 
+FLIPPED_IMAGES = weakref.WeakKeyDictionary()  # image -> its horizontal mirror, kept while the image is alive
+ROTATED_IMAGES = weakref.WeakKeyDictionary()  # image -> rotated copies of the angle steps 1.. (index step - 1)
+ROTATION_STEPS = 72  # angles are quantized to 360 / ROTATION_STEPS degrees
+STATIC_SURFACES = weakref.WeakSet()  # asset images that are never drawn on, with their mirrored and rotated copies
+
 
 class Animation:
     def __init__(self, images, img_dur=5, loop=True, num_cycles=None):
@@ -40,8 +47,9 @@ class Animation:
                     self.done = not self.loop
                     self.frame = self.num_frames - 1 if not self.loop else 0
 
-    def current_sprite(self):
-        return self.images[int(self.frame / self.img_duration)]
+    def current_sprite(self, flip=False):
+        image = self.images[int(self.frame / self.img_duration)]
+        return flipped(image) if flip else image
 
     def freeze(self):
         self.frozen = True
@@ -50,6 +58,68 @@ class Animation:
         self.frozen = False
 
 
+def mark_static(assets):
+    """
+    Register the images of assets as static (never changed after loading), so per-image data like outlines can be cached.
+    :param assets: Surface, Animation, or a list, tuple or dictionary of them.
+    :return: The assets.
+    """
+    if isinstance(assets, pygame.Surface):
+        STATIC_SURFACES.add(assets)
+    elif isinstance(assets, Animation):
+        mark_static(assets.images)
+    elif isinstance(assets, dict):
+        mark_static(list(assets.values()))
+    elif isinstance(assets, (list, tuple)):
+        for asset in assets:
+            mark_static(asset)
+    return assets
+
+
+def flipped(image):
+    """
+    Get the horizontally mirrored copy of an image. Mirrored copies are created once and cached.
+    :param image: The image facing right.
+    :return: The image facing left.
+    """
+    image_flipped = FLIPPED_IMAGES.get(image)
+    if image_flipped is None:
+        image_flipped = FLIPPED_IMAGES[image] = pygame.transform.flip(image, True, False)
+        if image in STATIC_SURFACES:
+            STATIC_SURFACES.add(image_flipped)
+    return image_flipped
+
+
+def rotated(image, angle):
+    """
+    Get a copy of an image rotated by an angle quantized to ROTATION_STEPS steps. Rotated copies are cached.
+    :param image: The image.
+    :param angle: The rotation angle in degrees (counterclockwise).
+    :return: The rotated image (the image itself if the quantized angle is 0).
+    """
+    step = round(angle * ROTATION_STEPS / 360) % ROTATION_STEPS
+    if not step:
+        return image
+    rotations = ROTATED_IMAGES.get(image)
+    if rotations is None:
+        # the copies must not reference the image itself, or the weak entry would never be freed
+        rotations = ROTATED_IMAGES[image] = [None] * (ROTATION_STEPS - 1)
+    if rotations[step - 1] is None:
+        rotations[step - 1] = pygame.transform.rotate(image, step * 360 / ROTATION_STEPS)
+        if image in STATIC_SURFACES:
+            STATIC_SURFACES.add(rotations[step - 1])
+    return rotations[step - 1]
+
+
+def prepare_rotations(image):
+    """
+    Pre-generate all rotated copies of an image (see rotated).
+    :param image: The image.
+    """
+    for step in range(1, ROTATION_STEPS):
+        rotated(image, step * 360 / ROTATION_STEPS)
+
+
 def load_image(path):
     sprite = pygame.image.load(BASE_IMG_PATH + path)
     sprite.set_colorkey((0, 0, 0))
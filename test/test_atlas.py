@@ -0,0 +1,91 @@
+import pygame
+from atlas import load_packed_assets, pack_rects
+from support import Animation
+
+
+def make_sprite(size, color, colorkey=True):
+    sprite = pygame.Surface(size)
+    sprite.fill(color)
+    sprite.fill((0, 0, 0), (0, 0, 2, 2))
+    if colorkey:
+        sprite.set_colorkey((0, 0, 0))
+    return sprite
+
+
+def render(sprite):
+    surf = pygame.Surface((sprite.get_width() + 2, sprite.get_height() + 2))
+    surf.fill((40, 80, 120))
+    surf.blit(sprite, (1, 1))
+    return pygame.image.tobytes(surf, 'RGB')
+
+
+# --------------------------
+# Testing the packing
+# --------------------------
+
+def test_packed_rects_do_not_overlap():
+    sizes = [(30, 20), (16, 16), (600, 40), (200, 90), (16, 16), (120, 8)] * 6
+    placements, page_sizes = pack_rects(sizes, page_size=256, padding=1)
+
+    rects = [(page, pygame.Rect(x, y, *size)) for (page, x, y), size in zip(placements, sizes)]
+    for page, rect in rects:
+        assert pygame.Rect((0, 0), page_sizes[page]).contains(rect)
+    for i, (page, rect) in enumerate(rects):
+        assert not any(page == other_page and rect.colliderect(other) for other_page, other in rects[i + 1:])
+
+
+# --------------------------
+# Testing the atlas cache
+# --------------------------
+
+def test_packed_assets_keep_layout_and_pixels(tmp_path):
+    assets = {
+        'tile': make_sprite((16, 16), (200, 30, 30)),
+        'frames': [make_sprite((8, 12), (30, 200, 30)), make_sprite((8, 12), (30, 30, 200))],
+        'idle': Animation([make_sprite((10, 10), (90, 90, 90), colorkey=False)], img_dur=7, loop=False),
+    }
+    loads = []
+
+    def load():
+        loads.append(True)
+        return assets
+
+    packed = load_packed_assets(load, sources=(__file__,), cache_dir=str(tmp_path))
+    cached = load_packed_assets(load, sources=(__file__,), cache_dir=str(tmp_path))
+
+    assert len(loads) == 1
+    for result in (packed, cached):
+        assert render(result['tile']) == render(assets['tile'])
+        assert [render(frame) for frame in result['frames']] == [render(frame) for frame in assets['frames']]
+        assert render(result['idle'].images[0]) == render(assets['idle'].images[0])
+        assert result['idle'].img_duration == 7 and not result['idle'].loop
+
+
+def snapshot(node):
+    """
+    Replace the surfaces of an asset tree by their pixels, keeping the container types.
+    """
+    if isinstance(node, pygame.Surface):
+        return render(node)
+    if isinstance(node, Animation):
+        return 'animation', snapshot(node.images), node.img_duration, node.loop, node.num_cycles
+    if isinstance(node, (list, tuple)):
+        return type(node)(snapshot(item) for item in node)
+    if isinstance(node, dict):
+        return {key: snapshot(item) for key, item in node.items()}
+    return node
+
+
+def test_cached_assets_round_trip_keeps_container_types(tmp_path):
+    assets = {
+        'frames': [make_sprite((8, 12), (30, 200, 30))],
+        'pair': (make_sprite((6, 6), (200, 200, 30)), make_sprite((4, 9), (30, 200, 200), colorkey=False)),
+        'nested': {'walk': Animation((make_sprite((5, 5), (120, 60, 30)),), img_dur=3)},
+    }
+
+    packed = load_packed_assets(lambda: assets, sources=(__file__,), cache_dir=str(tmp_path))
+    cached = load_packed_assets(lambda: None, sources=(__file__,), cache_dir=str(tmp_path))
+
+    assert snapshot(packed) == snapshot(assets)
+    assert snapshot(cached) == snapshot(assets)
+    assert type(cached['pair']) is tuple and type(cached['frames']) is list
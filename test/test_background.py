@@ -0,0 +1,39 @@
+import pygame
+from background import Background
+
+
+def make_layer(size, color):
+    layer = pygame.Surface(size)
+    layer.fill(color)
+    return layer
+
+
+# --------------------------
+# Testing Background
+# --------------------------
+
+def test_narrow_parallax_layer_covers_the_whole_view():
+    base = make_layer((16, 8), (0, 0, 255))
+    stripe = make_layer((5, 8), (255, 0, 0))
+    stripe.fill((0, 255, 0), (0, 0, 1, 8))
+    background = Background([base], (16, 8), parallax={0: [(stripe, 1)]})
+
+    surf = pygame.Surface((16, 8))
+    for scroll in (0, 3, 7, -12):
+        surf.fill((0, 0, 0))
+        background.render(surf, 0, offset=(scroll, 0))
+        row = [surf.get_at((x, 4))[:3] for x in range(16)]
+        assert (0, 0, 255) not in row
+        assert [x for x, color in enumerate(row) if color == (0, 255, 0)] == \
+               [x for x in range(16) if (x + scroll) % 5 == 0]
+
+
+def test_levels_are_prepared_once():
+    background = Background([make_layer((32, 24), (40, 40, 40)), make_layer((8, 6), (90, 90, 90))], (16, 12))
+    layers = background.prepare(1)
+
+    surf = pygame.Surface((16, 12))
+    background.render(surf, 1)
+    assert background.prepare(1) is layers
+    assert layers[0].image.get_size() == (16, 12)
+    assert surf.get_at((15, 11))[:3] == (90, 90, 90)
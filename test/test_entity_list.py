@@ -0,0 +1,56 @@
+from entity_list import EntityList
+
+
+# --------------------------
+# Testing EntityList
+# --------------------------
+
+def test_removal_during_iteration_is_deferred_until_compaction():
+    projectiles = EntityList()
+    arrows = [[[0, 0], 1, 0, 'arrow'] for _ in range(4)]  # equal lists, told apart by identity
+    for arrow in arrows:
+        projectiles.append(arrow)
+
+    visited = []
+    for arrow in projectiles:
+        visited.append(arrow)
+        projectiles.remove(arrow)
+        projectiles.remove(arrows[2])
+        projectiles.append([[9, 9], -1, 0, 'arrow'])
+
+    assert [id(arrow) for arrow in visited] == [id(arrows[0]), id(arrows[1]), id(arrows[3])]
+    assert len(projectiles) == 3
+    assert arrows[0] not in projectiles
+    assert len(projectiles.objects) == 7
+
+    projectiles.compact()
+    assert len(projectiles.objects) == 3
+    assert [arrow[0] for arrow in projectiles] == [[9, 9]] * 3
+
+
+def test_compaction_keeps_the_order():
+    effects = EntityList(range(10, 20))
+    for number in (11, 15, 18):
+        effects.remove(number)
+    effects.remove(15)
+    effects.remove(99)
+
+    effects.compact()
+    assert list(effects) == [10, 12, 13, 14, 16, 17, 19]
+    assert effects[-1] == 19
+
+
+def test_object_added_again_before_compaction_is_kept():
+    enemies = EntityList()
+    zombie, daemon = ['zombie'], ['daemon']
+    enemies.append(zombie)
+    enemies.append(daemon)
+
+    enemies.remove(zombie)
+    enemies.append(zombie)
+    assert zombie in enemies
+    assert len(enemies) == 2
+
+    enemies.compact()
+    assert [id(enemy) for enemy in enemies] == [id(zombie), id(daemon)]
+    assert len(enemies.objects) == 2
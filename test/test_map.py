@@ -0,0 +1,236 @@
+import os
+from types import SimpleNamespace
+
+import pygame
+import pytest
+from map import Map
+from level_format import level_path
+
+
+def make_map(tiles, offgrid=None):
+    game_map = Map(None, tile_size=16)
+    game_map.tilemap.load_dict({f"{x};{y}": {'type': t_type, 'variant': variant, 'pos': [x, y]}
+                                for (x, y), (t_type, variant) in tiles.items()})
+    game_map.offgrid_tiles = offgrid or []
+    game_map.rebuild_indexes()
+    return game_map
+
+
+# --------------------------
+# Testing tile storage
+# --------------------------
+
+def test_tilemap_round_trip_with_negative_coordinates():
+    game_map = make_map({(0, 0): ('grass', 1), (-1, -20): ('stone', 2), (40, 3): ('decor', 0)})
+
+    assert len(game_map.tilemap) == 3
+    assert (-1, -20) in game_map.tilemap
+    assert game_map.tilemap.get(40, 3) == {'type': 'decor', 'variant': 0, 'pos': [40, 3]}
+    assert game_map.tilemap.to_dict()["-1;-20"]['type'] == 'stone'
+
+    game_map.tilemap.remove(-1, -20)
+    assert (-1, -20) not in game_map.tilemap
+    assert len(game_map.tilemap) == 2
+
+
+def test_physical_tiles_queries():
+    game_map = make_map({(1, 1): ('stone', 0), (2, 1): ('decor', 0)})
+
+    assert game_map.checking_physical_tiles((20, 20))['type'] == 'stone'
+    assert game_map.checking_physical_tiles((40, 20)) is None
+    assert len(game_map.tiles_around_the_player((32, 32))) == 1
+
+
+def test_collision_rects_are_merged_and_clipped():
+    # a 4x2 block of ground crossing the border between two chunks
+    game_map = make_map({(x, y): ('stone', 0) for x in range(14, 18) for y in range(5, 7)})
+
+    rects = game_map.tiles_around_the_player((15 * 16, 5 * 16))
+
+    assert rects == [pygame.Rect(14 * 16, 5 * 16, 32, 32), pygame.Rect(16 * 16, 5 * 16, 16, 32)]
+    assert game_map.tiles_around_the_player((15 * 16 + 3, 5 * 16 + 3)) is rects
+
+    game_map.tilemap.remove(16, 5)
+    assert game_map.tiles_around_the_player((15 * 16, 5 * 16))[1] == pygame.Rect(16 * 16, 6 * 16, 16, 16)
+
+
+def test_extract_removes_spawners():
+    game_map = make_map({(3, 4): ('spawners', 1), (0, 0): ('grass', 0)},
+                        offgrid=[{'type': 'spawners', 'variant': 0, 'pos': [5.0, 6.0]}])
+
+    matches = game_map.extract([('spawners', 0), ('spawners', 1)])
+
+    assert sorted(match['pos'] for match in matches) == [[5.0, 6.0], [48, 64]]
+    assert not game_map.offgrid_tiles
+    assert len(game_map.tilemap) == 1
+
+
+# --------------------------
+# Testing binary level format
+# --------------------------
+
+def test_binary_level_round_trip(tmp_path):
+    game_map = make_map({(0, 0): ('grass', 1), (-17, 3): ('stone', 2), (5, 5): ('spawners', 3)},
+                        offgrid=[{'type': 'decor', 'variant': 2, 'pos': [10.5, -4.0]},
+                                 {'type': 'loot_spawn', 'variant': 1, 'pos': [64.0, 32.0]}])
+    game_map.tilemap.set(2, 2, 'animated_tiles', 1, {'animation_speed': 4})
+
+    game_map.save(str(tmp_path / '0.lvl'))
+    loaded = Map(None)
+    loaded.load(str(tmp_path / '0.lvl'))
+
+    assert loaded.tilemap.to_dict() == game_map.tilemap.to_dict()
+    assert sorted(tile['type'] for tile in loaded.offgrid_tiles) == ['decor', 'loot_spawn']
+    assert loaded.checking_physical_tiles((-16 * 17 + 1, 50))['type'] == 'stone'
+
+
+def test_stale_binary_level_falls_back_to_json(tmp_path):
+    game_map = make_map({(0, 0): ('grass', 1)})
+    game_map.save(str(tmp_path / '0.json'))
+    game_map.save(str(tmp_path / '0.lvl'))
+    os.utime(tmp_path / '0.json', (1000, 1000))
+    os.utime(tmp_path / '0.lvl', (2000, 2000))
+    assert level_path(str(tmp_path), 0) == str(tmp_path / '0.lvl')
+
+    # the JSON map was edited after the conversion
+    game_map.tilemap.set(1, 0, 'stone', 2)
+    game_map.save(str(tmp_path / '0.json'))
+    os.utime(tmp_path / '0.json', (3000, 3000))
+    path = level_path(str(tmp_path), 0)
+    assert path == str(tmp_path / '0.json')
+
+    loaded = Map(None)
+    loaded.load(path)
+    assert loaded.tilemap.to_dict() == game_map.tilemap.to_dict()
+    assert level_path(str(tmp_path), 1) == str(tmp_path / '1.json')
+
+
+# --------------------------
+# Testing auto-tiling
+# --------------------------
+
+def test_auto_tile_placement_across_chunks():
+    # a horizontal grass strip crossing the border between two chunks
+    game_map = make_map({(x, 0): ('grass', 5) for x in range(14, 19)})
+    game_map.tilemap.set(16, 1, 'stone', 5)
+
+    game_map.auto_tile_placement()
+
+    assert [game_map.tilemap.get(x, 0)['variant'] for x in range(14, 19)] == [5, 5, 5, 5, 5]
+    game_map.tilemap.set(16, 1, 'grass', 5)
+    game_map.auto_tile_neighborhood((16, 1))
+    assert game_map.tilemap.get(16, 0)['variant'] == 1
+    assert game_map.tilemap.get(16, 1)['variant'] == 5
+
+
+def test_extract_spawns_groups_by_type():
+    game_map = make_map({(3, 4): ('spawners', 0), (1, 1): ('loot_spawn', 7), (0, 5): ('stone', 0)},
+                        offgrid=[{'type': 'chest_spawn', 'variant': 2, 'pos': [8.0, 8.0]},
+                                 {'type': 'decor', 'variant': 1, 'pos': [0.0, 0.0]},
+                                 {'type': 'spawners', 'variant': 3, 'pos': [1.0, 2.0]}])
+
+    spawns = game_map.extract_spawns()
+
+    assert [spawner['variant'] for spawner in spawns['spawners']] == [3, 0]
+    assert spawns['loot_spawn'][0]['pos'] == [16, 16]
+    assert spawns['chest_spawn'][0]['variant'] == 2
+    assert spawns['portal_spawn'] == []
+    assert game_map.offgrid_tiles == [{'type': 'decor', 'variant': 1, 'pos': [0.0, 0.0]}]
+    assert len(game_map.tilemap) == 1
+    assert not game_map.tilemap.locations
+
+
+# --------------------------
+# Testing raycasts
+# --------------------------
+
+def test_raycast_and_line_of_sight():
+    game_map = make_map({(5, y): ('stone', 0) for y in range(0, 4)})
+
+    assert game_map.raycast((8, 24), (200, 24)) == pytest.approx((80, 24))
+    assert not game_map.has_line_of_sight((8, 24), (200, 24))
+    assert game_map.has_line_of_sight((8, 24), (8, 200))
+    assert game_map.raycast((200, 24), (8, 24)) == pytest.approx((96, 24))
+
+    hits, points = game_map.raycast_many([(8, 24), (8, 24), (200, 24)], [(200, 24), (8, 200), (8, 24)])
+    assert hits.tolist() == [True, False, True]
+    assert points[0].tolist() == pytest.approx([80, 24]) and points[2].tolist() == pytest.approx([96, 24])
+
+
+# --------------------------
+# Testing chunk rendering
+# --------------------------
+
+def make_tile(color):
+    tile = pygame.Surface((16, 16))
+    tile.fill(color)
+    return tile
+
+
+def make_game():
+    return SimpleNamespace(assets={
+        'stone': [make_tile((255, 0, 0)), make_tile((0, 255, 0))],
+        'animated_tiles': [[make_tile((0, 0, 255)), make_tile((255, 255, 0))]],
+    })
+
+
+def test_edited_chunk_is_rebaked():
+    game_map = make_map({(0, 0): ('stone', 0), (20, 0): ('stone', 0)})
+    game_map.game = make_game()
+    surf = pygame.Surface((512, 256))
+    game_map.render(surf)
+    first, second = game_map.chunk_surfaces[(0, 0)], game_map.chunk_surfaces[(1, 0)]
+    assert surf.get_at((8, 8))[:3] == (255, 0, 0)
+
+    game_map.tilemap.set(0, 0, 'stone', 1)
+    game_map.tilemap.set(1, 0, 'stone', 0)
+    game_map.render(surf)
+
+    assert game_map.chunk_surfaces[(0, 0)] is not first
+    assert game_map.chunk_surfaces[(1, 0)] is second
+    assert surf.get_at((8, 8))[:3] == (0, 255, 0)
+    assert surf.get_at((24, 8))[:3] == (255, 0, 0)
+
+
+def test_animated_index_follows_tile_edits():
+    game_map = make_map({(0, 0): ('stone', 0), (3, 2): ('animated_tiles', 0)})
+    game_map.game = make_game()
+    assert game_map.animated_index == {(0, 0): [(3, 2, 0, 1)]}
+
+    game_map.tilemap.set(3, 2, 'stone', 0)
+    game_map.tilemap.set(17, 1, 'animated_tiles', 0, {'animation_speed': 2})
+    game_map.sync_chunks()
+    assert game_map.animated_index == {(1, 0): [(17, 1, 0, 2)]}
+
+    surf = pygame.Surface((512, 256))
+    game_map.tick = 2
+    game_map.render(surf)
+    assert surf.get_at((17 * 16 + 8, 24))[:3] == (255, 255, 0)
+    assert surf.get_at((3 * 16 + 8, 40))[:3] == (255, 0, 0)
+
+
+# --------------------------
+# Testing level streaming
+# --------------------------
+
+def test_streamed_level_loads_regions_around_view(tmp_path):
+    # ground strip across 12 regions of 4x4 chunks
+    game_map = make_map({(x, 0): ('stone', 0) for x in range(0, 12 * 64, 4)})
+    game_map.tilemap.set(2, 0, 'spawners', 0)
+    game_map.tilemap.set(700, 0, 'spawners', 1)
+    game_map.save(str(tmp_path / '0.lvl'))
+
+    loaded = Map(None)
+    loaded.load_binary(str(tmp_path / '0.lvl'), streaming=True)
+    assert [spawner['variant'] for spawner in loaded.extract_spawns()['spawners']] == [0]
+
+    regions, released = loaded.stream(pygame.Rect(0, 0, 640, 480), wait=True)
+    assert sorted(region for region, _ in regions) == [(0, 0), (1, 0)]
+    assert loaded.tilemap.get(4, 0)['type'] == 'stone' and (704, 0) not in loaded.tilemap
+
+    regions, released = loaded.stream(pygame.Rect(700 * 16, 0, 640, 480), wait=True)
+    assert sorted(released) == [(0, 0), (1, 0)]
+    assert [tile['pos'] for region, tiles in regions for tile in tiles] == [[700 * 16, 0]]
+    assert (4, 0) not in loaded.tilemap and loaded.tilemap.get(700, 0) is None
+    assert loaded.checking_physical_tiles((704 * 16, 0))['type'] == 'stone'
+    loaded.streamer.close()
@@ -0,0 +1,48 @@
+import pygame
+from outline import OUTLINE_FRAME, OUTLINE_SPRITES, OutlineStage
+from support import mark_static
+
+
+def make_sprite(size=(4, 4), color=(255, 0, 0)):
+    sprite = pygame.Surface(size, pygame.SRCALPHA)
+    sprite.fill(color)
+    return sprite
+
+
+# --------------------------
+# Testing the sprites mode
+# --------------------------
+
+def test_only_static_sprites_get_cached_outlines():
+    stage = OutlineStage(OUTLINE_SPRITES)
+    layer = stage.make_layer((16, 16))
+    static, overlay = mark_static(make_sprite()), make_sprite()
+
+    layer.blits([(static, (2, 2)), (overlay, (10, 10))], doreturn=False)
+
+    assert layer.get_at((1, 2)).a == 180  # outline left of the static sprite
+    assert layer.get_at((2, 2)) == (255, 0, 0, 255)
+    assert layer.get_at((9, 10)).a == 0  # the overlay is drawn without an outline
+    assert static in stage.sprite_outlines and overlay not in stage.sprite_outlines
+
+
+# --------------------------
+# Testing the frame mode
+# --------------------------
+
+def test_frame_outline_covers_the_drawn_area_only():
+    stage = OutlineStage(OUTLINE_FRAME)
+    layer = stage.make_layer((32, 32))
+    layer.fill((0, 0, 0, 0))
+    layer.blit(make_sprite(), (10, 10))
+    pygame.draw.rect(layer, (0, 255, 0), (20, 20, 2, 2))  # not reported to the layer, so not outlined
+    assert layer.drawn == pygame.Rect(10, 10, 4, 4)
+
+    target = pygame.Surface((32, 32))
+    target.fill((255, 255, 255))
+    stage.apply(layer, target)
+
+    assert target.get_at((9, 11)) != (255, 255, 255)
+    assert target.get_at((9, 9)) == (255, 255, 255)  # diagonal neighbours are not part of the outline
+    assert target.get_at((19, 20)) == (255, 255, 255)
+    assert layer.drawn is None
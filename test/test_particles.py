@@ -0,0 +1,155 @@
+import math
+from types import SimpleNamespace
+
+import pygame
+import pytest
+from particle import (ParticleBudget, ParticleSystem, SparkSystem, create_particles, PRIORITY_AMBIENT,
+                      PRIORITY_COMBAT, PRIORITY_PLAYER)
+from support import Animation
+
+
+# --------------------------
+# Testing SparkSystem
+# --------------------------
+
+def test_sparks_move_slow_down_and_disappear():
+    sparks = SparkSystem(capacity=1)
+    sparks.add((0, 0), 0, 1.0, spark_color=(1, 2, 3))
+    sparks.add((10, 10), math.pi / 2, 0.25)
+
+    sparks.update()
+    assert len(sparks) == 2
+    assert sparks.pos[:2].ravel().tolist() == pytest.approx([1.0, 0.0, 10.0, 10.25])
+    assert sparks.speed[:2].tolist() == pytest.approx([0.9, 0.15])
+
+    sparks.update(steps=2)
+    assert len(sparks) == 1
+    assert sparks.color[0].tolist() == [1, 2, 3]
+
+
+def test_spark_added_at_a_rect_starts_at_its_top_left():
+    sparks = SparkSystem()
+    sparks.add(pygame.Rect(10, 10, 20, 30), 0.5, 2.3)
+    assert sparks.pos[0].tolist() == [10, 10]
+
+
+def test_spark_polygons_are_culled_outside_the_view():
+    sparks = SparkSystem()
+    sparks.add((50, 50), 0, 2.0)
+    sparks.add((500, 50), 0, 2.0)
+
+    vertices, colors = sparks.vertices(offset=(10, 0), size=(100, 100), margin=5)
+
+    assert len(vertices) == len(colors) == 1
+    assert vertices[0].ravel().tolist() == pytest.approx([46, 50, 40, 51, 34, 50, 40, 49])
+
+
+# --------------------------
+# Testing ParticleSystem
+# --------------------------
+
+def make_particle_game():
+    images = [pygame.Surface((4, 2)), pygame.Surface((6, 6))]
+    return SimpleNamespace(assets={'particle/particle': Animation(images, img_dur=2, loop=False)})
+
+
+def test_particles_play_once_and_recycle_slots():
+    particles = ParticleSystem(make_particle_game(), capacity=2)
+    first = particles.add('particle', (10, 10), velocity=(1, 0))
+    particles.add('particle', (20, 20), frame=3)
+    assert particles.add('particle', (30, 30)) is None  # the pool is full
+
+    particles.update()
+    assert particles.pos[first].tolist() == [11, 10]
+    assert particles.frame.tolist() == [1, 3]
+
+    particles.update()  # the second particle is drawn for the last time
+    assert particles.expired.tolist() == [False, True]
+    particles.update()
+    assert len(particles) == 1
+    assert particles.add('particle', (30, 30)) == 1
+
+
+def test_burst_at_a_rect_starts_at_its_top_left():
+    game = SimpleNamespace(sparks=SparkSystem(), particles=ParticleSystem(make_particle_game(), capacity=8))
+    create_particles(game, pygame.Rect(10, 20, 8, 16), num_particles=(3, 3))
+
+    assert len(game.sparks) == len(game.particles) == 3
+    assert game.sparks.pos[:3].tolist() == [[10, 20]] * 3
+    assert game.particles.pos[game.particles.active].tolist() == [[10, 20]] * 3
+
+
+def test_particles_are_drawn_centered_with_their_frame():
+    particles = ParticleSystem(make_particle_game())
+    particles.add('particle', (10, 10), frame=2)
+    particles.add('particle', (500, 10))
+    particles.update()
+
+    surf = pygame.Surface((32, 32))
+    surf.fill((255, 255, 255))
+    particles.render(surf, offset=(2, 0))
+
+    # the second image (6x6) centered at (8, 10)
+    assert surf.get_at((5, 7)) == (0, 0, 0)
+    assert surf.get_at((10, 12)) == (0, 0, 0)
+    assert surf.get_at((4, 7)) == (255, 255, 255)
+    assert surf.get_at((5, 6)) == (255, 255, 255)
+
+
+# --------------------------
+# Testing ParticleBudget
+# --------------------------
+
+def test_bursts_below_player_priority_are_thinned_near_the_cap():
+    budget = ParticleBudget({'sparks': 100}, thin_level=0.5)
+
+    assert budget.spawn_count('sparks', 50, 10, PRIORITY_AMBIENT) == 10
+    assert budget.spawn_count('sparks', 75, 10, PRIORITY_AMBIENT) == 5
+    assert budget.spawn_count('sparks', 100, 10, PRIORITY_COMBAT) == 0
+    assert budget.spawn_count('sparks', 100, 10, PRIORITY_PLAYER) == 10
+    assert budget.report() == {'sparks': {'hits': 0, 'evicted': 0, 'dropped': 0, 'thinned': 15}}
+
+
+def test_sparks_at_the_cap_evict_the_oldest_lower_priority_spark():
+    budget = ParticleBudget({'sparks': 3})
+    sparks = SparkSystem(capacity=2, budget=budget)
+    sparks.add((0, 0), 0, 1.0, priority=PRIORITY_COMBAT)
+    sparks.add((1, 0), 0, 1.0, priority=PRIORITY_AMBIENT)
+    sparks.add((2, 0), 0, 1.0, priority=PRIORITY_AMBIENT)
+
+    sparks.add((3, 0), 0, 1.0, priority=PRIORITY_AMBIENT)  # nothing lower to evict
+    sparks.add((4, 0), 0, 1.0, priority=PRIORITY_PLAYER)
+
+    assert len(sparks) == 3
+    assert sparks.pos[:3, 0].tolist() == [0, 2, 4]
+    assert budget.counters['sparks'] == {'hits': 2, 'evicted': 1, 'dropped': 1, 'thinned': 0}
+
+
+def test_full_particle_pool_evicts_expiring_then_low_priority_particles():
+    budget = ParticleBudget({'particles': 3})
+    particles = ParticleSystem(make_particle_game(), budget=budget)
+    particles.add('particle', (0, 0), frame=3, priority=PRIORITY_PLAYER)
+    particles.add('particle', (1, 0), priority=PRIORITY_AMBIENT)
+    particles.add('particle', (2, 0), priority=PRIORITY_AMBIENT)
+    particles.update()
+    particles.update()  # the first particle is drawn for the last time
+
+    assert particles.add('particle', (3, 0), priority=PRIORITY_AMBIENT) == 0
+    assert particles.add('particle', (4, 0), priority=PRIORITY_COMBAT) == 1
+    assert particles.add('particle', (5, 0), priority=PRIORITY_COMBAT) == 2
+    assert particles.add('particle', (6, 0), priority=PRIORITY_COMBAT) == 0
+    assert particles.add('particle', (7, 0), priority=PRIORITY_COMBAT) is None
+    assert particles.pos[:, 0].tolist() == [6, 4, 5]
+    assert budget.counters['particles'] == {'hits': 5, 'evicted': 4, 'dropped': 1, 'thinned': 0}
+
+
+def test_effect_lists_keep_their_cap():
+    budget = ParticleBudget({'damage': 2})
+    damage_rates = []
+    numbers = [SimpleNamespace() for _ in range(4)]
+
+    assert budget.append(damage_rates, numbers[0], 'damage', PRIORITY_COMBAT)
+    assert budget.append(damage_rates, numbers[1], 'damage', PRIORITY_PLAYER)
+    assert budget.append(damage_rates, numbers[2], 'damage', PRIORITY_PLAYER)
+    assert not budget.append(damage_rates, numbers[3], 'damage', PRIORITY_COMBAT)
+    assert damage_rates == [numbers[1], numbers[2]]
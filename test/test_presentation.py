@@ -0,0 +1,31 @@
+import pygame
+from presentation import Presentation
+
+
+def make_frame(size=(8, 6)):
+    frame = pygame.Surface(size)
+    frame.fill((0, 0, 0))
+    frame.fill((255, 0, 0), (0, 0, 1, 1))
+    return frame
+
+
+# --------------------------
+# Testing Presentation
+# --------------------------
+
+def test_frame_of_the_screen_size_is_blitted_with_the_offset():
+    screen = pygame.Surface((8, 6))
+    Presentation(screen).present(make_frame(), (2, 1))
+    assert screen.get_at((2, 1))[:3] == (255, 0, 0)
+
+
+def test_screen_shake_is_scaled_with_the_frame():
+    screen = pygame.Surface((24, 18))
+    presentation = Presentation(screen)
+    presentation.present(make_frame(), (2, 1))
+
+    # the red logical pixel becomes a 3x3 block, moved by the shake offset times the scale
+    assert screen.get_at((6, 3))[:3] == (255, 0, 0)
+    assert screen.get_at((8, 5))[:3] == (255, 0, 0)
+    assert screen.get_at((5, 3))[:3] != (255, 0, 0)
+    assert screen.get_at((9, 6))[:3] != (255, 0, 0)
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pygame
+from render_queue import RenderQueue, draw_shape
+from support import Animation
+
+
+def make_sprite(color, size=(4, 4)):
+    sprite = pygame.Surface(size)
+    sprite.fill(color)
+    return sprite
+
+
+# --------------------------
+# Testing RenderQueue
+# --------------------------
+
+def test_layers_are_drawn_in_order_and_offscreen_sprites_culled():
+    queue = RenderQueue((32, 32), layers=2)
+    red, green, blue = make_sprite((255, 0, 0)), make_sprite((0, 255, 0)), make_sprite((0, 0, 255))
+
+    queue.layer(1).blit(red, (2, 2))
+    queue.layer(0).blit(green, (2, 2))
+    queue.layer(0).blit(blue, (4, 4))
+    queue.layer(1).blit(red, (40, 2))
+    queue.layer(0).blit(blue, (-10, -10))
+
+    target = pygame.Surface((32, 32))
+    queue.flush(target)
+
+    assert target.get_at((3, 3)) == (255, 0, 0)
+    assert target.get_at((6, 6)) == (0, 0, 255)
+    assert queue.last_frame == {'submitted': 5, 'culled': 2, 'draw_calls': 2}
+
+
+def test_shapes_keep_their_place_between_sprites():
+    queue = RenderQueue((16, 16), layers=1)
+    layer = queue.layer(0)
+    layer.blit(make_sprite((255, 0, 0), (8, 8)), (0, 0))
+    draw_shape(layer, pygame.draw.rect, (0, 255, 0), (0, 0, 4, 4))
+    layer.blit(make_sprite((0, 0, 255), (2, 2)), (0, 0))
+
+    target = pygame.Surface((16, 16))
+    assert queue.flush(target) == 3
+    assert target.get_at((0, 0)) == (0, 0, 255)
+    assert target.get_at((3, 3)) == (0, 255, 0)
+    assert target.get_at((6, 6)) == (255, 0, 0)
+
+    direct = pygame.Surface((16, 16))
+    draw_shape(direct, pygame.draw.rect, (0, 255, 0), (0, 0, 4, 4))
+    assert direct.get_at((3, 3)) == (0, 255, 0)
+
+
+def test_visible_uses_camera_rect_with_margin():
+    class Sprite:
+        def __init__(self, rect):
+            self.rect = pygame.Rect(rect)
+
+    class Entity:
+        def __init__(self, pos):
+            self.pos = pos
+
+        def rect(self):
+            return pygame.Rect(self.pos, (8, 8))
+
+    class Spark:
+        def __init__(self, pos):
+            self.pos = pos
+
+    queue = RenderQueue((100, 100))
+    queue.set_camera((500, 0), margin=10)
+
+    assert queue.visible(Sprite((595, 50, 4, 4)))
+    assert queue.visible(Entity((485, 50)))
+    assert not queue.visible(Entity((480, 50)))
+    assert queue.visible(Spark((609, 109)))
+    assert not queue.visible(Spark((611, 50)))
+
+
+def test_large_enemy_sprite_at_the_screen_edge_stays_visible():
+    from entities import SupremeDaemon
+
+    game = SimpleNamespace(assets={'supreme_daemon/idle': Animation([pygame.Surface((120, 200))])})
+    daemon = SupremeDaemon(game, (50, 220))
+    queue = RenderQueue((100, 100))
+    queue.set_camera((0, 0))
+
+    # the 8x15 body is far below the view, the sprite drawn 140 pixels above it reaches into the view
+    assert not queue.camera.colliderect(daemon.rect())
+    assert daemon.cull_rect().top < 100
+    assert queue.visible(daemon)
+
+    daemon.pos[1] = 400
+    assert not queue.visible(daemon)
@@ -0,0 +1,30 @@
+import gc
+
+import pygame
+from support import ROTATED_IMAGES, ROTATION_STEPS, prepare_rotations, rotated
+
+
+# --------------------------
+# Testing the rotation cache
+# --------------------------
+
+def test_rotated_copies_are_cached_per_step():
+    image = pygame.Surface((8, 4))
+    step = 360 / ROTATION_STEPS
+
+    assert rotated(image, 0) is image
+    assert rotated(image, 360) is image
+    assert rotated(image, 90) is rotated(image, 90 + step / 3)
+    assert rotated(image, 90).get_size() == (4, 8)
+    assert rotated(image, -step) is rotated(image, 360 - step)
+
+
+def test_cache_entry_is_freed_with_the_source_image():
+    image = pygame.Surface((8, 4))
+    prepare_rotations(image)
+    assert image in ROTATED_IMAGES
+    entries = len(ROTATED_IMAGES)
+
+    del image
+    gc.collect()
+    assert len(ROTATED_IMAGES) == entries - 1
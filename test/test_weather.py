@@ -0,0 +1,38 @@
+import pygame
+from weather import Rain
+
+
+# --------------------------
+# Testing Rain
+# --------------------------
+
+def test_drops_fall_with_the_wind_and_restart_above_the_screen():
+    rain = Rain((100, 100), seed=1)
+    rain.start(density=50, wind=2)
+    rain.pos[0] = (10, 95)
+    rain.speed[0] = 6
+    rain.pos[1] = (10, 20)
+    rain.speed[1] = 5
+
+    rain.update()
+    assert rain.pos[1].tolist() == [12, 25]
+    assert -50 <= rain.pos[0, 1] <= -10 and 0 <= rain.pos[0, 0] <= 100
+    assert 5 <= rain.speed[0] <= 10
+
+    rain.wind = -1
+    rain.update()
+    assert rain.pos[1].tolist() == [11, 30]
+
+
+def test_density_can_change_while_it_rains():
+    rain = Rain((100, 100), shades=3, seed=2)
+    rain.start(density=10, wind=1)
+    rain.set_density(4)
+    assert len(rain) == 4
+    rain.set_density(30)
+    assert len(rain) == 30
+    assert len({id(sprite) for sprite in rain.drop_sprites}) <= 3
+
+    surf = pygame.Surface((100, 100))
+    rain.render(surf)
+    assert pygame.transform.average_color(surf)[2] > 0  # blue drops on the black surface
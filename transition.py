@@ -0,0 +1,49 @@
+import pygame
+
+
+class IrisTransition:
+    """
+    Iris wipe between scenes: everything except a circle in the center is covered, the circle shrinks or grows.
+    The overlay is allocated once, and only the area of the previous circle is repainted when the radius changes.
+    """
+    def __init__(self, size, steps=30, radius_step=8, color=(0, 0, 0), key_color=(255, 255, 255)):
+        """
+        Initializes the IrisTransition object.
+        :param size: The size of the covered surface.
+        :param steps: Number of frames from a fully open to a fully closed iris.
+        :param radius_step: Change of the circle radius per frame (in pixels).
+        :param color: The color of the cover.
+        :param key_color: The color of the circle (transparent when the overlay is drawn).
+        """
+        self.steps = steps
+        self.radius_step = radius_step
+        self.color = color
+        self.key_color = key_color
+        self.overlay = pygame.Surface(size)
+        self.overlay.fill(color)
+        self.overlay.set_colorkey(key_color)
+        self.center = (size[0] // 2, size[1] // 2)
+        self.radius = 0
+
+    def set_radius(self, radius):
+        """
+        Redraw the circle of the overlay.
+        :param radius: The new circle radius in pixels.
+        """
+        if radius == self.radius:
+            return
+        if self.radius > 0:
+            old_area = pygame.Rect(0, 0, self.radius * 2 + 2, self.radius * 2 + 2)
+            old_area.center = self.center
+            self.overlay.fill(self.color, old_area)
+        pygame.draw.circle(self.overlay, self.key_color, self.center, radius)
+        self.radius = radius
+
+    def render(self, surf, progress):
+        """
+        Cover a surface.
+        :param surf: The surface to cover.
+        :param progress: Transition frame from -steps to steps (0 - the iris is fully open, +-steps - closed).
+        """
+        self.set_radius(max(0, (self.steps - abs(progress)) * self.radius_step))
+        surf.blit(self.overlay, (0, 0))
@@ -7,6 +7,11 @@ from items import Equipment, Book, QuestItem
 from data import POTIONS, SCROLLS, SKILLS, MERCHANT_ITEM_POS, UI_PATH, UI_SET
 
 
+# HUD widgets in drawing order
+HUD_WIDGETS = ('heart', 'corner_set', 'mana', 'vignette', 'hud_bg', 'life', 'stamina', 'level', 'potion_bar', 'potions',
+               'spell_bar', 'spells', 'scroll_slot', 'scroll', 'experience', 'status')
+
+
 class UI:
     """
     Class UI represents user interface on display in game.
@@ -71,6 +76,30 @@ class UI:
         # Settings for pulsation
         self.pulse_time = 0
 
+        # retained HUD: blit entries of every widget, rebuilt only when the value shown by the widget changes
+        self.panel_x = - 6
+        self.panel_y = self.display_height - self.panel.get_height() + 20
+        self.inventory_x = self.display_width // 2 - self.big_inventory_bar.get_width() // 2 + 24
+        self.inventory_y = 8
+        self.sb_x = self.display_width // 2 - 172
+        self.sb_y = self.display_height - 74
+        self.hud_base = [(self.panel, (self.panel_x, self.panel_y)),
+                         (self.player_icon, (self.panel_x + 15, self.panel_y + 25))]
+        self.hud_entries = {  # widget -> blit entries, the static widgets are built once
+            'corner_set': [(self.corner_set, (self.display_width - 87, self.display_height - 115))],
+            'vignette': [(self.vignette, (self.display_width - 98, self.display_height - 96))],
+            'hud_bg': [(self.hud_bg, (10, 10))],
+            'potion_bar': [(self.big_inventory_bar, (self.inventory_x, self.inventory_y))],
+            'spell_bar': [(self.spell_bar, (self.sb_x, self.sb_y))],
+            'scroll_slot': [(self.scroll_slot, (self.display_width - 80, 2))],
+        }
+        self.hud_values = {}  # widget -> value shown by its entries
+        self.hud_blits = []  # entries of all widgets in drawing order
+        self.text_cache = {}  # slot -> ((font, text, color), rendered text)
+        self.scaled_hearts = {}  # heart image -> heart image scaled for the HUD
+        self.cooldown_overlay = pygame.Surface((24, 24), pygame.SRCALPHA)
+        self.cooldown_overlay.fill((0, 0, 0, 150))
+
     @staticmethod
     def update_pulse_effect(image):
         """
@@ -103,26 +132,14 @@ class UI:
         self.game.display.blit(image, image_rect.topleft)
 
     def render(self):
+        """
+        Draw the HUD: the hero panel, the blood screen overlay and the HUD widgets.
+        The blit entries of a widget are rebuilt only when the value it shows changes (see hud_state),
+        all entries are drawn with one Surface.blits call.
+        """
+        self.game.display.blits(self.hud_base, doreturn=False)
 
-        # hero panel
-        panel_x = - 6
-        panel_y = self.display_height - self.panel.get_height() + 20
-        self.game.display.blit(self.panel, (panel_x, panel_y))
-
-        # hero icon
-        hero_icon_x = panel_x + 15
-        hero_icon_y = panel_y + 25
-        self.game.display.blit(self.player_icon, (hero_icon_x, hero_icon_y))
-
-        # health & blood screen overlays
-        heart_images = {
-            range(80, 1001): self.heart_full,
-            range(60, 80): self.heart_tq,
-            range(40, 60): self.heart_half,
-            range(20, 40): self.heart_quarter,
-            range(0, 20): self.heart_empty
-        }
-
+        # blood screen overlays
         health = int((self.game.player.current_health / self.game.player.max_health) * 100)
 
         if health <= 5:
@@ -135,17 +152,44 @@ class UI:
             pulsating_image, original_size = self.update_pulse_effect(self.blood_overlay_hard)
             self.blit_centered(pulsating_image, original_size)
 
+        changed = not self.hud_blits
+        for widget, value in self.hud_state(health).items():
+            if widget not in self.hud_values or self.hud_values[widget] != value:
+                self.hud_values[widget] = value
+                self.hud_entries[widget] = getattr(self, 'hud_' + widget)(value)
+                changed = True
+        if changed:
+            self.hud_blits = [entry for widget in HUD_WIDGETS for entry in self.hud_entries[widget]]
+        self.game.display.blits(self.hud_blits, doreturn=False)
+
+    def text(self, slot, font, text, color):
+        """
+        Render a HUD text, reusing the surface of the previous call for the same slot while the text is unchanged.
+        :param slot: Name of the place the text is shown at.
+        """
+        key = (font, text, color)
+        cached = self.text_cache.get(slot)
+        if cached is None or cached[0] != key:
+            cached = self.text_cache[slot] = (key, font.render(text, True, color))
+        return cached[1]
+
+    def hud_state(self, health):
+        """
+        Collect the values shown by the dynamic HUD widgets.
+        :param health: Player's health in percent.
+        :return: Dictionary widget name -> value.
+        """
+        player = self.game.player
+
+        heart_images = {
+            range(80, 1001): self.heart_full,
+            range(60, 80): self.heart_tq,
+            range(40, 60): self.heart_half,
+            range(20, 40): self.heart_quarter,
+            range(0, 20): self.heart_empty
+        }
         self.heart_image = next((img for rng, img in heart_images.items() if health in rng), self.heart_empty)
-        self.game.display.blit(pygame.transform.scale(
-            self.heart_image, (
-                self.heart_image.get_width() * 1.2, self.heart_image.get_height() * 1.2)), (22, 16))
-
-        # mana
-        self.game.display.blit(self.corner_set, (self.display_width - 87, self.display_height - 115))
-        current_mana = self.game.player.mana
-        mana_image = self.globe_empty
-        mana_x = self.display_width - 82
-        mana_y = self.display_height - 82
+
         mana_images = {
             range(100, 126): self.globe_full,
             range(75, 100): self.globe_tq,
@@ -153,161 +197,32 @@ class UI:
             range(25, 50): self.globe_quarter,
             range(0, 25): self.globe_empty
         }
-
         for mana_range, mana_image in mana_images.items():
-            if current_mana in mana_range:
+            if player.mana in mana_range:
                 break
-        self.game.display.blit(mana_image, (mana_x, mana_y))
-        self.game.display.blit(self.vignette, (self.display_width - 98, self.display_height - 96))
 
-        # hud_bg
-        self.game.display.blit(self.hud_bg, (10, 10))
+        stamina_width = pygame.Rect(0, 0, player.stamina * 0.8, 3).width
+        stamina_intensity = min(int(255 * (player.stamina / player.max_stamina)), 255)
 
-        # life
-        for i in range(6):
-            life_heart_x = 50 + i * 15
-            life_heart_y = 28
-            if i < self.game.player.life:
-                self.game.display.blit(self.life_full, (life_heart_x, life_heart_y))
-            else:
-                self.game.display.blit(self.life_empty, (life_heart_x, life_heart_y))
-
-        # diamonds
-        # diamond_x = panel_x + 76
-        # diamond_y = panel_y + 16
-        # self.game.display.blit(self.diamond_icon, (diamond_x, diamond_y))
-        # artifacts_text = self.font.render(f" {self.game.artifacts_remaining}", True, (148, 0, 211))
-        # self.game.display.blit(artifacts_text, (diamond_x + 16, diamond_y + 1))
-
-        # coins
-        # coins_x = panel_x + 110
-        # coins_y = panel_y + 16
-        # self.game.display.blit(self.coin_icon, (coins_x, coins_y))
-        # coins_count = self.font.render(f" {self.game.player.money}", True, self.text_color)
-        # self.game.display.blit(coins_count, (coins_x + 16, coins_y + 1))
-
-        # shuriken
-        # shuriken_count = self.game.player.shuriken_count
-        # shuriken_count_x = panel_x + 162
-        # shuriken_count_y = panel_y + 16
-        # self.game.display.blit(self.shuriken_icon, (shuriken_count_x, shuriken_count_y))
-        # shuriken_remaining = self.font.render(f" {shuriken_count}", True, (176, 196, 222))
-        # self.game.display.blit(shuriken_remaining, (shuriken_count_x + 16, shuriken_count_y + 1))
-
-        # stamina
-        st_x = 54
-        st_y = 24
-        intensity = min(int(255 * (self.game.player.stamina / self.game.player.max_stamina)), 255)
-        stamina_color = (0, intensity, 0)
-        stamina_rect = pygame.Rect(st_x, st_y, self.game.player.stamina * 0.8, 3)
-        pygame.draw.rect(self.game.display, stamina_color, stamina_rect)
-
-        for i in range(stamina_rect.width):
-            gradient_intensity = int(255 * (i / stamina_rect.width))
-            gradient_color = (0, gradient_intensity, 0)
-            pygame.draw.line(self.game.display, gradient_color, (st_x + i, st_y),
-                             (st_x + i, st_y + stamina_rect.height), 0)
-
-        # player_level
-        l_x, l_y = panel_x + 78, panel_y + 22
-        player_level = f"{self.game.player.level}"
-        level_render = self.font_lvl.render(player_level, True, (255, 255, 255))
-        self.game.display.blit(level_render, (l_x, l_y))
-
-        # potion_bar
-        inventory_x = self.display_width // 2 - self.big_inventory_bar.get_width() // 2 + 24
-        inventory_y = 8
-        self.game.display.blit(self.big_inventory_bar, (inventory_x, inventory_y))
-
-        # potions
-        x, y = inventory_x + 6, inventory_y + 8
-        icon_offset = 36
+        potions = (player.heal_potions, player.magic_potions, player.stamina_potions, player.power_potions,
+                   player.antidotes, player.defense_potions)
 
-        potions = [
-            (self.heal_potion_icon, self.game.player.heal_potions),
-            (self.mana_potion_icon, self.game.player.magic_potions),
-            (self.stamina_potion_icon, self.game.player.stamina_potions),
-            (self.power_potion_icon, self.game.player.power_potions),
-            (self.antidote_icon, self.game.player.antidotes),
-            (self.defense_potion_icon, self.game.player.defense_potions),
-        ]
-
-        for potion_icon, potion_count in potions:
-            if potion_count > 0:
-                self.game.display.blit(potion_icon, (x, y))
-                potion_count_text = self.font.render(f" {potion_count}", True, self.text_color)
-                self.game.display.blit(potion_count_text, (x + 18, y + 18))
-            x += icon_offset
-
-        # frame
-        frame_positions = [x - 217 + i * 36 for i in range(7)]
-        active_frame = self.game.player.selected_item
-        if 1 <= active_frame <= len(frame_positions):
-            self.game.display.blit(self.potion_bar_frame, (frame_positions[active_frame - 1], y - 9))
-
-        # spells
-        sb_x = self.display_width // 2 - 172
-        sb_y = self.display_height - 74
-        self.game.display.blit(self.spell_bar, (sb_x, sb_y))
-
-        spells = self.game.player.spells
-        spell_cooldowns = self.game.player.spell_cooldowns
-        cooldown_durations = self.game.player.cooldown_durations
         current_time = pygame.time.get_ticks()
+        spells = []
+        for spell in player.spells:
+            remaining_time = (player.cooldown_durations[spell] - (current_time - player.spell_cooldowns[spell])) / 1000
+            spells.append((spell, int(remaining_time) if remaining_time > 0 else None))
 
-        if spells:
-            x, y = sb_x, sb_y
-            icon_offset = 28
-            for spell in spells:
-                self.game.display.blit(self.spellbook[spell], (x + 64, y + 28))
-
-                remaining_time = (cooldown_durations[spell] - (current_time - spell_cooldowns[spell])) / 1000
-                if remaining_time > 0:
-                    # spell inactive until recharge
-                    overlay = pygame.Surface((24, 24), pygame.SRCALPHA)
-                    overlay.fill((0, 0, 0, 150))
-                    self.game.display.blit(overlay, (x + 64, y + 28))
-                    text = self.font.render(f"{int(remaining_time)}", True, (255, 255, 255))
-                    text_rect = text.get_rect(center=(x + 76, y + 40))
-                    self.game.display.blit(text, text_rect)
-                x += icon_offset
-
-        # scrolls
-        self.game.display.blit(self.scroll_slot, (self.display_width - 80, 2))
-        active_scroll = self.game.player.selected_scroll
-        scrolls = sorted(list({(key, value) for key, value in self.game.player.scrolls.items() if value > 0}))
-        if scrolls:
-            x = self.display_width - 74
-            y = 10
-            scroll = self.spellbook[scrolls[active_scroll][0]]
-            count = scrolls[active_scroll][1]
-            self.game.display.blit(scroll, (x, y))
-            scroll_count = self.font2.render(f" {count}", True, self.text_color)
-            self.game.display.blit(scroll_count, (x + 44, y + 46))
-
-        # experience
-        xp_x = 208
-        xp_y = self.display_height - 58
-        # self.game.display.blit(self.xp_bar, (xp_x, xp_y))
-        xp_line = int(self.game.player.experience / self.game.player.next_level_experience * 100)
-        rect = pygame.Rect(xp_x, xp_y, xp_line, 4)
-        pygame.draw.rect(self.game.display, (0, 191, 255), rect)
-
-        text = f"XP {self.game.player.experience} / {self.game.player.next_level_experience}"
-        text_render = self.font_ui.render(text, True, (255, 255, 255))
-        text_width, text_height = self.font.size(text)
-        text_x = xp_x - 90 - text_width / 2
-        text_y = xp_y + 10 - text_height / 2
-        self.game.display.blit(text_render, (text_x, text_y))
+        scrolls = sorted(list({(key, value) for key, value in player.scrolls.items() if value > 0}))
 
         # status
         status_updates = [
-            (self.corrupted_icon, 'corruption', self.game.player.corruption),
-            (self.double_power_icon, 'double_power', self.game.player.double_power == 2),
-            (self.super_speed_icon, 'super_speed', self.game.player.super_speed == 2),
-            (self.bloodlust_icon, 'critical_hit', self.game.player.critical_hit_chance),
-            (self.invulnerability_icon, 'invulnerability', self.game.player.invulnerability),
-            (self.enhanced_protection_icon, 'enhanced_protection', self.game.player.enhanced_protection),
+            (self.corrupted_icon, 'corruption', player.corruption),
+            (self.double_power_icon, 'double_power', player.double_power == 2),
+            (self.super_speed_icon, 'super_speed', player.super_speed == 2),
+            (self.bloodlust_icon, 'critical_hit', player.critical_hit_chance),
+            (self.invulnerability_icon, 'invulnerability', player.invulnerability),
+            (self.enhanced_protection_icon, 'enhanced_protection', player.enhanced_protection),
         ]
 
         for icon, status, condition in status_updates:
@@ -325,21 +240,126 @@ class UI:
             'enhanced_protection': ('enhanced_protection_timer', 'enhanced_protection_timer_max')
         }
 
+        statuses = []
         for pos, (icon, status) in enumerate(self.status_bar):
-            x = sb_x + 60 + (22 * pos)
-            y = sb_y - 12
-            color = (255, 255, 255)
-
             if status in timer_attributes:
                 timer_attribute, timer_max_attribute = timer_attributes[status]
-                left_time = getattr(self.game.player, timer_attribute)
+                left_time = getattr(player, timer_attribute)
                 elapsed_time = getattr(self, timer_max_attribute) - left_time
                 transparency = 255 - min(255, int(255 * (elapsed_time / getattr(self, timer_max_attribute))))
-                icon.set_alpha(transparency)
-                self.game.display.blit(icon, (x, y))
-                timer_text = self.font.render(f"{left_time // 60}", True, color)
-                timer_text.set_alpha(transparency)
-                self.game.display.blit(timer_text, (x + icon.get_width() // 2, y + 12))
+                statuses.append((pos, icon, transparency, left_time // 60))
+
+        return {
+            'heart': self.heart_image,
+            'mana': mana_image,
+            'life': player.life,
+            'stamina': (stamina_width, stamina_intensity),
+            'level': player.level,
+            'potions': (potions, player.selected_item),
+            'spells': tuple(spells),
+            'scroll': scrolls[player.selected_scroll] if scrolls else None,
+            'experience': (player.experience, player.next_level_experience),
+            'status': tuple(statuses),
+        }
+
+    def hud_heart(self, heart_image):
+        scaled_heart = self.scaled_hearts.get(heart_image)
+        if scaled_heart is None:
+            scaled_heart = self.scaled_hearts[heart_image] = pygame.transform.scale(
+                heart_image, (heart_image.get_width() * 1.2, heart_image.get_height() * 1.2))
+        return [(scaled_heart, (22, 16))]
+
+    def hud_mana(self, mana_image):
+        return [(mana_image, (self.display_width - 82, self.display_height - 82))]
+
+    def hud_life(self, life):
+        return [(self.life_full if i < life else self.life_empty, (50 + i * 15, 28)) for i in range(6)]
+
+    def hud_stamina(self, stamina):
+        width, intensity = stamina
+        if width <= 0:
+            return []
+        bar = pygame.Surface((width, 3))
+        bar.fill((0, intensity, 0))
+        return [(bar, (54, 24))]
+
+    def hud_level(self, level):
+        level_render = self.text('level', self.font_lvl, f"{level}", (255, 255, 255))
+        return [(level_render, (self.panel_x + 78, self.panel_y + 22))]
+
+    def hud_potions(self, potions):
+        potion_counts, active_frame = potions
+        entries = []
+        x, y = self.inventory_x + 6, self.inventory_y + 8
+        icon_offset = 36
+
+        potion_icons = [self.heal_potion_icon, self.mana_potion_icon, self.stamina_potion_icon,
+                        self.power_potion_icon, self.antidote_icon, self.defense_potion_icon]
+
+        for index, (potion_icon, potion_count) in enumerate(zip(potion_icons, potion_counts)):
+            if potion_count > 0:
+                entries.append((potion_icon, (x, y)))
+                entries.append((self.text(f'potion_{index}', self.font, f" {potion_count}", self.text_color),
+                                (x + 18, y + 18)))
+            x += icon_offset
+
+        # frame
+        frame_positions = [x - 217 + i * 36 for i in range(7)]
+        if 1 <= active_frame <= len(frame_positions):
+            entries.append((self.potion_bar_frame, (frame_positions[active_frame - 1], y - 9)))
+        return entries
+
+    def hud_spells(self, spells):
+        entries = []
+        x, y = self.sb_x, self.sb_y
+        icon_offset = 28
+        for spell, remaining_seconds in spells:
+            entries.append((self.spellbook[spell], (x + 64, y + 28)))
+            if remaining_seconds is not None:
+                # spell inactive until recharge
+                entries.append((self.cooldown_overlay, (x + 64, y + 28)))
+                text = self.text(f'cooldown_{spell}', self.font, f"{remaining_seconds}", (255, 255, 255))
+                entries.append((text, text.get_rect(center=(x + 76, y + 40))))
+            x += icon_offset
+        return entries
+
+    def hud_scroll(self, scroll):
+        if not scroll:
+            return []
+        x = self.display_width - 74
+        y = 10
+        return [(self.spellbook[scroll[0]], (x, y)),
+                (self.text('scroll', self.font2, f" {scroll[1]}", self.text_color), (x + 44, y + 46))]
+
+    def hud_experience(self, experience):
+        experience, next_level_experience = experience
+        entries = []
+        xp_x = 208
+        xp_y = self.display_height - 58
+        xp_line = int(experience / next_level_experience * 100)
+        if xp_line > 0:
+            bar = pygame.Surface((xp_line, 4))
+            bar.fill((0, 191, 255))
+            entries.append((bar, (xp_x, xp_y)))
+
+        text = f"XP {experience} / {next_level_experience}"
+        text_width, text_height = self.font.size(text)
+        text_x = xp_x - 90 - text_width / 2
+        text_y = xp_y + 10 - text_height / 2
+        entries.append((self.text('experience', self.font_ui, text, (255, 255, 255)), (text_x, text_y)))
+        return entries
+
+    def hud_status(self, statuses):
+        entries = []
+        for pos, icon, transparency, seconds in statuses:
+            x = self.sb_x + 60 + (22 * pos)
+            y = self.sb_y - 12
+            icon.set_alpha(transparency)
+            entries.append((icon, (x, y)))
+            timer_text = self.text(f'status_{pos}', self.font, f"{seconds}", (255, 255, 255))
+            timer_text.set_alpha(transparency)
+            entries.append((timer_text, (x + icon.get_width() // 2, y + 12)))
+        return entries
 
 
 class Skill:
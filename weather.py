@@ -1,6 +1,7 @@
 import random
 import pygame
 import math
+import numpy as np
 
 from settings import SCREEN_HEIGTH, SCREEN_WIDTH
 
@@ -38,23 +39,82 @@ class Clouds:
             cloud.render(surf, offset=offset)
 
 
-class Raindrop(pygame.sprite.Sprite):
-    def __init__(self, x, y, wind_strength):
-        super().__init__()
-        self.image = pygame.Surface((2, 10), pygame.SRCALPHA)
-        color = (random.randint(100, 150), random.randint(100, 150), random.randint(200, 255), random.randint(50, 100))
-        pygame.draw.rect(self.image, color, (0, 0, 2, 10))
-        self.rect = self.image.get_rect(topleft=(x, y))
-        self.speed = random.uniform(5, 10)
-        self.wind_strength = wind_strength
+class Rain:
+    """
+    Rain over the screen. Positions and speeds of all drops are kept in NumPy arrays and updated in one vectorized step;
+    the drops share a few pre-rendered sprites of different shades and are drawn with one Surface.blits call.
+    Density (number of drops) and wind can be changed at any time.
+    """
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGTH), shades=16, seed=None):
+        """
+        Initializes the Rain object.
+        :param size: The size of the screen.
+        :param shades: Number of pre-rendered drop sprites.
+        :param seed: Seed of the random generator.
+        """
+        self.width, self.height = size
+        self.rng = np.random.default_rng(seed)
+        self.sprites = []
+        for r, g, b, a in self.rng.integers((100, 100, 200, 50), (151, 151, 256, 101), size=(shades, 4)).tolist():
+            sprite = pygame.Surface((2, 10), pygame.SRCALPHA)
+            sprite.fill((r, g, b, a))
+            self.sprites.append(sprite)
+        self.count = 0
+        self.wind = 0
+        self.pos = np.zeros((0, 2))
+        self.speed = np.zeros(0)
+        self.drop_sprites = []  # sprite of every drop, kept for the lifetime of the slot
+
+    def __len__(self):
+        return self.count
+
+    def start(self, density, wind):
+        """
+        Start a new rain with drops spread over the whole screen.
+        :param density: Number of drops.
+        :param wind: Horizontal movement of the drops per frame.
+        """
+        self.clear()
+        self.wind = wind
+        self.set_density(density)
+
+    def set_density(self, density):
+        """
+        Change the number of drops; new drops appear anywhere on the screen.
+        :param density: Number of drops.
+        """
+        if density > len(self.speed):
+            grown = density - len(self.speed)
+            self.pos = np.concatenate((self.pos, np.zeros((grown, 2))))
+            self.speed = np.concatenate((self.speed, np.zeros(grown)))
+            self.drop_sprites.extend(self.sprites[i] for i in self.rng.integers(len(self.sprites), size=grown).tolist())
+        if density > self.count:
+            new = slice(self.count, density)
+            self.pos[new, 0] = self.rng.integers(0, self.width + 1, size=density - self.count)
+            self.pos[new, 1] = self.rng.integers(0, self.height + 1, size=density - self.count)
+            self.speed[new] = self.rng.uniform(5, 10, size=density - self.count)
+        self.count = density
+
+    def clear(self):
+        self.count = 0
 
     def update(self):
-        self.rect.y += self.speed
-        self.rect.x += self.wind_strength
-        if self.rect.y > SCREEN_HEIGTH:
-            self.rect.y = random.randint(-50, -10)
-            self.rect.x = random.randint(0, SCREEN_WIDTH)
-            self.speed = random.uniform(5, 10)
+        """
+        Move the drops; drops that fell below the screen start again above it at a random position and speed.
+        """
+        n = self.count
+        pos = self.pos[:n]
+        pos[:, 1] += self.speed[:n]
+        pos[:, 0] += self.wind
+        fallen = np.flatnonzero(pos[:, 1] > self.height)
+        if len(fallen):
+            pos[fallen, 1] = self.rng.integers(-50, -9, size=len(fallen))
+            pos[fallen, 0] = self.rng.integers(0, self.width + 1, size=len(fallen))
+            self.speed[fallen] = self.rng.uniform(5, 10, size=len(fallen))
+
+    def render(self, surf):
+        if self.count:
+            surf.blits(zip(self.drop_sprites[:self.count], self.pos[:self.count].tolist()), doreturn=False)
 
 
 class Snow(pygame.sprite.Sprite):